@@ -0,0 +1,222 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import archive
+import db
+import settings
+import snapshot
+
+# Sales analytics for the admin Analytics tab.
+#
+# Each time window (the last N days) keeps its order lines in one
+# column-oriented DataFrame: orders joined to order_items and food_items.
+# The reports below are pandas groupbys over those columns, memoized until
+# the window's data changes.
+#
+# Reads come from the analytics snapshot (snapshot.py). A window is only
+# re-read when a newer snapshot appears, and even then only the orders
+# whose updated_at moved past the window's watermark are fetched (served
+# by idx_orders_updated). They replace their old rows, and rows that have
+# aged out of the window are dropped. Without a snapshot (PostgreSQL) the
+# same incremental read runs at most every LIVE_REFRESH_SECONDS.
+#
+# Windows longer than archive.ARCHIVE_AFTER_DAYS also reach back into the
+# Parquet archive when first loaded. Archived orders are final (delivered or
+# cancelled), so later refreshes only need the live tables.
+WINDOWS = {7: "Last 7 days", 30: "Last 30 days", 90: "Last 90 days", 365: "Last year"}
+LIVE_REFRESH_SECONDS = settings.get_float('ANALYTICS_LIVE_REFRESH', 60)
+# updated_at has one-second resolution; re-read this far behind the watermark
+OVERLAP_SECONDS = 5
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+_LINES_QUERY = '''SELECT o.id AS order_id, o.vendor_id, o.status, o.created_at, o.updated_at,
+                         oi.food_item_id, oi.quantity, oi.subtotal, fi.preparation_time
+                  FROM orders o
+                  JOIN order_items oi ON oi.order_id = o.id
+                  LEFT JOIN food_items fi ON fi.id = oi.food_item_id
+                  WHERE o.created_at >= ? {changed}'''
+
+def _utcnow():
+    # Naive UTC, like the CURRENT_TIMESTAMP values in created_at / updated_at
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _lines_query(start, changed_since=None):
+    params = [start]
+    changed = ""
+    if changed_since is not None:
+        changed = "AND o.updated_at >= ?"
+        params.append(changed_since)
+    return _LINES_QUERY.format(changed=changed), params
+
+def _load_lines(start, changed_since=None):
+    return _typed(db.query_df(*_lines_query(start, changed_since)))
+
+def _load_archived_lines(start):
+    """Order lines from the archive created at or after `start`, in the _load_lines layout."""
+    import pandas as pd
+    start_date = datetime.strptime(start, TIMESTAMP_FORMAT).date()
+    frames = [lines[lines['created_at'] >= start]
+              for lines in archive.iter_archived_lines(start_date, archive_dir=archive.ARCHIVE_DIR)]
+    if not frames:
+        return None
+    lines = pd.concat(frames, ignore_index=True).rename(columns={'id': 'order_id'})
+    food_item_ids = [int(i) for i in lines['food_item_id'].dropna().unique()]
+    preparation_times = {}
+    if food_item_ids:
+        placeholders = ", ".join("?" * len(food_item_ids))
+        preparation_times = dict(db.fetchall(f"SELECT id, preparation_time FROM food_items WHERE id IN ({placeholders})",
+                                             food_item_ids))
+    lines['preparation_time'] = lines['food_item_id'].map(preparation_times)
+    lines['vendor_id'] = lines['vendor_id'].astype('int64')
+    return _typed(lines[['order_id', 'vendor_id', 'status', 'created_at', 'updated_at', 'food_item_id', 'quantity',
+                         'subtotal', 'preparation_time']])
+
+def _typed(lines):
+    import pandas as pd
+    lines['created_at'] = pd.to_datetime(lines['created_at'])
+    lines['updated_at'] = pd.to_datetime(lines['updated_at'])
+    lines['vendor_id'] = lines['vendor_id'].fillna(0).astype('int64')
+    lines['food_item_id'] = lines['food_item_id'].fillna(0).astype('int64')
+    lines['preparation_time'] = lines['preparation_time'].fillna(0)
+    lines['status'] = lines['status'].astype('category')
+    return lines
+
+class SalesWindow:
+    def __init__(self, days):
+        self.days = days
+        self.lines = None
+        self.watermark = None
+        self.as_of = None
+        self.checked_at = 0.0
+        self.reports = {}
+        self.lock = threading.Lock()
+
+    def refresh(self, as_of):
+        """Bring the window up to date with the data as of `as_of` (None for live reads)."""
+        with self.lock:
+            if self.lines is not None:
+                if as_of is not None and as_of == self.as_of:
+                    return
+                if as_of is None and time.monotonic() - self.checked_at < LIVE_REFRESH_SECONDS:
+                    return
+            import pandas as pd
+            start = _utcnow() - timedelta(days=self.days)
+            if self.lines is None:
+                lines = _load_lines(start.strftime(TIMESTAMP_FORMAT))
+                if self.days > archive.ARCHIVE_AFTER_DAYS:
+                    archived = _load_archived_lines(start.strftime(TIMESTAMP_FORMAT))
+                    if archived is not None:
+                        # A batch being archived right now can briefly be in both places
+                        archived = archived[~archived['order_id'].isin(lines['order_id'])]
+                        lines = pd.concat([archived, lines], ignore_index=True)
+                        lines['status'] = lines['status'].astype('category')
+                self.watermark = start.strftime(TIMESTAMP_FORMAT)
+            else:
+                since = datetime.strptime(self.watermark, TIMESTAMP_FORMAT) - timedelta(seconds=OVERLAP_SECONDS)
+                changed = _load_lines(start.strftime(TIMESTAMP_FORMAT), since.strftime(TIMESTAMP_FORMAT))
+                lines = self.lines[self.lines['created_at'] >= start]
+                if not changed.empty:
+                    # Changed orders replace their earlier rows wholesale
+                    lines = lines[~lines['order_id'].isin(changed['order_id'])]
+                    lines = pd.concat([lines, changed], ignore_index=True)
+                    lines['status'] = lines['status'].astype('category')
+            if not lines.empty:
+                self.watermark = max(self.watermark, lines['updated_at'].max().strftime(TIMESTAMP_FORMAT))
+            self.lines = lines.reset_index(drop=True)
+            self.reports = {}
+            self.as_of = as_of
+            self.checked_at = time.monotonic()
+
+    def report(self, name, fn, *args):
+        # Memoized until the next refresh() that reads the database
+        key = (name,) + args
+        with self.lock:
+            if key not in self.reports:
+                self.reports[key] = fn(self.lines, *args)
+            return self.reports[key]
+
+_windows = {}
+_windows_lock = threading.Lock()
+
+def sales_window(days):
+    """The up-to-date SalesWindow for the last `days` days, and the time its data is as of."""
+    with _windows_lock:
+        window = _windows.get(days)
+        if window is None:
+            window = _windows[days] = SalesWindow(days)
+    with snapshot.reading() as as_of:
+        window.refresh(as_of)
+    return window, as_of
+
+# Reports. Each takes a window's order lines and returns a DataFrame;
+# cancelled orders count towards demand (heatmap) but not towards sales.
+def _sold(lines):
+    return lines[lines['status'] != 'cancelled']
+
+def _orders(lines):
+    # One row per order: vendor, time, status, item count, value and the
+    # longest quoted preparation time among its items
+    return lines.groupby('order_id', sort=False, observed=True).agg(
+        vendor_id=('vendor_id', 'first'),
+        created_at=('created_at', 'first'),
+        status=('status', 'first'),
+        items=('quantity', 'sum'),
+        lines=('food_item_id', 'size'),
+        value=('subtotal', 'sum'),
+        preparation_time=('preparation_time', 'max'),
+    )
+
+def summary(lines):
+    orders = _orders(_sold(lines))
+    return {
+        'orders': len(orders),
+        'revenue': float(orders['value'].sum()),
+        'items': int(orders['items'].sum()),
+        'basket_items': float(orders['items'].mean()) if len(orders) else 0.0,
+        'basket_value': float(orders['value'].mean()) if len(orders) else 0.0,
+    }
+
+def top_items(lines, limit=10):
+    sold = _sold(lines)
+    totals = sold.groupby('food_item_id').agg(quantity=('quantity', 'sum'), revenue=('subtotal', 'sum'),
+                                              orders=('order_id', 'nunique'))
+    return totals.nlargest(limit, 'quantity').reset_index()
+
+def hourly_demand(lines):
+    """Orders placed per weekday (rows) and local hour of day (columns)."""
+    import pandas as pd
+    placed = lines.drop_duplicates('order_id')['created_at'] + datetime.now().astimezone().utcoffset()
+    heatmap = pd.crosstab(placed.dt.dayofweek, placed.dt.hour)
+    heatmap = heatmap.reindex(index=range(7), columns=range(24), fill_value=0)
+    heatmap.index = WEEKDAYS
+    heatmap.columns = [f"{hour:02d}" for hour in heatmap.columns]
+    return heatmap
+
+def vendor_performance(lines):
+    orders = _orders(lines)
+    cancelled = orders['status'] == 'cancelled'
+    sold = orders[~cancelled]
+    performance = sold.groupby('vendor_id').agg(
+        orders=('value', 'size'),
+        revenue=('value', 'sum'),
+        basket_items=('items', 'mean'),
+        basket_value=('value', 'mean'),
+        preparation_time=('preparation_time', 'mean'),
+    )
+    # Every vendor with orders in the window, including those whose orders were all cancelled
+    by_vendor = cancelled.groupby(orders['vendor_id'])
+    performance = performance.reindex(by_vendor.size().index).fillna({'orders': 0, 'revenue': 0.0})
+    performance['orders'] = performance['orders'].astype('int64')
+    performance['cancelled'] = by_vendor.sum()
+    performance['cancel_rate'] = by_vendor.mean()
+    return performance.sort_values('revenue', ascending=False).reset_index()
+
+def item_names(food_item_ids):
+    """{food item id: name} for the items a report lists."""
+    ids = [int(food_item_id) for food_item_id in food_item_ids]
+    if not ids:
+        return {}
+    placeholders = ", ".join("?" * len(ids))
+    return dict(db.fetchall(f"SELECT id, name FROM food_items WHERE id IN ({placeholders})", ids))
@@ -1,202 +1,222 @@
 import streamlit as st
-import sqlite3
-import hashlib
-import pandas as pd
-from datetime import datetime, timedelta
-import uuid
+from datetime import datetime, timedelta, timezone
+import json
 import os # No longer primarily using for secrets, but good to keep if needed
+import tempfile
+import time
+
+import analytics
+import archive
+import cart
+import db
+import export
+import grid
+import instrumentation
+import migrations
+import order_board
+import order_store
+import passwords
+import search
+import sessions
+import settings
+import snapshot
+import write_queue
+
+# Upper bound on bound parameters in a single IN (...) list
+MAX_IN_PARAMS = 500
+ORDERS_PAGE_SIZE = 20
+VENDORS_PAGE_SIZE = 10
+MENU_PAGE_SIZE = 12
+SEARCH_RESULT_LIMIT = 50
+# Columns of a food item row as returned by get_food_items() and search
+FOOD_ITEM_COLUMNS = ["id", "vendor_id", "name", "description", "price", "category", "image_url", "is_available",
+                     "preparation_time", "created_at", "vendor_name"]
+ORDER_STATUSES = ["pending", "confirmed", "preparing", "ready", "delivered", "cancelled"]
+# Status changes allowed in bulk; delivered and cancelled orders are final
+ALLOWED_TRANSITIONS = {
+    "pending": ("confirmed", "cancelled"),
+    "confirmed": ("preparing", "cancelled"),
+    "preparing": ("ready", "cancelled"),
+    "ready": ("delivered", "cancelled"),
+    "delivered": (),
+    "cancelled": (),
+}
+
+# Vendors and menus are read on every rerun but change rarely, so they are
+# cached process-wide and dropped whenever the admin forms write to them.
+CATALOG_CACHE_TTL = settings.get_int('CATALOG_CACHE_TTL', 300)
+CATALOG_CACHE_MAX_ENTRIES = settings.get_int('CATALOG_CACHE_MAX_ENTRIES', 1000)
+
+# Prepared export files live in the temp directory until the next export in
+# the same session, or until any export finds them older than this
+EXPORT_FILE_TTL = settings.get_int('EXPORT_FILE_TTL', 3600)
+EXPORT_FILE_PREFIX = "fss_export_"
+
+# Food cards, the cart page and the sidebar cart summary are fragments. Cart
+# changes are made in widget callbacks that rerun just the summary (and the
+# cart page when on it) instead of the whole page. Setting this polls
+# the summary every N seconds as well, at one rerun per open session each
+# time, so it is off (0) by default.
+CART_SUMMARY_REFRESH = settings.get_float('CART_SUMMARY_REFRESH', 0) or None
 
 # Database setup and initialization
+@st.cache_resource
 def init_database():
-    conn = sqlite3.connect('campus_food_system.db')
-    c = conn.cursor()
-    
-    # Users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        full_name TEXT NOT NULL,
-        phone TEXT,
-        user_type TEXT DEFAULT 'customer',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # Vendors table
-    c.execute('''CREATE TABLE IF NOT EXISTS vendors (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        description TEXT,
-        location TEXT NOT NULL,
-        contact_phone TEXT,
-        contact_email TEXT,
-        operating_hours TEXT,
-        rating REAL DEFAULT 0.0,
-        is_active BOOLEAN DEFAULT 1,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )''')
-    
-    # Food items table
-    c.execute('''CREATE TABLE IF NOT EXISTS food_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        vendor_id INTEGER,
-        name TEXT NOT NULL,
-        description TEXT,
-        price REAL NOT NULL,
-        category TEXT,
-        image_url TEXT,
-        is_available BOOLEAN DEFAULT 1,
-        preparation_time INTEGER DEFAULT 15,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (vendor_id) REFERENCES vendors (id)
-    )''')
-    
-    # Orders table
-    c.execute('''CREATE TABLE IF NOT EXISTS orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_number TEXT UNIQUE NOT NULL,
-        customer_id INTEGER,
-        vendor_id INTEGER,
-        total_amount REAL NOT NULL,
-        status TEXT DEFAULT 'pending',
-        delivery_location TEXT,
-        special_instructions TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (customer_id) REFERENCES users (id),
-        FOREIGN KEY (vendor_id) REFERENCES vendors (id)
-    )''')
-    
-    # Order items table
-    c.execute('''CREATE TABLE IF NOT EXISTS order_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_id INTEGER,
-        food_item_id INTEGER,
-        quantity INTEGER NOT NULL,
-        unit_price REAL NOT NULL,
-        subtotal REAL NOT NULL,
-        FOREIGN KEY (order_id) REFERENCES orders (id),
-        FOREIGN KEY (food_item_id) REFERENCES food_items (id)
-    )''')
-    
-    # Insert default admin user
-    admin_password = hashlib.sha256("admin".encode()).hexdigest()
-    c.execute('''INSERT OR IGNORE INTO users (username, password, email, full_name, user_type) 
-                 VALUES (?, ?, ?, ?, ?)''', 
-              ("admin", admin_password, "admin@fss.edu.ng", "System Administrator", "admin"))
-    
-    # Insert sample vendors
-    sample_vendors = [
-        ("Campus Cafeteria", "Main campus dining hall", "Block A, Ground Floor", "08012345678", "cafeteria@fss.edu.ng", "7:00 AM - 9:00 PM"),
-        ("Quick Bites", "Fast food and snacks", "Student Center", "08098765432", "quickbites@fss.edu.ng", "8:00 AM - 8:00 PM"),
-        ("Healthy Meals", "Nutritious and organic food", "Faculty Building", "08055566677", "healthy@fss.edu.ng", "9:00 AM - 6:00 PM")
-    ]
-    
-    for vendor in sample_vendors:
-        c.execute('''INSERT OR IGNORE INTO vendors (name, description, location, contact_phone, contact_email, operating_hours) 
-                    VALUES (?, ?, ?, ?, ?, ?)''', vendor)
-    
-    # Insert sample food items
-    sample_foods = [
-        (1, "Jollof Rice", "Spicy Nigerian rice dish", 800.00, "Main Course", "", 1, 20),
-        (1, "Fried Rice", "Delicious fried rice with vegetables", 750.00, "Main Course", "", 1, 18),
-        (1, "Chicken Stew", "Tender chicken in tomato stew", 1200.00, "Main Course", "", 1, 25),
-        (2, "Meat Pie", "Savory pastry with meat filling", 200.00, "Snacks", "", 1, 5),
-        (2, "Sausage Roll", "Crispy pastry with sausage", 150.00, "Snacks", "", 1, 5),
-        (2, "Soft Drinks", "Assorted soft drinks", 100.00, "Beverages", "", 1, 2),
-        (3, "Grilled Fish", "Fresh grilled fish with vegetables", 1500.00, "Main Course", "", 1, 30),
-        (3, "Vegetable Salad", "Fresh mixed vegetable salad", 600.00, "Salads", "", 1, 10),
-        (3, "Fruit Juice", "Fresh fruit juice", 300.00, "Beverages", "", 1, 5)
-    ]
-    
-    for food in sample_foods:
-        c.execute('''INSERT OR IGNORE INTO food_items (vendor_id, name, description, price, category, image_url, is_available, preparation_time) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', food)
-    
-    conn.commit()
-    conn.close()
-
-# Authentication functions
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password(password, hashed):
-    return hash_password(password) == hashed
+    # Runs once per process; later reruns reuse the cached result instead of
+    # touching the schema. Use `python migrations.py upgrade` to migrate ahead
+    # of deploying.
+    passwords.session_secret()  # refuse to start without SESSION_SECRET outside development
+    with db.connection() as conn:
+        return migrations.migrate(conn)
+
+# Authentication functions (logins and session tokens live in sessions.py)
+SESSION_COOKIE = "fss_session"
+# Tokens used to ride in this query parameter; it is dropped on sight
+LEGACY_SESSION_PARAM = "session"
 
 def authenticate_user(username, password):
-    conn = sqlite3.connect('campus_food_system.db')
-    c = conn.cursor()
-    c.execute("SELECT id, username, password, user_type, full_name FROM users WHERE username = ?", (username,))
-    user = c.fetchone()
-    conn.close()
-    
-    if user and verify_password(password, user[2]):
-        return {"id": user[0], "username": user[1], "user_type": user[3], "full_name": user[4]}
-    return None
+    return sessions.authenticate(username, password)
+
+def _set_session_cookie(token):
+    # Streamlit can read cookies but not set them, so an empty iframe writes
+    # it from the browser on the next run (log_in/log_out rerun the
+    # page). An empty token deletes the cookie.
+    st.session_state.session_cookie = token
+
+def _write_session_cookie():
+    token = st.session_state.pop('session_cookie', None)
+    if token is None:
+        return
+    max_age = passwords.SESSION_TTL if token else 0
+    st.iframe(f"""<script>
+        const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+        window.parent.document.cookie = {json.dumps(SESSION_COOKIE)} + "=" + {json.dumps(token)}
+            + "; Path=/; Max-Age={max_age}; SameSite=Strict" + secure;
+    </script>""", height="content")
+
+def log_in(user, token):
+    st.session_state.logged_in = True
+    st.session_state.user = user
+    st.session_state.session_token = token
+    st.session_state.cart = cart.Cart.load(user['id'])
+    _set_session_cookie(token)
+    passwords.remember_session(token, user)
+
+def log_out():
+    token = st.session_state.get('session_token')
+    if token:
+        sessions.revoke(token)
+    _set_session_cookie("")
+    st.session_state.logged_in = False
+    st.session_state.user = None
+    st.session_state.session_token = None
+    st.session_state.cart = cart.Cart()
+    st.session_state.page = 'main'
+
+def register_user(username, password, email, full_name, phone):
+    # Hash before queueing so the writer thread never waits on scrypt
+    stored = passwords.hash_password(password)
+    write_queue.call(db.execute, '''INSERT INTO users (username, password, email, full_name, phone)
+                                    VALUES (?, ?, ?, ?, ?)''',
+                     (username, stored, email, full_name, phone))
 
 # Database query functions
-def get_vendors():
-    conn = sqlite3.connect('campus_food_system.db')
-    df = pd.read_sql_query("SELECT * FROM vendors WHERE is_active = 1", conn)
-    conn.close()
-    return df
+def query_vendors():
+    return db.query_df("SELECT * FROM vendors WHERE is_active = 1")
 
-def get_food_items(vendor_id=None):
-    conn = sqlite3.connect('campus_food_system.db')
+def query_food_items(vendor_id=None):
     if vendor_id:
         query = """SELECT fi.*, v.name as vendor_name 
                    FROM food_items fi 
                    JOIN vendors v ON fi.vendor_id = v.id 
                    WHERE fi.vendor_id = ? AND fi.is_available = 1"""
-        df = pd.read_sql_query(query, conn, params=(vendor_id,))
-    else:
+        return db.query_df(query, (vendor_id,))
+    query = """SELECT fi.*, v.name as vendor_name 
+               FROM food_items fi 
+               JOIN vendors v ON fi.vendor_id = v.id 
+               WHERE fi.is_available = 1"""
+    return db.query_df(query)
+
+# The pages read the catalog through these cached copies
+@st.cache_data(ttl=CATALOG_CACHE_TTL, max_entries=CATALOG_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_vendors():
+    return query_vendors()
+
+@st.cache_data(ttl=CATALOG_CACHE_TTL, max_entries=CATALOG_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_food_items(vendor_id=None):
+    return query_food_items(vendor_id)
+
+@st.cache_data(ttl=CATALOG_CACHE_TTL, max_entries=CATALOG_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_vendor_names():
+    # {vendor id: name} for select boxes; a dict lookup per option instead of
+    # filtering the vendors DataFrame
+    return {row.id: row.name for row in db.query_rows("SELECT id, name FROM vendors WHERE is_active = 1 ORDER BY id")}
+
+def invalidate_catalog():
+    get_vendors.clear()
+    get_vendor_names.clear()
+    get_food_items.clear()
+
+def add_food_item(vendor_id, name, description, price, category, prep_time):
+    food_item_id = db.insert('''INSERT INTO food_items (vendor_id, name, description, price, category, preparation_time) 
+                                VALUES (?, ?, ?, ?, ?, ?)''', 
+                             (vendor_id, name, description, price, category, prep_time))
+    invalidate_catalog()
+    return food_item_id
+
+def add_vendor(name, description, location, phone, email, hours):
+    vendor_id = db.insert('''INSERT INTO vendors (name, description, location, contact_phone, contact_email, operating_hours) 
+                             VALUES (?, ?, ?, ?, ?, ?)''', 
+                          (name, description, location, phone, email, hours))
+    invalidate_catalog()
+    return vendor_id
+
+def _search_food_index(match, limit):
+    # Rank inside the search index so the LIMIT applies before the joins
+    if db.is_postgres():
         query = """SELECT fi.*, v.name as vendor_name 
-                   FROM food_items fi 
+                   FROM (SELECT food_item_id, ts_rank(document, to_tsquery('simple', ?)) AS rank 
+                         FROM food_items_search 
+                         WHERE document @@ to_tsquery('simple', ?) 
+                         ORDER BY rank DESC LIMIT ?) m
+                   JOIN food_items fi ON fi.id = m.food_item_id 
                    JOIN vendors v ON fi.vendor_id = v.id 
-                   WHERE fi.is_available = 1"""
-        df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
-
-def search_food_items(search_term):
-    conn = sqlite3.connect('campus_food_system.db')
+                   ORDER BY m.rank DESC"""
+        return db.query_df(query, (match, match, limit))
     query = """SELECT fi.*, v.name as vendor_name 
-               FROM food_items fi 
+               FROM (SELECT rowid, rank FROM food_items_fts 
+                     WHERE food_items_fts MATCH ? ORDER BY rank LIMIT ?) m
+               JOIN food_items fi ON fi.id = m.rowid 
                JOIN vendors v ON fi.vendor_id = v.id 
-               WHERE (fi.name LIKE ? OR fi.description LIKE ? OR v.name LIKE ?) 
-               AND fi.is_available = 1"""
-    search_pattern = f"%{search_term}%"
-    df = pd.read_sql_query(query, conn, params=(search_pattern, search_pattern, search_pattern))
-    conn.close()
-    return df
+               ORDER BY m.rank"""
+    return db.query_df(query, (match, limit))
+
+def search_food_items(search_term, limit=SEARCH_RESULT_LIMIT):
+    # Best matches first across name, description, category and vendor name.
+    # If the terms as typed match nothing, retry with spelling corrections.
+    terms = search.tokenize(search_term)
+    if not terms:
+        import pandas as pd
+        return pd.DataFrame(columns=FOOD_ITEM_COLUMNS)
+    results = _search_food_index(search.match_expression(terms), limit)
+    if results.empty:
+        corrected = search.correct_terms(terms)
+        if corrected != terms:
+            results = _search_food_index(search.match_expression(corrected), limit)
+    return results
 
 def create_order(customer_id, vendor_id, items, total_amount, delivery_location, special_instructions=""):
-    conn = sqlite3.connect('campus_food_system.db')
-    c = conn.cursor()
-    
-    # Generate unique order number
-    order_number = f"FSS{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
-    
-    # Insert order
-    c.execute('''INSERT INTO orders (order_number, customer_id, vendor_id, total_amount, delivery_location, special_instructions) 
-                 VALUES (?, ?, ?, ?, ?, ?)''', 
-              (order_number, customer_id, vendor_id, total_amount, delivery_location, special_instructions))
-    
-    order_id = c.lastrowid
-    
-    # Insert order items
-    for item in items:
-        c.execute('''INSERT INTO order_items (order_id, food_item_id, quantity, unit_price, subtotal) 
-                    VALUES (?, ?, ?, ?, ?)''', 
-                  (order_id, item['id'], item['quantity'], item['price'], item['subtotal']))
-    
-    conn.commit()
-    conn.close()
-    return order_number
+    # Goes through the single-writer queue so concurrent checkouts share commits
+    return write_queue.call(order_store.create_orders_bulk, [{
+        'customer_id': customer_id,
+        'vendor_id': vendor_id,
+        'items': items,
+        'total_amount': total_amount,
+        'delivery_location': delivery_location,
+        'special_instructions': special_instructions,
+    }])[0]
 
 def get_orders(customer_id=None):
-    conn = sqlite3.connect('campus_food_system.db')
     if customer_id:
         query = """SELECT o.*, v.name as vendor_name, u.full_name as customer_name
                    FROM orders o 
@@ -204,33 +224,239 @@ def get_orders(customer_id=None):
                    JOIN users u ON o.customer_id = u.id
                    WHERE o.customer_id = ? 
                    ORDER BY o.created_at DESC"""
-        df = pd.read_sql_query(query, conn, params=(customer_id,))
-    else:
-        query = """SELECT o.*, v.name as vendor_name, u.full_name as customer_name
-                   FROM orders o 
-                   JOIN vendors v ON o.vendor_id = v.id 
-                   JOIN users u ON o.customer_id = u.id
-                   ORDER BY o.created_at DESC"""
-        df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+        return db.query_df(query, (customer_id,))
+    query = """SELECT o.*, v.name as vendor_name, u.full_name as customer_name
+               FROM orders o 
+               JOIN vendors v ON o.vendor_id = v.id 
+               JOIN users u ON o.customer_id = u.id
+               ORDER BY o.created_at DESC"""
+    return db.query_df(query)
+
+def _order_filters(customer_id=None, status=None, vendor_id=None, start_date=None, end_date=None):
+    # WHERE conditions on orders (aliased o) shared by the order list and bulk updates
+    conditions = []
+    params = []
+    if customer_id:
+        conditions.append("o.customer_id = ?")
+        params.append(customer_id)
+    if status:
+        conditions.append("o.status = ?")
+        params.append(status)
+    if vendor_id:
+        conditions.append("o.vendor_id = ?")
+        params.append(vendor_id)
+    if start_date:
+        conditions.append("o.created_at >= ?")
+        params.append(start_date.strftime('%Y-%m-%d'))
+    if end_date:
+        conditions.append("o.created_at < ?")
+        params.append((end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+    return conditions, params
+
+def get_orders_page(customer_id=None, status=None, vendor_id=None, start_date=None, end_date=None,
+                    after=None, before=None, page_size=ORDERS_PAGE_SIZE):
+    # Keyset pagination over (created_at, id), newest first. Pass the last
+    # row's (created_at, id) as `after` for the next page, or the first row's
+    # as `before` for the previous one. Returns (page, has_more), where
+    # has_more says whether another page exists in the direction travelled.
+    conditions, params = _order_filters(customer_id, status, vendor_id, start_date, end_date)
+    order = "DESC"
+    if after:
+        conditions.append("(o.created_at, o.id) < (?, ?)")
+        params.extend(after)
+    elif before:
+        conditions.append("(o.created_at, o.id) > (?, ?)")
+        params.extend(before)
+        order = "ASC"
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""SELECT o.*, v.name as vendor_name, u.full_name as customer_name
+                FROM orders o 
+                JOIN vendors v ON o.vendor_id = v.id 
+                JOIN users u ON o.customer_id = u.id
+                {where}
+                ORDER BY o.created_at {order}, o.id {order}
+                LIMIT ?"""
+    page = db.query_df(query, params + [page_size + 1])
+    has_more = len(page) > page_size
+    page = page.iloc[:page_size]
+    if before:
+        page = page.iloc[::-1].reset_index(drop=True)
+    return page, has_more
 
 def get_order_details(order_id):
-    conn = sqlite3.connect('campus_food_system.db')
     query = """SELECT oi.*, fi.name as food_name, fi.description
                FROM order_items oi
                JOIN food_items fi ON oi.food_item_id = fi.id
                WHERE oi.order_id = ?"""
-    df = pd.read_sql_query(query, conn, params=(order_id,))
-    conn.close()
-    return df
+    return db.query_df(query, (order_id,))
+
+def get_order_details_bulk(order_ids):
+    # Line items for many orders in one query per chunk, grouped in memory.
+    # Returns {order_id: DataFrame}; orders without items are left out.
+    order_ids = list(order_ids)
+    details = {}
+    for start in range(0, len(order_ids), MAX_IN_PARAMS):
+        chunk = order_ids[start:start + MAX_IN_PARAMS]
+        placeholders = ", ".join("?" * len(chunk))
+        query = f"""SELECT oi.*, fi.name as food_name, fi.description
+                    FROM order_items oi
+                    JOIN food_items fi ON oi.food_item_id = fi.id
+                    WHERE oi.order_id IN ({placeholders})
+                    ORDER BY oi.order_id, oi.id"""
+        items = db.query_df(query, chunk)
+        for order_id, order_items in items.groupby('order_id'):
+            details[order_id] = order_items
+    return details
+
+def load_open_order_details(orders, key_prefix):
+    # Only orders whose "Show items" toggle is switched on get their items
+    # loaded, all in a single batch before the list is drawn.
+    open_ids = [int(order_id) for order_id in orders['id'] if st.session_state.get(f"{key_prefix}{order_id}")]
+    return get_order_details_bulk(open_ids) if open_ids else {}
 
 def update_order_status(order_id, status):
-    conn = sqlite3.connect('campus_food_system.db')
-    c = conn.cursor()
-    c.execute("UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (status, order_id))
-    conn.commit()
-    conn.close()
+    write_queue.call(db.execute, "UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                     (status, order_id))
+
+def _from_statuses(status):
+    return [current for current, targets in ALLOWED_TRANSITIONS.items() if status in targets]
+
+def _update_orders_status(order_ids, status, from_statuses):
+    changed = 0
+    status_placeholders = ", ".join("?" * len(from_statuses))
+    with db.transaction():
+        for start in range(0, len(order_ids), MAX_IN_PARAMS):
+            chunk = order_ids[start:start + MAX_IN_PARAMS]
+            id_placeholders = ", ".join("?" * len(chunk))
+            cursor = db.execute(f"""UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP
+                                    WHERE id IN ({id_placeholders}) AND status IN ({status_placeholders})""",
+                                [status] + chunk + from_statuses)
+            changed += cursor.rowcount if cursor is not None else 0
+    return changed
+
+def update_orders_status(order_ids, status):
+    """Move many orders to `status` in one transaction; returns how many changed.
+
+    The allowed-transition check is part of the UPDATE, so orders whose
+    current status can't move to `status` (including ones changed by
+    someone else meanwhile) are left alone and not counted.
+    """
+    from_statuses = _from_statuses(status)
+    order_ids = [int(order_id) for order_id in order_ids]
+    if not order_ids or not from_statuses:
+        return 0
+    return write_queue.call(_update_orders_status, order_ids, status, from_statuses)
+
+def _matching_conditions(filters, from_statuses):
+    conditions, params = _order_filters(**filters)
+    conditions.append(f"o.status IN ({', '.join('?' * len(from_statuses))})")
+    return conditions, params + from_statuses
+
+def count_matching_orders(filters, status):
+    """How many orders matching `filters` update_matching_orders_status() would move to `status`."""
+    from_statuses = _from_statuses(status)
+    if not from_statuses:
+        return 0
+    conditions, params = _matching_conditions(filters, from_statuses)
+    return db.query_scalar(f"SELECT COUNT(*) FROM orders o WHERE {' AND '.join(conditions)}", params, default=0)
+
+def update_matching_orders_status(filters, status):
+    """Move every order matching `filters` (as for get_orders_page()) to `status`; returns how many changed.
+
+    Same guarded UPDATE as update_orders_status(), applied to the matching
+    ids in batches of MAX_IN_PARAMS. Each batch is its own write-queue job,
+    so checkouts are not held up behind a large update. Refuses to run
+    without a filter (ValueError), so one click can't move every order.
+    """
+    if not any(filters.values()):
+        raise ValueError("Set at least one filter before updating all matching orders")
+    from_statuses = _from_statuses(status)
+    if not from_statuses:
+        return 0
+    # Reading the ids doesn't hold up the writer; the UPDATEs re-check each
+    # order's status, so one that moved on meanwhile is left alone
+    conditions, params = _matching_conditions(filters, from_statuses)
+    order_ids = sorted(row[0] for row in db.fetchall(f"SELECT o.id FROM orders o WHERE {' AND '.join(conditions)}",
+                                                     params))
+    changed = 0
+    for start in range(0, len(order_ids), MAX_IN_PARAMS):
+        changed += write_queue.call(_update_orders_status, order_ids[start:start + MAX_IN_PARAMS], status,
+                                    from_statuses)
+    return changed
+
+def get_dashboard_stats():
+    # Trigger-maintained counters (see migrations._add_stats_tables)
+    counters = dict(db.fetchall("SELECT name, value FROM stats_counters"))
+    return {
+        'total_users': int(counters.get('customers', 0)),
+        'total_vendors': int(counters.get('active_vendors', 0)),
+        'total_orders': int(counters.get('orders', 0)),
+        'total_revenue': counters.get('revenue', 0.0),
+    }
+
+def _days_ago(days):
+    # daily_vendor_sales days come from created_at, which is UTC (CURRENT_TIMESTAMP)
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d')
+
+def get_daily_revenue(days=30):
+    start = _days_ago(days)
+    return db.query_df("""SELECT day, SUM(order_count) as orders, SUM(revenue) as revenue
+                          FROM daily_vendor_sales
+                          WHERE day >= ?
+                          GROUP BY day
+                          ORDER BY day""", (start,))
+
+def get_vendor_revenue(days=30):
+    start = _days_ago(days)
+    return db.query_df("""SELECT v.name as vendor_name, SUM(s.order_count) as orders, SUM(s.revenue) as revenue
+                          FROM daily_vendor_sales s
+                          JOIN vendors v ON s.vendor_id = v.id
+                          WHERE s.day >= ?
+                          GROUP BY v.id, v.name
+                          ORDER BY revenue DESC""", (start,))
+
+def get_recent_orders(limit=10):
+    return db.query_df("""
+        SELECT o.order_number, o.created_at, o.status, o.total_amount, 
+               v.name as vendor_name, u.full_name as customer_name
+        FROM orders o 
+        JOIN vendors v ON o.vendor_id = v.id 
+        JOIN users u ON o.customer_id = u.id
+        ORDER BY o.created_at DESC LIMIT ?
+    """, (limit,))
+
+# Admin grid sources (see grid.py)
+USERS_GRID = {
+    'from': "users",
+    'columns': [("id", "id"), ("username", "username"), ("email", "email"), ("full_name", "full_name"),
+                ("phone", "phone"), ("user_type", "user_type"), ("created_at", "created_at")],
+    'key': "id",
+    'sortable': ["id", "username", "email", "created_at"],
+    'search': ["username", "email", "full_name"],
+    'counter': "users_rows",
+}
+
+VENDORS_GRID = {
+    'from': "vendors",
+    'columns': [("id", "id"), ("name", "name"), ("location", "location"), ("contact_phone", "contact_phone"),
+                ("contact_email", "contact_email"), ("operating_hours", "operating_hours"),
+                ("rating", "rating"), ("is_active", "is_active")],
+    'key': "id",
+    'sortable': ["id", "name", "location", "rating"],
+    'search': ["name", "location"],
+    'counter': "vendors_rows",
+}
+
+FOOD_GRID = {
+    'from': "food_items fi JOIN vendors v ON v.id = fi.vendor_id",
+    'columns': [("id", "fi.id"), ("name", "fi.name"), ("vendor_name", "v.name"), ("price", "fi.price"),
+                ("category", "fi.category"), ("is_available", "fi.is_available")],
+    'key': "fi.id",
+    'sortable': ["id", "name", "vendor_name", "price"],
+    'search': ["fi.name", "fi.category", "v.name"],
+    'counter': "food_items_rows",
+}
 
 # Streamlit app
 def main():
@@ -243,26 +469,50 @@ def main():
     # Initialize database
     init_database()
     
+    with instrumentation.timed("rerun"):
+        show_app()
+
+def show_app():
     # Session state initialization
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
     if 'user' not in st.session_state:
         st.session_state.user = None
     if 'cart' not in st.session_state:
-        st.session_state.cart = []
+        st.session_state.cart = cart.Cart()
     if 'page' not in st.session_state:
         st.session_state.page = 'main'
     
+    if LEGACY_SESSION_PARAM in st.query_params:
+        del st.query_params[LEGACY_SESSION_PARAM]
+    # A new browser session carrying a session cookie resumes without a
+    # password. st.context.cookies is fixed for the life of the browser
+    # session, so this only looks at it once.
+    if 'session_checked' not in st.session_state:
+        st.session_state.session_checked = True
+        token = st.context.cookies.get(SESSION_COOKIE)
+        if token and not st.session_state.logged_in:
+            user = sessions.restore(token)
+            if user:
+                log_in(user, token)
+                st.session_state.pop('session_cookie')  # the browser already has it
+            else:
+                _set_session_cookie("")
+    _write_session_cookie()
+    
     # Header
     st.title("🍽️ Federal School of Statistics - Campus Food Ordering System")
     
     if not st.session_state.logged_in:
-        show_login_page()
+        with instrumentation.timed("page: login"):
+            show_login_page()
     else:
         if st.session_state.user['user_type'] == 'admin':
-            show_admin_dashboard()
+            with instrumentation.timed("page: admin"):
+                show_admin_dashboard()
         else:
-            show_customer_dashboard()
+            with instrumentation.timed(f"page: customer {st.session_state.page}"):
+                show_customer_dashboard()
 
 def show_login_page():
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -276,14 +526,17 @@ def show_login_page():
             submit = st.form_submit_button("Login")
             
             if submit:
-                user = authenticate_user(username, password)
-                if user:
-                    st.session_state.logged_in = True
-                    st.session_state.user = user
-                    st.success(f"Welcome, {user['full_name']}!")
-                    st.rerun()
+                try:
+                    user, token = authenticate_user(username, password)
+                except passwords.LoginBusy as e:
+                    st.warning(str(e))
                 else:
-                    st.error("Invalid username or password")
+                    if user:
+                        log_in(user, token)
+                        st.success(f"Welcome, {user['full_name']}!")
+                        st.rerun()
+                    else:
+                        st.error("Invalid username or password")
         
         st.info("**Admin Credentials:** Username: admin, Password: admin")
         
@@ -304,28 +557,25 @@ def show_login_page():
                         st.error("Please fill in all required fields")
                     else:
                         try:
-                            conn = sqlite3.connect('campus_food_system.db')
-                            c = conn.cursor()
-                            hashed_password = hash_password(reg_password)
-                            c.execute('''INSERT INTO users (username, password, email, full_name, phone) 
-                                         VALUES (?, ?, ?, ?, ?)''', 
-                                      (reg_username, hashed_password, reg_email, reg_full_name, reg_phone))
-                            conn.commit()
-                            conn.close()
+                            register_user(reg_username, reg_password, reg_email, reg_full_name, reg_phone)
                             st.success("Account created successfully! Please login.")
-                        except sqlite3.IntegrityError:
+                        except db.IntegrityError:
                             st.error("Username or email already exists")
+                        except passwords.LoginBusy as e:
+                            st.warning(str(e))
 
 def show_admin_dashboard():
-    st.sidebar.title(f"👨‍💼 Admin Panel")
+    st.sidebar.title("👨‍💼 Admin Panel")
     st.sidebar.write(f"Welcome, {st.session_state.user['full_name']}")
     
     if st.sidebar.button("Logout"):
-        st.session_state.logged_in = False
-        st.session_state.user = None
+        log_out()
         st.rerun()
     
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Dashboard", "🏪 Vendors", "🍽️ Food Items", "📋 Orders", "👥 Users"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs(["📊 Dashboard", "🏪 Vendors", "🍽️ Food Items",
+                                                                    "📋 Orders", "👥 Users", "📤 Export",
+                                                                    "⏱️ Performance", "🧑‍🍳 Live Board",
+                                                                    "📈 Analytics"])
     
     with tab1:
         show_admin_dashboard_stats()
@@ -341,47 +591,72 @@ def show_admin_dashboard():
     
     with tab5:
         show_user_management()
+    
+    with tab6:
+        show_export()
+    
+    with tab7:
+        show_performance()
+    
+    with tab8:
+        show_live_board()
+    
+    with tab9:
+        show_analytics()
 
 def show_admin_dashboard_stats():
     st.header("📊 System Overview")
     
     # Get statistics
-    conn = sqlite3.connect('campus_food_system.db')
-    
-    # Total counts
-    total_users = pd.read_sql_query("SELECT COUNT(*) as count FROM users WHERE user_type != 'admin'", conn).iloc[0]['count']
-    total_vendors = pd.read_sql_query("SELECT COUNT(*) as count FROM vendors WHERE is_active = 1", conn).iloc[0]['count']
-    total_orders = pd.read_sql_query("SELECT COUNT(*) as count FROM orders", conn).iloc[0]['count']
-    total_revenue = pd.read_sql_query("SELECT COALESCE(SUM(total_amount), 0) as revenue FROM orders WHERE status != 'cancelled'", conn).iloc[0]['revenue']
+    stats = get_dashboard_stats()
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Users", total_users)
+        st.metric("Total Users", stats['total_users'])
     with col2:
-        st.metric("Active Vendors", total_vendors)
+        st.metric("Active Vendors", stats['total_vendors'])
     with col3:
-        st.metric("Total Orders", total_orders)
+        st.metric("Total Orders", stats['total_orders'])
     with col4:
-        st.metric("Total Revenue", f"₦{total_revenue:,.2f}")
-    
-    # Recent orders
-    st.subheader("📋 Recent Orders")
-    recent_orders = pd.read_sql_query("""
-        SELECT o.order_number, o.created_at, o.status, o.total_amount, 
-               v.name as vendor_name, u.full_name as customer_name
-        FROM orders o 
-        JOIN vendors v ON o.vendor_id = v.id 
-        JOIN users u ON o.customer_id = u.id
-        ORDER BY o.created_at DESC LIMIT 10
-    """, conn)
-    
-    if not recent_orders.empty:
-        st.dataframe(recent_orders, use_container_width=True)
-    else:
-        st.info("No orders yet")
+        st.metric("Total Revenue", f"₦{stats['total_revenue']:,.2f}")
     
-    conn.close()
+    # Charts and recent orders read the analytics snapshot (see snapshot.py),
+    # so these queries never compete with checkouts for the live database
+    with snapshot.reading() as as_of:
+        if as_of is not None:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.caption(f"Charts show data as of {as_of:%Y-%m-%d %H:%M:%S}, "
+                           f"refreshed every {snapshot.REFRESH_SECONDS / 60:g} min")
+            with col2:
+                st.button("Refresh now", key="snapshot_refresh", on_click=snapshot.take)
+        
+        # Revenue over the last 30 days
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("📈 Daily Revenue (30 days)")
+            daily_revenue = get_daily_revenue()
+            if not daily_revenue.empty:
+                st.line_chart(daily_revenue.set_index('day')['revenue'])
+            else:
+                st.info("No sales in this period")
+        with col2:
+            st.subheader("🏪 Revenue by Vendor (30 days)")
+            vendor_revenue = get_vendor_revenue()
+            if not vendor_revenue.empty:
+                st.bar_chart(vendor_revenue.set_index('vendor_name')['revenue'])
+            else:
+                st.info("No sales in this period")
+        
+        # Recent orders
+        st.subheader("📋 Recent Orders")
+        recent_orders = get_recent_orders()
+        
+        if not recent_orders.empty:
+            st.dataframe(recent_orders, use_container_width=True)
+        else:
+            st.info("No orders yet")
 
 def show_vendor_management():
     st.header("🏪 Vendor Management")
@@ -389,11 +664,8 @@ def show_vendor_management():
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        vendors = get_vendors()
-        if not vendors.empty:
-            st.dataframe(vendors, use_container_width=True)
-        else:
-            st.info("No vendors found")
+        grid.show_grid("vendors_grid", VENDORS_GRID,
+                       filters=[("Status", "is_active", {1: "Active", 0: "Inactive"})])
     
     with col2:
         st.subheader("Add New Vendor")
@@ -407,41 +679,37 @@ def show_vendor_management():
             
             if st.form_submit_button("Add Vendor"):
                 if name and location:
-                    conn = sqlite3.connect('campus_food_system.db')
-                    c = conn.cursor()
-                    c.execute('''INSERT INTO vendors (name, description, location, contact_phone, contact_email, operating_hours) 
-                                 VALUES (?, ?, ?, ?, ?, ?)''', 
-                              (name, description, location, phone, email, hours))
-                    conn.commit()
-                    conn.close()
-                    st.success("Vendor added successfully!")
-                    st.rerun()
+                    try:
+                        add_vendor(name, description, location, phone, email, hours)
+                        st.success("Vendor added successfully!")
+                        st.rerun()
+                    except db.IntegrityError:
+                        st.error("A vendor with this name already exists at that location")
                 else:
                     st.error("Name and location are required")
 
 def show_food_management():
     st.header("🍽️ Food Items Management")
     
-    vendors = get_vendors()
-    if vendors.empty:
+    vendor_names = get_vendor_names()
+    if not vendor_names:
         st.warning("Please add vendors first")
         return
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        food_items = get_food_items()
-        if not food_items.empty:
-            st.dataframe(food_items[['name', 'vendor_name', 'price', 'category', 'is_available']], use_container_width=True)
-        else:
-            st.info("No food items found")
+        grid.show_grid("food_grid", FOOD_GRID, filters=[
+            ("Vendor", "fi.vendor_id", vendor_names),
+            ("Available", "fi.is_available", {1: "Yes", 0: "No"}),
+        ])
     
     with col2:
         st.subheader("Add Food Item")
         with st.form("add_food_form"):
             vendor_id = st.selectbox("Select Vendor", 
-                                     options=vendors['id'].tolist(),
-                                     format_func=lambda x: vendors[vendors['id'] == x]['name'].iloc[0])
+                                     options=list(vendor_names),
+                                     format_func=vendor_names.get)
             name = st.text_input("Food Name")
             description = st.text_area("Description")
             price = st.number_input("Price (₦)", min_value=0.0, step=50.0)
@@ -450,24 +718,127 @@ def show_food_management():
             
             if st.form_submit_button("Add Food Item"):
                 if name and price > 0:
-                    conn = sqlite3.connect('campus_food_system.db')
-                    c = conn.cursor()
-                    c.execute('''INSERT INTO food_items (vendor_id, name, description, price, category, preparation_time) 
-                                 VALUES (?, ?, ?, ?, ?, ?)''', 
-                              (vendor_id, name, description, price, category, prep_time))
-                    conn.commit()
-                    conn.close()
-                    st.success("Food item added successfully!")
-                    st.rerun()
+                    try:
+                        add_food_item(vendor_id, name, description, price, category, prep_time)
+                        st.success("Food item added successfully!")
+                        st.rerun()
+                    except db.IntegrityError:
+                        st.error("This vendor already has a food item with that name")
                 else:
                     st.error("Name and valid price are required")
 
+def reset_order_pager(key):
+    st.session_state[f"{key}_cursor"] = None
+    st.session_state[f"{key}_page_no"] = 1
+
+def _move_order_pager(key, direction, row, page_no):
+    st.session_state[f"{key}_cursor"] = (direction, (row['created_at'], int(row['id'])))
+    st.session_state[f"{key}_page_no"] = page_no
+
+def fetch_order_page(key, **filters):
+    cursor = st.session_state.get(f"{key}_cursor")
+    if cursor and cursor[0] == 'before':
+        return get_orders_page(before=cursor[1], **filters)
+    return get_orders_page(after=cursor[1] if cursor else None, **filters)
+
+def show_order_pager(key, page, has_more):
+    # Previous/Next controls for a page returned by fetch_order_page()
+    page_no = st.session_state.get(f"{key}_page_no", 1)
+    cursor = st.session_state.get(f"{key}_cursor")
+    going_back = cursor is not None and cursor[0] == 'before'
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("← Previous", key=f"{key}_prev", disabled=page.empty or page_no <= 1,
+                  on_click=_move_order_pager, args=(key, 'before', page.iloc[0] if not page.empty else None, page_no - 1))
+    with col2:
+        st.caption(f"Page {page_no}")
+    with col3:
+        st.button("Next →", key=f"{key}_next", disabled=page.empty or not (going_back or has_more),
+                  on_click=_move_order_pager, args=(key, 'after', page.iloc[-1] if not page.empty else None, page_no + 1))
+
+def apply_bulk_status(key, filters):
+    status = st.session_state.get(f"{key}_bulk_status")
+    if st.session_state.get(f"{key}_bulk_all"):
+        changed = update_matching_orders_status(filters, status)
+        message = f"{changed} matching order{'s' if changed != 1 else ''} moved to {status}"
+        st.session_state[f"{key}_bulk_confirm"] = False
+    else:
+        order_ids = st.session_state.get(f"{key}_bulk_orders") or []
+        changed = update_orders_status(order_ids, status)
+        skipped = len(order_ids) - changed
+        message = f"{changed} order{'s' if changed != 1 else ''} moved to {status}"
+        if skipped:
+            message += f"; {skipped} skipped (can't move to {status} from their current status)"
+    st.session_state[f"{key}_bulk_result"] = message
+    st.session_state[f"{key}_bulk_orders"] = []
+    st.session_state[f"{key}_bulk_all"] = False
+
+def show_bulk_status_update(key, orders, filters):
+    # One UPDATE for every selected order instead of an Update click (and a
+    # full rerun) per order. With "all matching" on, the UPDATE covers every
+    # order the filters match, across all pages, once the count is confirmed.
+    result = st.session_state.pop(f"{key}_bulk_result", None)
+    if result:
+        st.success(result)
+    labels = dict(zip(orders['id'].tolist(),
+                      (f"#{number} ({status})" for number, status in zip(orders['order_number'], orders['status']))))
+    targets = [status for status in ORDER_STATUSES
+               if any(status in allowed for allowed in ALLOWED_TRANSITIONS.values())]
+    # Drop selections left over from another page before the widget is drawn
+    selected_key = f"{key}_bulk_orders"
+    st.session_state[selected_key] = [order_id for order_id in st.session_state.get(selected_key, [])
+                                      if order_id in labels]
+    filtered = any(filters.values())
+    if not filtered:
+        st.session_state[f"{key}_bulk_all"] = False
+    all_matching = st.checkbox("Apply to all orders matching the current filters", key=f"{key}_bulk_all",
+                               disabled=not filtered, help=None if filtered else "Set a filter first")
+    col1, col2, col3 = st.columns([4, 2, 1])
+    with col1:
+        st.multiselect("Orders on this page", list(labels), format_func=labels.get, key=selected_key,
+                       placeholder="Choose orders to update together", disabled=all_matching)
+    with col2:
+        status = st.selectbox("Move to", targets, key=f"{key}_bulk_status")
+    ready = bool(st.session_state[selected_key])
+    if all_matching:
+        matching = count_matching_orders(filters, status)
+        with col1:
+            ready = st.checkbox(f"Move {matching:,} matching order{'s' if matching != 1 else ''} to {status}",
+                                key=f"{key}_bulk_confirm", disabled=matching == 0)
+    with col3:
+        st.button("Apply", key=f"{key}_bulk_apply", on_click=apply_bulk_status, args=(key, filters),
+                  disabled=not ready)
+
 def show_order_management():
     st.header("📋 Order Management")
     
-    orders = get_orders()
+    vendor_names = get_vendor_names()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        status_filter = st.selectbox("Status", ["All"] + ORDER_STATUSES, key="admin_orders_status",
+                                     on_change=reset_order_pager, args=("admin_orders",))
+    with col2:
+        vendor_filter = st.selectbox("Vendor", [None] + list(vendor_names), key="admin_orders_vendor",
+                                     format_func=lambda x: "All" if x is None else vendor_names[x],
+                                     on_change=reset_order_pager, args=("admin_orders",))
+    with col3:
+        date_range = st.date_input("Date range", value=(), key="admin_orders_dates",
+                                   on_change=reset_order_pager, args=("admin_orders",))
+    
+    filters = {
+        'status': None if status_filter == "All" else status_filter,
+        'vendor_id': vendor_filter,
+        'start_date': date_range[0] if len(date_range) > 0 else None,
+        'end_date': date_range[1] if len(date_range) > 1 else None,
+    }
+    orders, has_more = fetch_order_page("admin_orders", **filters)
     
     if not orders.empty:
+        with st.expander("Bulk status update"):
+            show_bulk_status_update("admin_orders", orders, filters)
+        
+        details = load_open_order_details(orders, "admin_items_")
         for idx, order in orders.iterrows():
             with st.expander(f"Order #{order['order_number']} - {order['status'].title()} - ₦{order['total_amount']:,.2f}"):
                 col1, col2, col3 = st.columns(3)
@@ -488,62 +859,257 @@ def show_order_management():
                     
                     new_status = st.selectbox(
                         "Update Status",
-                        ["pending", "confirmed", "preparing", "ready", "delivered", "cancelled"],
-                        index=["pending", "confirmed", "preparing", "ready", "delivered", "cancelled"].index(order['status']),
+                        ORDER_STATUSES,
+                        index=ORDER_STATUSES.index(order['status']),
                         key=f"status_{order['id']}"
                     )
                     
-                    if st.button(f"Update", key=f"update_{order['id']}"):
+                    if st.button("Update", key=f"update_{order['id']}"):
                         update_order_status(order['id'], new_status)
                         st.success("Status updated!")
                         st.rerun()
                 
                 # Show order details
-                order_details = get_order_details(order['id'])
-                if not order_details.empty:
-                    st.write("**Order Items:**")
-                    for _, item in order_details.iterrows():
-                        st.write(f"- {item['food_name']} x {item['quantity']} = ₦{item['subtotal']:,.2f}")
+                if st.toggle("Show items", key=f"admin_items_{order['id']}"):
+                    order_details = details.get(order['id'])
+                    if order_details is not None:
+                        st.write("**Order Items:**")
+                        for _, item in order_details.iterrows():
+                            st.write(f"- {item['food_name']} x {item['quantity']} = ₦{item['subtotal']:,.2f}")
+        
+        show_order_pager("admin_orders", orders, has_more)
     else:
         st.info("No orders found")
 
+    # Orders older than ARCHIVE_AFTER_DAYS live in the Parquet archive and are
+    # only read when asked for here
+    if st.toggle("Include archived orders", key="admin_orders_history"):
+        try:
+            history = archive.order_history(
+                vendor_id=vendor_filter,
+                status=None if status_filter == "All" else status_filter,
+                start_date=date_range[0] if len(date_range) > 0 else None,
+                end_date=date_range[1] if len(date_range) > 1 else None,
+                include_archive=True,
+            )
+        except ImportError:
+            st.error("Reading the archive needs pyarrow installed.")
+        else:
+            st.caption(f"Newest {len(history):,} orders, live and archived")
+            st.dataframe(history[['order_number', 'created_at', 'vendor_name', 'status', 'total_amount', 'archived']],
+                         use_container_width=True, hide_index=True)
+
+def show_live_board():
+    st.header("🧑‍🍳 Live Order Board")
+    
+    vendor_names = get_vendor_names()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        vendor_id = st.selectbox("Vendor", [None] + list(vendor_names), key="board_vendor",
+                                 format_func=lambda x: "All vendors" if x is None else vendor_names[x])
+    with col2:
+        # Off by default: tabs all run on every rerun, and the board polls while shown
+        live = st.toggle("Live", key="board_live")
+    if not live:
+        st.info("Switch on Live to follow active orders as they change.")
+        return
+    
+    board = st.session_state.get('order_board')
+    if board is None or board.vendor_id != vendor_id:
+        board = order_board.OrderBoard(vendor_id)
+        st.session_state.order_board = board
+    show_order_board(board)
+
+def advance_order(board, order_id, status):
+    update_order_status(order_id, status)
+    board.refresh()
+
+@st.fragment(run_every=order_board.REFRESH_SECONDS)
+def show_order_board(board):
+    # Reruns on its own timer; each run reads only the orders changed since the last one
+    changed = board.refresh()
+    st.caption(f"{len(board.orders)} active orders · {changed} changed · "
+               f"updated {board.refreshed_at:%H:%M:%S}")
+    
+    columns = st.columns(len(order_board.ACTIVE_STATUSES))
+    for column, (status, entries) in zip(columns, board.by_status().items()):
+        next_status = ORDER_STATUSES[ORDER_STATUSES.index(status) + 1]
+        with column:
+            st.subheader(f"{status.title()} ({len(entries)})")
+            for entry in entries:
+                order = entry['order']
+                with st.container(border=True):
+                    st.write(f"**#{order.order_number}** · ₦{order.total_amount:,.2f}")
+                    st.caption(f"{order.customer_name} · {order.vendor_name} · {order.created_at}")
+                    for name, quantity in entry['items']:
+                        st.write(f"- {name} x {quantity}")
+                    if order.special_instructions:
+                        st.caption(f"📝 {order.special_instructions}")
+                    st.button(f"Mark {next_status}", key=f"board_{order.id}",
+                              on_click=advance_order, args=(board, order.id, next_status))
+
 def show_user_management():
     st.header("👥 User Management")
     
-    conn = sqlite3.connect('campus_food_system.db')
-    users = pd.read_sql_query("SELECT id, username, email, full_name, phone, user_type, created_at FROM users", conn)
-    conn.close()
+    grid.show_grid("users_grid", USERS_GRID,
+                   filters=[("Type", "user_type", {"customer": "Customer", "admin": "Admin"})])
+
+def show_export():
+    st.header("📤 Export")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        report = st.selectbox("Report", list(export.REPORTS), format_func=lambda x: export.REPORTS[x]['label'],
+                              key="export_report")
+    with col2:
+        fmt = st.radio("Format", export.FORMATS, format_func=str.upper, horizontal=True, key="export_format")
+    with col3:
+        date_range = st.date_input("Date range", value=(), key="export_dates")
+    start_date = date_range[0] if len(date_range) > 0 else None
+    end_date = date_range[1] if len(date_range) > 1 else None
+    # Daily sales already count archived orders; order lines only include them when asked
+    include_archived = report == 'orders' and st.checkbox(
+        "Include archived orders", key="export_archived",
+        help=f"Orders older than {archive.ARCHIVE_AFTER_DAYS} days are moved to the archive")
+    
+    if st.button("Prepare export", type="primary"):
+        # Written to a temp file chunk by chunk, so only one chunk is in memory
+        # while the report is built
+        previous = st.session_state.pop('export_file', None)
+        if previous and os.path.exists(previous['path']):
+            os.remove(previous['path'])
+        remove_stale_exports()
+        fd, path = tempfile.mkstemp(prefix=EXPORT_FILE_PREFIX, suffix=f".{fmt}")
+        os.close(fd)
+        progress = st.empty()
+        rows = 0
+        try:
+            for rows in export.export(report, path, fmt, start_date, end_date, include_archived=include_archived):
+                progress.caption(f"{rows:,} rows written...")
+        except ImportError:
+            os.remove(path)
+            st.error("Parquet export and archived orders need pyarrow installed.")
+        else:
+            progress.empty()
+            st.session_state.export_file = {'path': path, 'rows': rows,
+                                            'name': export.file_name(report, fmt, start_date, end_date)}
+    
+    export_file = st.session_state.get('export_file')
+    if export_file and os.path.exists(export_file['path']):
+        st.caption(f"{export_file['name']}: {export_file['rows']:,} rows")
+        # The file is only read when the button is clicked, not on every rerun
+        # that shows the button, and clicking it does not rerun the page
+        st.download_button("Download", lambda: _read_file(export_file['path']), file_name=export_file['name'],
+                           key="export_download", on_click="ignore")
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def remove_stale_exports():
+    # Sessions that end without exporting again leave their file behind
+    cutoff = time.time() - EXPORT_FILE_TTL
+    directory = tempfile.gettempdir()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(EXPORT_FILE_PREFIX):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                # Already removed by another session
+                pass
+
+def show_performance():
+    st.header("⏱️ Performance")
+    
+    if not instrumentation.ENABLED:
+        st.info("Query and page timing is off. Set INSTRUMENTATION = true in the app settings to collect it.")
+        return
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(f"Collected by this app process since {instrumentation.collecting_since():%Y-%m-%d %H:%M:%S}")
+    with col2:
+        if st.button("Reset", key="performance_reset"):
+            instrumentation.reset()
+            st.rerun()
     
-    if not users.empty:
-        st.dataframe(users, use_container_width=True)
+    st.subheader("Page timings")
+    st.dataframe(instrumentation.timing_stats(), use_container_width=True, hide_index=True)
+    
+    st.subheader("Top queries by total time")
+    top = st.slider("Queries shown", 5, 100, 20, key="performance_top")
+    queries = instrumentation.query_stats(top)
+    st.dataframe(queries, use_container_width=True, hide_index=True)
+    if queries:
+        query = st.selectbox("Latency histogram for", [row['query'] for row in queries], key="performance_query")
+        st.dataframe([instrumentation.histogram(query)], use_container_width=True, hide_index=True)
+    
+    st.subheader(f"Slow queries (over {instrumentation.SLOW_QUERY_MS:g} ms)")
+    slow = instrumentation.slow_queries()
+    if slow:
+        st.dataframe(slow, use_container_width=True, hide_index=True)
     else:
-        st.info("No users found")
+        st.info("No slow queries recorded")
+
+def show_analytics():
+    st.header("📈 Sales Analytics")
+    
+    days = st.selectbox("Period", list(analytics.WINDOWS), index=1, format_func=analytics.WINDOWS.get,
+                        key="analytics_days")
+    # Loaded once per period and process, then topped up with changed orders
+    window, as_of = analytics.sales_window(days)
+    if as_of is not None:
+        st.caption(f"Data as of {as_of:%Y-%m-%d %H:%M:%S}")
+    if window.lines.empty:
+        st.info("No orders in this period")
+        return
+    
+    summary = window.report('summary', analytics.summary)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Orders", f"{summary['orders']:,}")
+    with col2:
+        st.metric("Revenue", f"₦{summary['revenue']:,.2f}")
+    with col3:
+        st.metric("Avg. Items per Order", f"{summary['basket_items']:.2f}")
+    with col4:
+        st.metric("Avg. Order Value", f"₦{summary['basket_value']:,.2f}")
+    
+    st.subheader("🏆 Top Selling Items")
+    top = window.report('top_items', analytics.top_items, 10)
+    names = analytics.item_names(top['food_item_id'])
+    top = top.assign(item=top['food_item_id'].map(names))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.bar_chart(top.set_index('item')['quantity'])
+    with col2:
+        st.dataframe(top[['item', 'quantity', 'orders', 'revenue']], use_container_width=True, hide_index=True)
+    
+    st.subheader("🕒 Orders by Hour")
+    st.dataframe(window.report('hourly_demand', analytics.hourly_demand), use_container_width=True)
+    
+    st.subheader("🏪 Vendor Performance")
+    vendor_names = get_vendor_names()
+    vendors = window.report('vendor_performance', analytics.vendor_performance)
+    vendors = vendors.assign(vendor=vendors['vendor_id'].map(vendor_names))
+    vendors = vendors.assign(cancelled_pct=(vendors['cancel_rate'] * 100).round(1))
+    st.dataframe(vendors[['vendor', 'orders', 'revenue', 'basket_items', 'basket_value', 'preparation_time',
+                          'cancelled', 'cancelled_pct']].round(2),
+                 use_container_width=True, hide_index=True)
+    st.caption("Prep time is the quoted preparation time of each order's slowest item, in minutes.")
 
 def show_customer_dashboard():
     st.sidebar.title(f"👋 Welcome, {st.session_state.user['full_name']}")
     
     if st.sidebar.button("Logout"):
-        st.session_state.logged_in = False
-        st.session_state.user = None
-        st.session_state.cart = []
-        st.session_state.page = 'main'
+        log_out()
+        reset_order_pager("my_orders")
         st.rerun()
     
-    # Cart summary in sidebar
-    if st.session_state.cart:
-        st.sidebar.subheader("🛒 Your Cart")
-        total = sum(item['subtotal'] for item in st.session_state.cart)
-        st.sidebar.write(f"Items: {len(st.session_state.cart)}")
-        st.sidebar.write(f"Total: ₦{total:,.2f}")
-        
-        if st.sidebar.button("View Cart & Checkout"):
-            st.session_state.page = 'cart'
-            st.rerun()
-    
-    # Clear cart button
-    if st.session_state.cart and st.sidebar.button("Clear Cart"):
-        st.session_state.cart = []
-        st.rerun()
+    with st.sidebar:
+        show_cart_summary()
     
     # Page navigation
     if st.session_state.page == 'cart':
@@ -561,6 +1127,90 @@ def show_customer_dashboard():
         with tab3:
             show_customer_orders()
 
+@st.fragment(run_every=CART_SUMMARY_REFRESH, key="cart_summary")
+def show_cart_summary():
+    # Cart summary in sidebar
+    added = st.session_state.pop('cart_added', None)
+    if added:
+        st.toast(added)
+    if st.session_state.cart:
+        st.subheader("🛒 Your Cart")
+        st.write(f"Items: {len(st.session_state.cart)}")
+        st.write(f"Total: ₦{st.session_state.cart.total:,.2f}")
+        
+        if st.button("View Cart & Checkout"):
+            st.session_state.page = 'cart'
+            st.rerun()
+    
+    # Clear cart button
+    if st.session_state.cart and st.button("Clear Cart"):
+        st.session_state.cart.clear()
+        st.rerun()
+
+@st.fragment
+def show_food_card(item, key_prefix, show_vendor=False, compact=False):
+    # Runs as its own fragment: changing the quantity or adding to the cart
+    # reruns just this card
+    if compact:
+        # One line and a single control that adds one portion
+        st.write(f"**{item['name']}** · ₦{item['price']:,.2f}")
+        st.button("Add", key=f"{key_prefix}add_{item['id']}", on_click=add_to_cart, args=(item,))
+        return
+    
+    st.subheader(item['name'])
+    if show_vendor:
+        st.write(f"🏪 {item['vendor_name']}")
+    st.write(item['description'])
+    st.write(f"💰 **₦{item['price']:,.2f}**")
+    st.write(f"⏱️ {item['preparation_time']} mins")
+    
+    quantity_key = f"{key_prefix}qty_{item['id']}"
+    quantity = st.number_input("Quantity", min_value=0, max_value=10, key=quantity_key)
+    
+    st.button("Add to Cart", key=f"{key_prefix}add_{item['id']}", disabled=quantity == 0,
+              help="Select a quantity first" if quantity == 0 else None,
+              on_click=add_to_cart, args=(item, quantity_key))
+
+def show_offset_pager(key, total, page_size):
+    # Previous/Next controls over an in-memory list. Returns the slice start
+    # of the current page, which is kept in st.session_state[key].
+    pages = max(1, -(-total // page_size))
+    page_no = min(st.session_state.get(key, 1), pages)
+    if pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("← Previous", key=f"{key}_prev", disabled=page_no <= 1,
+                      on_click=grid.set_page, args=(key, page_no - 1))
+        with col2:
+            st.caption(f"Page {page_no} of {pages}")
+        with col3:
+            st.button("Next →", key=f"{key}_next", disabled=page_no >= pages,
+                      on_click=grid.set_page, args=(key, page_no + 1))
+    return (page_no - 1) * page_size
+
+@st.fragment
+def show_vendor_menu(vendor_id, compact):
+    # One vendor's menu, filtered by category and paged. Runs as a fragment
+    # so paging through it leaves the rest of the page alone.
+    food_items = get_food_items(vendor_id)
+    if food_items.empty:
+        st.info("No food items available from this vendor")
+        return
+    
+    categories = sorted(food_items['category'].dropna().unique())
+    if len(categories) > 1:
+        category = st.selectbox("Category", ["All"] + categories, key=f"menu_category_{vendor_id}",
+                                on_change=grid.set_page, args=(f"menu_page_{vendor_id}", 1))
+        if category != "All":
+            food_items = food_items[food_items['category'] == category]
+    
+    start = show_offset_pager(f"menu_page_{vendor_id}", len(food_items), MENU_PAGE_SIZE)
+    columns = 4 if compact else 3
+    cols = st.columns(columns)
+    for i, (idx, item) in enumerate(food_items.iloc[start:start + MENU_PAGE_SIZE].iterrows()):
+        with cols[i % columns]:
+            show_food_card(item, "", compact=compact)
+
 def show_browse_food():
     st.header("🍽️ Browse Food by Vendor")
     
@@ -570,34 +1220,30 @@ def show_browse_food():
         st.info("No vendors available at the moment")
         return
     
-    for idx, vendor in vendors.iterrows():
-        with st.expander(f"🏪 {vendor['name']} - {vendor['location']}", expanded=True):
-            st.write(vendor['description'])
-            st.write(f"📍 **Location:** {vendor['location']}")
-            st.write(f"⏰ **Hours:** {vendor['operating_hours']}")
-            
-            food_items = get_food_items(vendor['id'])
-            
-            if not food_items.empty:
-                cols = st.columns(3)
-                for i, (idx, item) in enumerate(food_items.iterrows()):
-                    with cols[i % 3]:
-                        st.subheader(item['name'])
-                        st.write(item['description'])
-                        st.write(f"💰 **₦{item['price']:,.2f}**")
-                        st.write(f"⏱️ {item['preparation_time']} mins")
-                        
-                        quantity = st.number_input(f"Quantity", min_value=0, max_value=10, key=f"qty_{item['id']}")
-                        
-                        if st.button(f"Add to Cart", key=f"add_{item['id']}"):
-                            if quantity > 0:
-                                add_to_cart(item, quantity)
-                                st.success(f"Added {quantity}x {item['name']} to cart!")
-                                st.rerun() 
-                            else:
-                                st.warning("Please select quantity")
-            else:
-                st.info("No food items available from this vendor")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        vendor_filter = st.text_input("Filter vendors by name or location", key="browse_vendor_filter",
+                                      on_change=grid.set_page, args=("browse_vendor_page", 1))
+    with col2:
+        compact = st.toggle("Compact grid", key="browse_compact")
+    
+    if vendor_filter:
+        matches = (vendors['name'].str.contains(vendor_filter, case=False, regex=False, na=False)
+                   | vendors['location'].str.contains(vendor_filter, case=False, regex=False, na=False))
+        vendors = vendors[matches]
+        if vendors.empty:
+            st.info("No vendors match that filter")
+            return
+    
+    # Vendors start collapsed; a menu is only queried and drawn once its
+    # toggle is switched on
+    start = show_offset_pager("browse_vendor_page", len(vendors), VENDORS_PAGE_SIZE)
+    for idx, vendor in vendors.iloc[start:start + VENDORS_PAGE_SIZE].iterrows():
+        with st.container(border=True):
+            st.subheader(f"🏪 {vendor['name']} - {vendor['location']}")
+            st.caption(f"{vendor['description'] or ''} · ⏰ {vendor['operating_hours'] or ''}")
+            if st.toggle("Show menu", key=f"menu_open_{vendor['id']}"):
+                show_vendor_menu(int(vendor['id']), compact)
 
 def show_search_food():
     st.header("🔍 Search Food Items")
@@ -613,52 +1259,34 @@ def show_search_food():
             cols = st.columns(3)
             for i, (idx, item) in enumerate(results.iterrows()):
                 with cols[i % 3]:
-                    st.subheader(item['name'])
-                    st.write(f"🏪 {item['vendor_name']}")
-                    st.write(item['description'])
-                    st.write(f"💰 **₦{item['price']:,.2f}**")
-                    st.write(f"⏱️ {item['preparation_time']} mins")
-                    
-                    quantity = st.number_input(f"Quantity", min_value=0, max_value=10, key=f"search_qty_{item['id']}")
-                    
-                    if st.button(f"Add to Cart", key=f"search_add_{item['id']}"):
-                        if quantity > 0:
-                            add_to_cart(item, quantity)
-                            st.success(f"Added {quantity}x {item['name']} to cart!")
-                            st.rerun() 
-                        else:
-                            st.warning("Please select quantity")
+                    show_food_card(item, "search_", show_vendor=True)
         else:
             st.info("No results found. Try different keywords.")
 
-def add_to_cart(item, quantity):
-    cart_item = {
-        'id': item['id'],
-        'name': item['name'],
-        'vendor_id': item['vendor_id'],
-        'vendor_name': item['vendor_name'],
-        'price': item['price'],
-        'quantity': quantity,
-        'subtotal': item['price'] * quantity
-    }
-    
-    # Check if item already in cart
-    existing_item_index = -1
-    for i, x in enumerate(st.session_state.cart):
-        if x['id'] == item['id']:
-            existing_item_index = i
-            break
-
-    if existing_item_index != -1:
-        # Update existing item's quantity and subtotal
-        st.session_state.cart[existing_item_index]['quantity'] += quantity
-        st.session_state.cart[existing_item_index]['subtotal'] = \
-            st.session_state.cart[existing_item_index]['price'] * st.session_state.cart[existing_item_index]['quantity']
+def add_to_cart(item, quantity_key=None):
+    # Button callback: only the sidebar summary is redrawn, and it shows the toast
+    if quantity_key is None:
+        st.session_state.cart.add(item, 1)
+        st.session_state.cart_added = f"Added {item['name']} to cart!"
     else:
-        # Add new item to cart
-        st.session_state.cart.append(cart_item)
+        quantity = st.session_state[quantity_key]
+        st.session_state.cart.add(item, quantity)
+        st.session_state.cart_added = f"Added {quantity}x {item['name']} to cart!"
+    st.rerun("cart_summary")
+
+def set_cart_quantity(food_item_id, quantity_key):
+    st.session_state.cart.set_quantity(food_item_id, st.session_state[quantity_key])
+    st.rerun(["cart_page", "cart_summary"])
 
+def remove_from_cart(item):
+    st.session_state.cart.remove(item['id'])
+    st.session_state.cart_added = f"{item['name']} removed from cart."
+    st.rerun(["cart_page", "cart_summary"])
+
+@st.fragment(key="cart_page")
 def show_cart_page():
+    # Quantity changes and removals rerun only the cart and the sidebar
+    # summary; leaving the page or checking out reruns the whole app
     st.header("🛒 Your Cart")
     
     if not st.session_state.cart:
@@ -673,27 +1301,17 @@ def show_cart_page():
         st.session_state.page = 'main'
         st.rerun()
     
-    # Group items by vendor
-    vendors_in_cart = {}
-    for item in st.session_state.cart:
-        vendor_id = item['vendor_id']
-        if vendor_id not in vendors_in_cart:
-            vendors_in_cart[vendor_id] = {
-                'name': item['vendor_name'],
-                'items': [],
-                'total': 0
-            }
-        vendors_in_cart[vendor_id]['items'].append(item)
-        vendors_in_cart[vendor_id]['total'] += item['subtotal']
+    # Items arrive grouped by vendor with running totals
+    vendors_in_cart = st.session_state.cart.vendors
     
     if len(vendors_in_cart) > 1:
         st.warning("⚠️ You have items from multiple vendors. Please place separate orders for each vendor.")
     
-    for vendor_id, vendor_info in vendors_in_cart.items():
+    for vendor_id, vendor_info in list(vendors_in_cart.items()):
         st.subheader(f"🏪 {vendor_info['name']}")
         
         # Display cart items
-        for item in vendor_info['items']:
+        for item in list(vendor_info['items'].values()):
             col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
             
             with col1:
@@ -701,25 +1319,19 @@ def show_cart_page():
             with col2:
                 st.write(f"₦{item['price']:,.2f}")
             with col3:
-                new_quantity = st.number_input(
+                st.number_input(
                     "Qty", 
                     min_value=1, 
                     max_value=10, 
                     value=item['quantity'], 
-                    key=f"cart_qty_{item['id']}"
+                    key=f"cart_qty_{item['id']}",
+                    on_change=set_cart_quantity,
+                    args=(item['id'], f"cart_qty_{item['id']}")
                 )
-                if new_quantity != item['quantity']:
-                    # Update quantity and subtotal directly in the cart item
-                    item['quantity'] = new_quantity
-                    item['subtotal'] = item['price'] * new_quantity
-                    st.rerun() 
             with col4:
                 st.write(f"₦{item['subtotal']:,.2f}")
             with col5:
-                if st.button("Remove", key=f"remove_{item['id']}"):
-                    st.session_state.cart.remove(item)
-                    st.success(f"{item['name']} removed from cart.")
-                    st.rerun() 
+                st.button("Remove", key=f"remove_{item['id']}", on_click=remove_from_cart, args=(item,))
         
         st.markdown("---")
         st.markdown(f"**Vendor Total: ₦{vendor_info['total']:,.2f}**")
@@ -734,17 +1346,14 @@ def show_cart_page():
                     order_number = create_order(
                         st.session_state.user['id'], 
                         vendor_id, 
-                        vendor_info['items'], 
+                        list(vendor_info['items'].values()), 
                         vendor_info['total'], 
                         delivery_location, 
                         special_instructions
                     )
                     st.success(f"Order #{order_number} placed successfully! You will be redirected to My Orders.")
                     # Remove ordered items from cart
-                    st.session_state.cart = [
-                        cart_item for cart_item in st.session_state.cart 
-                        if cart_item['vendor_id'] != vendor_id
-                    ]
+                    st.session_state.cart.clear(vendor_id)
                     st.session_state.page = 'orders'
                     st.rerun() 
                 except Exception as e:
@@ -756,9 +1365,10 @@ def show_cart_page():
 def show_customer_orders():
     st.header("📋 My Orders")
     
-    customer_orders = get_orders(st.session_state.user['id'])
+    customer_orders, has_more = fetch_order_page("my_orders", customer_id=st.session_state.user['id'])
     
     if not customer_orders.empty:
+        details = load_open_order_details(customer_orders, "my_items_")
         for idx, order in customer_orders.iterrows():
             with st.expander(f"Order #{order['order_number']} - {order['status'].title()} - ₦{order['total_amount']:,.2f}"):
                 col1, col2 = st.columns(2)
@@ -773,11 +1383,12 @@ def show_customer_orders():
                         st.write(f"**Instructions:** {order['special_instructions']}")
                 
                 # Show order items
-                order_details = get_order_details(order['id'])
-                if not order_details.empty:
-                    st.write("**Order Items:**")
-                    for _, item in order_details.iterrows():
-                        st.write(f"- {item['food_name']} x {item['quantity']} @ ₦{item['unit_price']:,.2f} = ₦{item['subtotal']:,.2f}")
+                if st.toggle("Show items", key=f"my_items_{order['id']}"):
+                    order_details = details.get(order['id'])
+                    if order_details is not None:
+                        st.write("**Order Items:**")
+                        for _, item in order_details.iterrows():
+                            st.write(f"- {item['food_name']} x {item['quantity']} @ ₦{item['unit_price']:,.2f} = ₦{item['subtotal']:,.2f}")
                 
                 # Add a cancellation option for pending orders
                 if order['status'] == 'pending':
@@ -785,8 +1396,43 @@ def show_customer_orders():
                         update_order_status(order['id'], 'cancelled')
                         st.success(f"Order #{order['order_number']} has been cancelled.")
                         st.rerun() 
+        
+        show_order_pager("my_orders", customer_orders, has_more)
     else:
         st.info("You haven't placed any orders yet.")
+    
+    # Orders older than ARCHIVE_AFTER_DAYS live in the Parquet archive and are
+    # only read when asked for here
+    if st.toggle("Show archived orders", key="my_orders_archived",
+                 help=f"Delivered and cancelled orders older than {archive.ARCHIVE_AFTER_DAYS} days"):
+        show_archived_orders(st.session_state.user['id'])
+
+def show_archived_orders(customer_id):
+    try:
+        orders = archive.read_archived_orders(customer_id=customer_id, limit=archive.HISTORY_LIMIT)
+    except ImportError:
+        st.error("Reading the archive needs pyarrow installed.")
+        return
+    if orders.empty:
+        st.info("You have no archived orders.")
+        return
+    
+    vendor_names = get_vendor_names()
+    open_ids = [int(order_id) for order_id in orders['id'] if st.session_state.get(f"archived_items_{order_id}")]
+    items = archive.read_archived_items(open_ids)
+    food_names = {}
+    if not items.empty:
+        placeholders = ", ".join("?" * items['food_item_id'].nunique())
+        food_names = dict(db.fetchall(f"SELECT id, name FROM food_items WHERE id IN ({placeholders})",
+                                      [int(i) for i in items['food_item_id'].unique()]))
+    for _, order in orders.iterrows():
+        with st.expander(f"Order #{order['order_number']} - {order['status'].title()} - ₦{order['total_amount']:,.2f}"):
+            st.write(f"**Vendor:** {vendor_names.get(int(order['vendor_id']), '')}")
+            st.write(f"**Order Date:** {order['created_at']}")
+            if st.toggle("Show items", key=f"archived_items_{order['id']}"):
+                for _, item in items[items['order_id'] == order['id']].iterrows():
+                    st.write(f"- {food_names.get(item['food_item_id'], 'Item')} x {int(item['quantity'])} "
+                             f"@ ₦{item['unit_price']:,.2f} = ₦{item['subtotal']:,.2f}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,312 @@
+"""Move old delivered and cancelled orders out of the live tables.
+
+Orders older than ARCHIVE_AFTER_DAYS are written, with their line items,
+to Parquet files partitioned by month and vendor under ARCHIVE_DIR, and
+then deleted from orders and order_items. Dashboard totals are unchanged:
+their sales are kept in archived_daily_sales (see migrations.py).
+
+    python archive.py                       # archive with the configured age
+    python archive.py --older-than-days 365 --dry-run
+
+order_history() reads live orders and, when asked, the archived
+partitions. Month partitions are walked newest first and reading stops
+once enough orders are found; within a month, filters are pushed down to
+pyarrow, so only the matching vendor partitions and row groups are read.
+Archive reads are cached until the next batch is archived.
+"""
+import argparse
+import functools
+import glob
+import os
+from datetime import datetime, timedelta, timezone
+
+import db
+import settings
+
+ARCHIVE_DIR = settings.get_setting('ARCHIVE_DIR', 'archive')
+ARCHIVE_AFTER_DAYS = settings.get_int('ARCHIVE_AFTER_DAYS', 180)
+ARCHIVE_BATCH_SIZE = settings.get_int('ARCHIVE_BATCH_SIZE', 5000)
+ARCHIVED_STATUSES = ("delivered", "cancelled")
+HISTORY_LIMIT = 1000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# The statements that pick and remove a batch, also plan-checked by
+# check_query_plans.py; archive_batch is a temp table of the batch's ids
+BATCH_QUERY = '''SELECT id FROM orders
+                 WHERE status = ? AND created_at < ?
+                 ORDER BY created_at, id
+                 LIMIT ?'''
+DELETE_BATCH = (
+    "DELETE FROM order_items WHERE order_id IN (SELECT id FROM archive_batch)",
+    "DELETE FROM orders WHERE id IN (SELECT id FROM archive_batch)",
+)
+# Touched after every committed batch; its mtime keys the read cache
+VERSION_FILE = ".version"
+
+def _write_partitions(frame, table, archive_dir, basename):
+    # Imported here so the app runs without pyarrow until the archive is used
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pq.write_to_dataset(pa.Table.from_pandas(frame, preserve_index=False),
+                        root_path=os.path.join(archive_dir, table),
+                        partition_cols=['month', 'vendor_id'],
+                        basename_template=basename + "-{i}.parquet",
+                        existing_data_behavior='overwrite_or_ignore')
+
+def _timestamps(series):
+    # Stored as text, like SQLite, so filters compare the same way on live and archived rows
+    import pandas as pd
+    return pd.to_datetime(series).dt.strftime(TIMESTAMP_FORMAT)
+
+def _pending_path(archive_dir, status):
+    return os.path.join(archive_dir, f".pending-{status}")
+
+def _remove_unfinished(archive_dir, status):
+    # A batch writes its file name and order ids here before its files, and
+    # removes it after the commit. If the marker is still there and those
+    # orders are still live, the batch never committed: its files go, so the
+    # orders (possibly batched differently on the retry) are archived once.
+    marker = _pending_path(archive_dir, status)
+    if not os.path.exists(marker):
+        return
+    with open(marker) as f:
+        basename, *order_ids = f.read().split()
+    placeholders = ", ".join("?" * len(order_ids))
+    committed = not order_ids or db.fetchone(f"SELECT COUNT(*) FROM orders WHERE id IN ({placeholders})",
+                                             [int(order_id) for order_id in order_ids])[0] == 0
+    if not committed:
+        for table in ("orders", "order_items"):
+            for path in glob.glob(os.path.join(archive_dir, table, "**", f"{basename}-*.parquet"), recursive=True):
+                os.remove(path)
+    os.remove(marker)
+
+def _touch_version(archive_dir):
+    with open(os.path.join(archive_dir, VERSION_FILE), "w") as f:
+        f.write(datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT))
+
+def _archive_version(archive_dir):
+    for path in (os.path.join(archive_dir, VERSION_FILE), os.path.join(archive_dir, "orders")):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+    return None
+
+def archive_batch(status, cutoff, batch_size=ARCHIVE_BATCH_SIZE, archive_dir=ARCHIVE_DIR):
+    """Archive up to batch_size orders with `status` created before `cutoff`.
+
+    Files are written before the rows are deleted, inside the same
+    transaction. Files left by a batch interrupted before its commit are
+    removed before the next batch runs, so nothing is duplicated.
+    Returns the number of orders archived.
+    """
+    _remove_unfinished(archive_dir, status)
+    with db.transaction() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM archive_batch")
+        conn.execute(f"INSERT INTO archive_batch (id) {BATCH_QUERY}", (status, cutoff, batch_size))
+        orders = db.query_df("SELECT * FROM orders WHERE id IN (SELECT id FROM archive_batch)")
+        if orders.empty:
+            return 0
+        items = db.query_df("SELECT * FROM order_items WHERE order_id IN (SELECT id FROM archive_batch)")
+
+        orders['created_at'] = _timestamps(orders['created_at'])
+        orders['updated_at'] = _timestamps(orders['updated_at'])
+        orders['month'] = orders['created_at'].str[:7]
+        orders['vendor_id'] = orders['vendor_id'].fillna(0).astype(int)
+        items = items.merge(orders[['id', 'month', 'vendor_id']].rename(columns={'id': 'order_id'}), on='order_id')
+
+        basename = f"{status}-{orders['id'].min()}-{orders['id'].max()}"
+        os.makedirs(archive_dir, exist_ok=True)
+        with open(_pending_path(archive_dir, status), "w") as f:
+            f.write("\n".join([basename] + [str(order_id) for order_id in orders['id']]))
+        _write_partitions(orders, "orders", archive_dir, basename)
+        _write_partitions(items, "order_items", archive_dir, basename)
+
+        conn.execute(f'''INSERT INTO archived_daily_sales (day, vendor_id, order_count, revenue)
+                         SELECT {db.sql_day('created_at')}, COALESCE(vendor_id, 0), COUNT(*),
+                                COALESCE(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0)
+                         FROM orders WHERE id IN (SELECT id FROM archive_batch)
+                         GROUP BY {db.sql_day('created_at')}, COALESCE(vendor_id, 0)
+                         ON CONFLICT (day, vendor_id) DO UPDATE
+                         SET order_count = archived_daily_sales.order_count + excluded.order_count,
+                             revenue = archived_daily_sales.revenue + excluded.revenue''')
+        # The stats delete trigger skips rows while this is set
+        conn.execute("UPDATE stats_counters SET value = 1 WHERE name = 'archive_in_progress'")
+        for statement in DELETE_BATCH:
+            conn.execute(statement)
+        conn.execute("UPDATE stats_counters SET value = 0 WHERE name = 'archive_in_progress'")
+        conn.execute("DELETE FROM archive_batch")
+    os.remove(_pending_path(archive_dir, status))
+    _touch_version(archive_dir)
+    return len(orders)
+
+def archive_orders(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, archive_dir=ARCHIVE_DIR):
+    # Yields the number of orders archived after each committed batch
+    cutoff = _cutoff(older_than_days)
+    for status in ARCHIVED_STATUSES:
+        while True:
+            count = archive_batch(status, cutoff, batch_size, archive_dir)
+            if not count:
+                break
+            yield count
+
+def _cutoff(older_than_days):
+    # created_at is CURRENT_TIMESTAMP, which is UTC
+    return (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime(TIMESTAMP_FORMAT)
+
+def count_archivable(older_than_days=ARCHIVE_AFTER_DAYS):
+    cutoff = _cutoff(older_than_days)
+    placeholders = ", ".join("?" * len(ARCHIVED_STATUSES))
+    return db.fetchone(f"SELECT COUNT(*) FROM orders WHERE status IN ({placeholders}) AND created_at < ?",
+                       ARCHIVED_STATUSES + (cutoff,))[0]
+
+def _months(path, start_date=None, end_date=None, newest_first=True):
+    # The month=YYYY-MM partitions under `path` that can hold rows in the date range
+    months = sorted((name[len("month="):] for name in os.listdir(path) if name.startswith("month=")),
+                    reverse=newest_first)
+    if start_date:
+        months = [month for month in months if month >= start_date.strftime('%Y-%m')]
+    if end_date:
+        months = [month for month in months if month <= end_date.strftime('%Y-%m')]
+    return months
+
+def _date_filters(start_date=None, end_date=None):
+    filters = []
+    if start_date:
+        filters.append(('created_at', '>=', start_date.strftime('%Y-%m-%d')))
+    if end_date:
+        filters.append(('created_at', '<', (end_date + timedelta(days=1)).strftime('%Y-%m-%d')))
+    return filters
+
+@functools.lru_cache(maxsize=32)
+def _read_archived_orders(version, archive_dir, limit, customer_id, vendor_id, status, start_date, end_date):
+    # `version` is only part of the cache key: a new batch starts a new entry
+    # pandas is imported on use, as in db.py, so importing this module stays cheap
+    import pandas as pd
+    path = os.path.join(archive_dir, "orders")
+    if not os.path.isdir(path):
+        return pd.DataFrame()
+    filters = _date_filters(start_date, end_date)
+    if customer_id:
+        filters.append(('customer_id', '=', int(customer_id)))
+    if vendor_id:
+        filters.append(('vendor_id', '=', int(vendor_id)))
+    if status:
+        filters.append(('status', '=', status))
+    frames = []
+    found = 0
+    for month in _months(path, start_date, end_date):
+        orders = pd.read_parquet(os.path.join(path, f"month={month}"), engine='pyarrow', filters=filters or None)
+        frames.append(orders)
+        found += len(orders)
+        # Every later month is older than the `limit` orders already found
+        if limit and found >= limit:
+            break
+    if not frames:
+        return pd.DataFrame()
+    orders = pd.concat(frames, ignore_index=True).sort_values(['created_at', 'id'], ascending=False)
+    return orders.head(limit) if limit else orders
+
+def read_archived_orders(customer_id=None, vendor_id=None, status=None, start_date=None, end_date=None,
+                         limit=None, archive_dir=ARCHIVE_DIR):
+    """The newest `limit` (default all) archived orders matching the filters, newest first."""
+    return _read_archived_orders(_archive_version(archive_dir), archive_dir, limit, customer_id, vendor_id,
+                                 status, start_date, end_date).copy()
+
+def read_archived_items(order_ids, archive_dir=ARCHIVE_DIR):
+    import pandas as pd
+    path = os.path.join(archive_dir, "order_items")
+    if not os.path.isdir(path) or not order_ids:
+        return pd.DataFrame()
+    items = pd.read_parquet(path, engine='pyarrow', filters=[('order_id', 'in', [int(i) for i in order_ids])])
+    return items.drop(columns=['month', 'vendor_id'])
+
+def iter_archived_lines(start_date=None, end_date=None, archive_dir=ARCHIVE_DIR):
+    """Archived orders joined to their items, one month per DataFrame, oldest first.
+
+    Order columns keep their names; the item columns are item_id,
+    food_item_id, quantity, unit_price and subtotal.
+    """
+    import pandas as pd
+    path = os.path.join(archive_dir, "orders")
+    if not os.path.isdir(path):
+        return
+    filters = _date_filters(start_date, end_date)
+    for month in _months(path, start_date, end_date, newest_first=False):
+        orders = pd.read_parquet(os.path.join(path, f"month={month}"), engine='pyarrow', filters=filters or None)
+        if orders.empty:
+            continue
+        items = pd.read_parquet(os.path.join(archive_dir, "order_items", f"month={month}"), engine='pyarrow',
+                                filters=[('order_id', 'in', [int(i) for i in orders['id']])])
+        items = items.drop(columns=['vendor_id']).rename(columns={'id': 'item_id'})
+        lines = orders.merge(items, left_on='id', right_on='order_id').drop(columns=['order_id'])
+        yield lines.sort_values(['created_at', 'id', 'item_id'], ignore_index=True)
+
+def order_history(customer_id=None, vendor_id=None, status=None, start_date=None, end_date=None,
+                  include_archive=False, limit=HISTORY_LIMIT, archive_dir=ARCHIVE_DIR):
+    """Orders newest first from the live tables and, with include_archive, from the archive.
+
+    Returns at most `limit` orders with vendor_name and an `archived` flag.
+    """
+    import pandas as pd
+    conditions = []
+    params = []
+    if customer_id:
+        conditions.append("customer_id = ?")
+        params.append(customer_id)
+    if vendor_id:
+        conditions.append("vendor_id = ?")
+        params.append(vendor_id)
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if start_date:
+        conditions.append("created_at >= ?")
+        params.append(start_date.strftime('%Y-%m-%d'))
+    if end_date:
+        conditions.append("created_at < ?")
+        params.append((end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    history = db.query_df(f"SELECT * FROM orders {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                          params + [limit])
+    history['archived'] = False
+
+    if include_archive:
+        archived = read_archived_orders(customer_id, vendor_id, status, start_date, end_date, limit, archive_dir)
+        if not archived.empty:
+            archived['archived'] = True
+            history['created_at'] = _timestamps(history['created_at'])
+            history = pd.concat([history, archived], ignore_index=True)
+            history = history.sort_values(['created_at', 'id'], ascending=False).head(limit)
+
+    vendor_names = dict(db.fetchall("SELECT id, name FROM vendors"))
+    history['vendor_name'] = history['vendor_id'].map(vendor_names)
+    return history.reset_index(drop=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="path to the SQLite database file")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="archive root directory")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="orders per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many orders would move")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite file afterwards to return space")
+    args = parser.parse_args(argv)
+
+    db.configure(args.db)
+    if args.dry_run:
+        print(f"{count_archivable(args.older_than_days):,} orders would be archived")
+        return
+
+    total = 0
+    for count in archive_orders(args.older_than_days, args.batch_size, args.dir):
+        total += count
+        print(f"{total:,} orders archived", flush=True)
+    print(f"Done: {total:,} orders archived to {args.dir}")
+
+    if args.vacuum and not db.is_postgres():
+        with db.connection() as conn:
+            conn.execute("VACUUM")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Latency and throughput benchmark for the ordering flow.
+
+Generates a synthetic database at the requested scale in a temp directory
+(or reuses --db), then runs the browse, search, checkout and admin
+scenarios against the data-access helpers in app.py from one or more
+concurrent worker threads. Reports p50/p95/p99 latency and throughput per
+helper and writes the results as JSON for comparison between commits.
+With --startup-runs it also times cold starts of app.py: imports plus the
+first render of the login page, each in a fresh interpreter.
+
+    python bench.py --orders 100000 --threads 8 --out before.json
+    python bench.py --orders 100000 --threads 8 --out after.json --compare before.json
+    python bench.py --scenarios lookups --startup-runs 5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import db
+import migrations
+import synthetic_data
+
+SEARCH_TERMS = ["dish", "main", "snack", "bever", "dessert", "vendor 1", "dsih", "salda", "rice"]
+
+class Recorder:
+    # Per-helper latency samples, shared by all worker threads
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def call(self, name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(name, []).append(elapsed)
+        return result
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(samples, wall_time):
+    summary = {}
+    for name, values in sorted(samples.items()):
+        values = sorted(values)
+        summary[name] = {
+            'calls': len(values),
+            'mean_ms': sum(values) / len(values) * 1000,
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'throughput_per_s': len(values) / wall_time if wall_time else 0.0,
+        }
+    return summary
+
+# Scenarios. Each takes the app module, a recorder, a random generator and
+# the generated id ranges, and performs one user interaction.
+def scenario_browse(app, rec, rng, ids):
+    # The catalog queries themselves; browse_cached measures the cached copies the pages read
+    rec.call("query_vendors", app.query_vendors)
+    vendor_id = rng.randint(*ids['vendors'])
+    rec.call("query_food_items(vendor_id)", app.query_food_items, vendor_id)
+
+def scenario_browse_cached(app, rec, rng, ids):
+    rec.call("get_vendors (cached)", app.get_vendors)
+    vendor_id = rng.randint(*ids['vendors'])
+    rec.call("get_food_items(vendor_id) (cached)", app.get_food_items, vendor_id)
+
+def scenario_search(app, rec, rng, ids):
+    rec.call("search_food_items", app.search_food_items, rng.choice(SEARCH_TERMS))
+
+def scenario_checkout(app, rec, rng, ids):
+    items = []
+    for _ in range(rng.randint(1, 3)):
+        price = float(rng.randrange(100, 2000, 50))
+        quantity = rng.randint(1, 3)
+        items.append({'id': rng.randint(*ids['food_items']), 'price': price, 'quantity': quantity,
+                      'subtotal': price * quantity})
+    rec.call("create_order", app.create_order, rng.randint(*ids['users']), rng.randint(*ids['vendors']), items,
+             sum(item['subtotal'] for item in items), "Hostel")
+
+def scenario_my_orders(app, rec, rng, ids):
+    page, _ = rec.call("get_orders_page(customer_id)", app.get_orders_page, customer_id=rng.randint(*ids['users']))
+    if not page.empty:
+        rec.call("get_order_details_bulk", app.get_order_details_bulk, page['id'].tolist()[:5])
+
+def scenario_lookups(app, rec, rng, ids):
+    # Small reads: the lean row helpers against the DataFrame path they replaced
+    username = f"user{rng.randint(*ids['users'])}"
+    query = "SELECT id, username, password, user_type, full_name FROM users WHERE username = ?"
+    rec.call("query_df(user)", db.query_df, query, (username,))
+    rec.call("query_row(user)", db.query_row, query, (username,))
+    rec.call("query_scalar(count)", db.query_scalar, "SELECT COUNT(*) FROM vendors WHERE is_active = 1")
+    rec.call("get_vendor_names", app.get_vendor_names)
+
+def scenario_admin(app, rec, rng, ids):
+    # The data reads behind show_admin_dashboard_stats() and the Orders tab
+    rec.call("get_dashboard_stats", app.get_dashboard_stats)
+    rec.call("get_recent_orders", app.get_recent_orders)
+    rec.call("get_daily_revenue", app.get_daily_revenue)
+    rec.call("get_vendor_revenue", app.get_vendor_revenue)
+    page, has_more = rec.call("get_orders_page", app.get_orders_page)
+    if has_more:
+        last = page.iloc[-1]
+        rec.call("get_orders_page(after)", app.get_orders_page, after=(last['created_at'], int(last['id'])))
+
+SCENARIOS = {
+    'browse': scenario_browse,
+    'browse_cached': scenario_browse_cached,
+    'search': scenario_search,
+    'checkout': scenario_checkout,
+    'my_orders': scenario_my_orders,
+    'lookups': scenario_lookups,
+    'admin': scenario_admin,
+}
+
+def build_database(path, orders, seed):
+    users = max(orders // 10, 100)
+    vendors = max(orders // 10000, 10)
+    db.configure(path, backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+        ids = synthetic_data.populate(conn, users=users, vendors=vendors, food_items=vendors * 30,
+                                      orders=orders, seed=seed)
+        conn.execute("ANALYZE")
+    return ids
+
+def existing_ids(path):
+    db.configure(path, backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+        ids = {}
+        for table in ("users", "vendors", "food_items", "orders"):
+            ids[table] = conn.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+    return ids
+
+def run_scenario(app, scenario, ids, threads, iterations, seed):
+    rec = Recorder()
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        for _ in range(iterations):
+            SCENARIOS[scenario](app, rec, rng, ids)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    wall_time = time.perf_counter() - started
+    return {
+        'wall_time_s': wall_time,
+        'interactions_per_s': threads * iterations / wall_time,
+        'functions': summarize(rec.samples, wall_time),
+    }
+
+# Run in a fresh interpreter so nothing is imported yet: times the imports
+# and the first full run of app.py (the login page) under Streamlit's
+# AppTest harness, and notes whether pandas had to be loaded for it.
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app_test = AppTest.from_file("app.py", default_timeout=120)
+app_test.run()
+rendered = time.perf_counter()
+print(json.dumps({
+    'import_streamlit_s': imported - started,
+    'first_render_s': rendered - imported,
+    'total_s': rendered - started,
+    'exception': bool(app_test.exception),
+    'pandas_loaded': 'pandas' in sys.modules,
+}))
+"""
+
+def measure_startup(path, runs):
+    env = dict(os.environ, DB_BACKEND="sqlite", DB_PATH=path)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT], env=env, text=True,
+                                         cwd=os.path.dirname(os.path.abspath(__file__)))
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {'runs': runs, 'pandas_loaded': any(sample['pandas_loaded'] for sample in samples),
+              'exception': any(sample['exception'] for sample in samples)}
+    for key in ('import_streamlit_s', 'first_render_s', 'total_s'):
+        values = sorted(sample[key] for sample in samples)
+        result[key] = values[len(values) // 2]
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(results, baseline=None):
+    startup = results.get('startup')
+    if startup:
+        line = (f"\nstartup (median of {startup['runs']}): import {startup['import_streamlit_s'] * 1000:,.0f} ms, "
+                f"first render {startup['first_render_s'] * 1000:,.0f} ms, total {startup['total_s'] * 1000:,.0f} ms, "
+                f"pandas {'loaded' if startup['pandas_loaded'] else 'not loaded'}")
+        base = (baseline or {}).get('startup')
+        if base and base['first_render_s']:
+            line += f"  first render {(startup['first_render_s'] / base['first_render_s'] - 1) * 100:+.0f}%"
+        if startup['exception']:
+            line += "  (app raised an exception)"
+        print(line)
+    for scenario, result in results['scenarios'].items():
+        print(f"\n{scenario}: {result['interactions_per_s']:,.1f} interactions/s")
+        print(f"  {'function':<32} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9}")
+        base = (baseline or {}).get('scenarios', {}).get(scenario, {}).get('functions', {})
+        for name, stats in result['functions'].items():
+            line = (f"  {name:<32} {stats['calls']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                    f"{stats['p99_ms']:>9.2f} {stats['throughput_per_s']:>9.1f}")
+            if name in base and base[name]['p95_ms']:
+                change = (stats['p95_ms'] / base[name]['p95_ms'] - 1) * 100
+                line += f"  p95 {change:+.0f}%"
+            print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10000, help="orders to generate (10k to 10M)")
+    parser.add_argument("--db", help="database to reuse; generated at --orders scale if missing")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=200, help="interactions per user per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="earlier results JSON to compare p95 latency against")
+    parser.add_argument("--startup-runs", type=int, default=0,
+                        help="also time this many cold starts of app.py against the database")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.db and os.path.exists(args.db):
+        ids = existing_ids(args.db)
+    else:
+        if not args.db:
+            tmpdir = tempfile.mkdtemp(prefix="bench_")
+        path = args.db or os.path.join(tmpdir, "bench.db")
+        print(f"Generating {args.orders:,} orders in {path} ...", flush=True)
+        started = time.perf_counter()
+        ids = build_database(path, args.orders, args.seed)
+        print(f"Generated in {time.perf_counter() - started:.1f}s")
+
+    # Imported late so DB_PATH is already pointing at the benchmark database
+    import app
+
+    try:
+        results = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'orders': ids['orders'][1] - ids['orders'][0] + 1,
+                'threads': args.threads,
+                'iterations': args.iterations,
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+            },
+            'scenarios': {},
+        }
+        if args.startup_runs:
+            results['startup'] = measure_startup(db.DB_PATH, args.startup_runs)
+        for scenario in args.scenarios.split(","):
+            results['scenarios'][scenario] = run_scenario(app, scenario, ids, args.threads, args.iterations, args.seed)
+    finally:
+        db.close_idle()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    sys.exit(main())
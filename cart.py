@@ -0,0 +1,129 @@
+import db
+import write_queue
+
+# Shopping cart kept in st.session_state and mirrored to the carts /
+# cart_items tables, so it survives a dropped session and is restored on
+# the next login. Items are held in a dict keyed by food item id and grouped
+# by vendor with running totals, so adding, changing and removing an item
+# never walks the whole cart. Each change writes the one affected row.
+class Cart:
+    def __init__(self, customer_id=None):
+        self.customer_id = customer_id
+        self.items = {}
+        # vendor_id -> {'name', 'items': {food_item_id: item}, 'total'}
+        self.vendors = {}
+        self.total = 0.0
+
+    @classmethod
+    def load(cls, customer_id):
+        """Restore a customer's saved cart at current prices.
+
+        Items that have since been withdrawn from sale are left out.
+        """
+        cart = cls(customer_id)
+        rows = db.fetchall('''SELECT fi.id, fi.name, fi.vendor_id, v.name, fi.price, ci.quantity
+                              FROM cart_items ci
+                              JOIN food_items fi ON fi.id = ci.food_item_id
+                              JOIN vendors v ON v.id = fi.vendor_id
+                              WHERE ci.customer_id = ? AND fi.is_available = 1
+                              ORDER BY ci.added_at''', (customer_id,))
+        for food_item_id, name, vendor_id, vendor_name, price, quantity in rows:
+            cart._put({'id': food_item_id, 'name': name, 'vendor_id': vendor_id, 'vendor_name': vendor_name,
+                       'price': price, 'quantity': 0, 'subtotal': 0.0}, quantity)
+        return cart
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items.values())
+
+    def add(self, item, quantity):
+        """Add `quantity` of a food item (a row with id, name, vendor_id, vendor_name and price)."""
+        food_item_id = int(item['id'])
+        existing = self.items.get(food_item_id)
+        if existing is not None:
+            self.set_quantity(food_item_id, existing['quantity'] + quantity)
+            return
+        self._put({
+            'id': food_item_id,
+            'name': item['name'],
+            'vendor_id': int(item['vendor_id']),
+            'vendor_name': item['vendor_name'],
+            'price': float(item['price']),
+            'quantity': 0,
+            'subtotal': 0.0,
+        }, quantity)
+        self._save(food_item_id)
+
+    def set_quantity(self, food_item_id, quantity):
+        if quantity <= 0:
+            self.remove(food_item_id)
+            return
+        item = self.items[food_item_id]
+        self._adjust(item, quantity)
+        self._save(food_item_id)
+
+    def remove(self, food_item_id):
+        item = self.items.pop(food_item_id, None)
+        if item is None:
+            return
+        self._adjust(item, 0)
+        vendor = self.vendors[item['vendor_id']]
+        del vendor['items'][food_item_id]
+        if not vendor['items']:
+            del self.vendors[item['vendor_id']]
+        self._save(food_item_id)
+
+    def clear(self, vendor_id=None):
+        """Empty the cart, or just one vendor's items (after that vendor's order is placed)."""
+        if vendor_id is None:
+            self.items.clear()
+            self.vendors.clear()
+            self.total = 0.0
+            query, params = "DELETE FROM cart_items WHERE customer_id = ?", (self.customer_id,)
+        else:
+            vendor = self.vendors.pop(vendor_id, None)
+            if vendor is None:
+                return
+            for food_item_id, item in vendor['items'].items():
+                del self.items[food_item_id]
+                self.total -= item['subtotal']
+            query = '''DELETE FROM cart_items WHERE customer_id = ?
+                       AND food_item_id IN (SELECT id FROM food_items WHERE vendor_id = ?)'''
+            params = (self.customer_id, vendor_id)
+        if self.customer_id is not None:
+            write_queue.call(db.execute, query, params)
+
+    def _put(self, item, quantity):
+        self.items[item['id']] = item
+        vendor = self.vendors.setdefault(item['vendor_id'], {'name': item['vendor_name'], 'items': {}, 'total': 0.0})
+        vendor['items'][item['id']] = item
+        self._adjust(item, quantity)
+
+    def _adjust(self, item, quantity):
+        # Move the item to `quantity`, shifting the vendor and cart totals by the difference
+        subtotal = item['price'] * quantity
+        delta = subtotal - item['subtotal']
+        item['quantity'] = quantity
+        item['subtotal'] = subtotal
+        self.vendors[item['vendor_id']]['total'] += delta
+        self.total += delta
+
+    def _save(self, food_item_id):
+        if self.customer_id is None:
+            return
+        item = self.items.get(food_item_id)
+        if item is None:
+            write_queue.call(db.execute, "DELETE FROM cart_items WHERE customer_id = ? AND food_item_id = ?",
+                             (self.customer_id, food_item_id))
+        else:
+            write_queue.call(_save_item, self.customer_id, food_item_id, item['quantity'])
+
+def _save_item(customer_id, food_item_id, quantity):
+    with db.transaction():
+        db.execute('''INSERT INTO carts (customer_id) VALUES (?)
+                      ON CONFLICT (customer_id) DO UPDATE SET updated_at = CURRENT_TIMESTAMP''', (customer_id,))
+        db.execute('''INSERT INTO cart_items (customer_id, food_item_id, quantity) VALUES (?, ?, ?)
+                      ON CONFLICT (customer_id, food_item_id) DO UPDATE SET quantity = excluded.quantity''',
+                   (customer_id, food_item_id, quantity))
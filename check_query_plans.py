@@ -0,0 +1,275 @@
+"""Query-plan regression check for the queries issued by app.py.
+
+Builds a throwaway database with a million orders and order items, runs
+every data-access helper in app.py with db.explain_plans() active and fails
+if any statement scans a large table (or sorts one in a temp b-tree) unless
+the helper is listed in ALLOWED_SCANS.
+
+    python check_query_plans.py               # 1M-row database in a temp dir
+    python check_query_plans.py --rows 100000 # quicker run
+    python check_query_plans.py --db plans.db # reuse a populated database
+
+tests/test_query_plans.py runs the same check on a smaller database.
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import analytics
+import archive
+import db
+import migrations
+import synthetic_data
+
+# Helpers whose job is to read a whole table, or to sort a slice that is
+# bounded by construction. Anything else that scans or sorts a large table
+# is a regression.
+ALLOWED_SCANS = {
+    "get_food_items()": "lists the entire available catalog",
+    "get_orders()": "lists every order",
+    "grid.fetch_page(food)": "sorts one vendor's menu",
+    "get_vendor_revenue()": "groups a fixed window of the daily sales rollup by vendor",
+    "Cart.load()": "sorts one customer's saved cart",
+    "export orders()": "an export without dates reads every order line",
+    "OrderBoard.load()": "walks orders newest first until it has a board's worth of active orders, "
+                         "which is short while active orders are the newest",
+    "grid.fetch_page(users, search)": "LIKE '%...%' search scans users until a page of matches is found",
+    "grid.count_rows(users, search)": "LIKE '%...%' search scans users up to the count cap",
+}
+
+SQL_KEYWORDS = {"where", "on", "join", "set", "order", "group", "limit", "left", "inner", "values", "select", "and"}
+
+def _checks(app, ids):
+    customer_id = ids['users'][0]
+    vendor_id = ids['vendors'][0]
+    order_id = ids['orders'][0]
+    today = date.today()
+    last_month = today - timedelta(days=30)
+    cursor = (last_month.strftime('%Y-%m-%d %H:%M:%S'), order_id)
+    return [
+        ("authenticate_user()", lambda: app.authenticate_user(f"user{customer_id}", "x")),
+        ("register_user()", lambda: app.register_user("plan_check", "x", "plan_check@example.edu", "Plan Check", "")),
+        ("get_vendors()", app.get_vendors),
+        ("get_food_items(vendor_id)", lambda: app.get_food_items(vendor_id)),
+        ("get_food_items()", app.get_food_items),
+        ("add_food_item()", lambda: app.add_food_item(vendor_id, "Plan Check", "", 100.0, "Snacks", 5)),
+        ("add_vendor()", lambda: app.add_vendor("Plan Check", "", "Nowhere", "", "", "")),
+        ("search_food_items()", lambda: app.search_food_items("dish")),
+        ("search_food_items(typo)", lambda: app.search_food_items("dsih")),
+        ("get_orders(customer_id)", lambda: app.get_orders(customer_id)),
+        ("get_orders()", app.get_orders),
+        ("get_orders_page()", app.get_orders_page),
+        ("get_orders_page(after)", lambda: app.get_orders_page(after=cursor)),
+        ("get_orders_page(before)", lambda: app.get_orders_page(before=cursor)),
+        ("get_orders_page(customer_id)", lambda: app.get_orders_page(customer_id=customer_id, after=cursor)),
+        ("get_orders_page(status)", lambda: app.get_orders_page(status="ready", after=cursor)),
+        ("get_orders_page(vendor_id)", lambda: app.get_orders_page(vendor_id=vendor_id, after=cursor)),
+        ("get_orders_page(dates)", lambda: app.get_orders_page(start_date=last_month, end_date=today)),
+        ("get_order_details()", lambda: app.get_order_details(order_id)),
+        ("get_order_details_bulk()", lambda: app.get_order_details_bulk(range(order_id, order_id + 20))),
+        ("update_order_status()", lambda: app.update_order_status(order_id, "ready")),
+        ("update_orders_status()", lambda: app.update_orders_status(range(order_id, order_id + 20), "ready")),
+        ("count_matching_orders()", lambda: app.count_matching_orders({"status": "preparing"}, "ready")),
+        ("update_matching_orders_status(status)",
+         lambda: app.update_matching_orders_status({"status": "preparing"}, "ready")),
+        ("update_matching_orders_status(vendor_id)",
+         lambda: app.update_matching_orders_status({"vendor_id": vendor_id, "start_date": last_month}, "ready")),
+        ("get_dashboard_stats()", app.get_dashboard_stats),
+        ("get_daily_revenue()", app.get_daily_revenue),
+        ("get_vendor_revenue()", app.get_vendor_revenue),
+        ("get_recent_orders()", app.get_recent_orders),
+        ("grid.fetch_page(users)", lambda: app.grid.fetch_page(app.USERS_GRID)),
+        ("grid.fetch_page(users, sort)", lambda: app.grid.fetch_page(app.USERS_GRID, "created_at", True, offset=100)),
+        ("grid.fetch_page(users, search)", lambda: app.grid.fetch_page(app.USERS_GRID, search_text="student 1")),
+        ("grid.count_rows(users)", lambda: app.grid.count_rows(app.USERS_GRID)),
+        ("grid.count_rows(users, search)", lambda: app.grid.count_rows(app.USERS_GRID, "student 1")),
+        ("OrderBoard.load()", lambda: app.order_board.OrderBoard().load()),
+        ("OrderBoard.load(vendor_id)", lambda: app.order_board.OrderBoard(vendor_id).load()),
+        ("OrderBoard.refresh()", lambda: _board_refresh(app)),
+        ("OrderBoard.refresh(vendor_id)", lambda: _board_refresh(app, vendor_id)),
+        ("OrderBoard.refresh(paging)", lambda: _board_refresh(app, last_id=order_id)),
+        ("OrderBoard.refresh(vendor_id, paging)", lambda: _board_refresh(app, vendor_id, last_id=order_id)),
+        ("Cart.load()", lambda: app.cart.Cart.load(customer_id)),
+        ("Cart changes", lambda: _cart_changes(app, customer_id, vendor_id)),
+        ("export orders(dates)", lambda: db.fetchall(*app.export.report_query("orders", last_month, today))),
+        ("export sales(dates)", lambda: db.fetchall(*app.export.report_query("sales", last_month, today))),
+        ("export orders()", lambda: db.fetchall(*app.export.report_query("orders"))),
+        ("archive batch", _archive_batch),
+        ("analytics lines", lambda: db.fetchall(*analytics._lines_query(f"{last_month} 00:00:00"))),
+        ("analytics lines(changed)",
+         lambda: db.fetchall(*analytics._lines_query(f"{last_month} 00:00:00", f"{today} 00:00:00"))),
+        ("grid.fetch_page(food)", lambda: app.grid.fetch_page(app.FOOD_GRID, "price", filters={"fi.vendor_id": vendor_id})),
+    ]
+
+def _board_refresh(app, vendor_id=None, last_id=None):
+    board = app.order_board.OrderBoard(vendor_id)
+    board.watermark = f"{date.today()} 00:00:00"
+    if last_id is not None:
+        # Mid-backlog: pages on from (watermark, last_id) without the overlap
+        board.last_id = last_id
+        board.caught_up = False
+    return board.refresh()
+
+def _cart_changes(app, customer_id, vendor_id):
+    # Each change writes one row: add (upsert), remove, then clear a vendor
+    cart = app.cart.Cart(customer_id)
+    cart.add({'id': 1, 'name': "Plan Check", 'vendor_id': vendor_id, 'vendor_name': "", 'price': 1.0}, 1)
+    cart.remove(1)
+    cart.add({'id': 1, 'name': "Plan Check", 'vendor_id': vendor_id, 'vendor_name': "", 'price': 1.0}, 1)
+    cart.clear(vendor_id)
+
+def _archive_batch():
+    # archive_batch() writes Parquet files, so its statements are explained
+    # directly, on one connection holding the temp table of batch ids
+    cutoff = f"{date.today() - timedelta(days=archive.ARCHIVE_AFTER_DAYS)} 00:00:00"
+    with db.connection() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+        db.fetchall(archive.BATCH_QUERY, ("delivered", cutoff, archive.ARCHIVE_BATCH_SIZE))
+        for statement in archive.DELETE_BATCH:
+            db.execute(statement)
+    archive.count_archivable()
+
+def _aliases(query):
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', query, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+def _filtered_columns(query, table, aliases, columns):
+    # Columns of `table` that the query's WHERE clauses test
+    names = {alias for alias, name in aliases.items() if name == table}
+    single_table = set(aliases.values()) == {table}
+    filtered = set()
+    for clause in re.findall(r'\bWHERE\b(.*?)(?=\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', query,
+                             re.IGNORECASE | re.DOTALL):
+        for qualifier, column in re.findall(r'\b(?:(\w+)\.)?(\w+)\b', clause):
+            if qualifier in names or (not qualifier and single_table):
+                if column in columns.get(table, ()):
+                    filtered.add(column)
+    return filtered
+
+def find_problems(query, plan, table_sizes, min_rows, columns=None, indexes=None):
+    """Problems in one statement's plan: large scans and temp b-tree sorts.
+
+    Under a LIMIT, an ordered walk (rowid or index order, with no sort after
+    it) stops after a page of rows, but only when every row qualifies. It is
+    let through when the query does not filter the table, or when every
+    filtered column is in the index being walked; otherwise a selective WHERE
+    clause can make the walk read the whole table.
+    """
+    columns = columns or {}
+    indexes = indexes or {}
+    aliases = _aliases(query)
+    limited = re.search(r'\bLIMIT\b', query, re.IGNORECASE) is not None
+    sorted_later = any(step.startswith("USE TEMP B-TREE") for step in plan)
+    problems = []
+    for detail in plan:
+        scan = re.match(r'SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?', detail)
+        # Virtual tables (the FTS index) plan their own lookups
+        if scan and "VIRTUAL TABLE" not in detail:
+            table = aliases.get(scan.group(1), scan.group(1))
+            if limited and not sorted_later:
+                filtered = _filtered_columns(query, table, aliases, columns)
+                if filtered <= indexes.get(scan.group(2), set()):
+                    continue
+            if table_sizes.get(table, 0) >= min_rows:
+                problems.append(f"full scan of {table} ({table_sizes[table]:,} rows): {detail}")
+        elif detail.startswith("USE TEMP B-TREE"):
+            # Sorting a materialised LIMIT subquery only touches a page of rows
+            if limited and any(step.startswith("MATERIALIZE") for step in plan):
+                continue
+            problems.append(detail)
+    return problems
+
+def describe_schema(conn):
+    """(rows per table, columns per table, columns per index) of an SQLite database."""
+    tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    table_sizes = {name: conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] for name in tables}
+    columns = {name: {row[1] for row in conn.execute(f"PRAGMA table_info({name})")} for name in tables}
+    indexes = {}
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall():
+        indexes[name] = {row[2] for row in conn.execute(f"PRAGMA index_info({name})")}
+    return table_sizes, columns, indexes
+
+def build_database(path, rows):
+    db.configure(path, backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+        ids = synthetic_data.populate(conn, users=max(rows // 20, 1), vendors=max(rows // 1000, 1),
+                                      food_items=max(rows // 5, 1), orders=rows, items_per_order=1)
+        conn.execute("ANALYZE")
+    return ids
+
+def _existing_ids(conn):
+    ids = {}
+    for table in ("users", "vendors", "orders"):
+        ids[table] = conn.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+    # The seeded admin is user 1; use a synthetic customer when there is one
+    ids['users'] = (conn.execute("SELECT MIN(id) FROM users WHERE user_type = 'customer'").fetchone()[0] or 1,)
+    return ids
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="orders and order items to generate")
+    parser.add_argument("--min-rows", type=int, default=100000,
+                        help="tables at least this large must not be fully scanned")
+    parser.add_argument("--db", help="existing database to check (populated on first use)")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.db and os.path.exists(args.db):
+        db.configure(args.db, backend="sqlite")
+        with db.connection() as conn:
+            migrations.migrate(conn)
+            conn.execute("ANALYZE")
+            ids = _existing_ids(conn)
+    else:
+        if not args.db:
+            tmpdir = tempfile.mkdtemp(prefix="plans_")
+        path = args.db or os.path.join(tmpdir, "plans.db")
+        print(f"Generating {args.rows:,} orders in {path} ...")
+        ids = build_database(path, args.rows)
+
+    # Imported late so DB_PATH is already pointing at the check database
+    import app
+
+    try:
+        with db.connection() as conn:
+            table_sizes, columns, indexes = describe_schema(conn)
+
+            failures = 0
+            for label, call in _checks(app, ids):
+                # Cached catalog reads would otherwise skip the database
+                app.invalidate_catalog()
+                with db.explain_plans() as plans:
+                    call()
+                problems = []
+                for query, plan in plans:
+                    problems.extend(find_problems(query, plan, table_sizes, args.min_rows, columns, indexes))
+                if problems and label in ALLOWED_SCANS:
+                    print(f"ALLOW {label}: {ALLOWED_SCANS[label]}")
+                elif problems:
+                    failures += 1
+                    print(f"FAIL  {label}")
+                    for problem in problems:
+                        print(f"      {problem}")
+                else:
+                    print(f"OK    {label}")
+    finally:
+        db.close_idle()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if failures:
+        print(f"{failures} helper(s) fall back to full scans")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+import collections
+import contextlib
+import functools
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+import instrumentation
+import settings
+
+# Shared connection layer. Every query in the app goes through here so that
+# connections, PRAGMAs and the prepared statement cache are set up once and
+# reused instead of paying sqlite3.connect() on every helper call.
+#
+# DB_BACKEND selects the storage: 'sqlite' (default) uses the local DB_PATH
+# file, 'postgres' uses DATABASE_URL so several app nodes can share one
+# database. Queries are written once with qmark (?) placeholders.
+BACKEND = settings.get_setting('DB_BACKEND', 'sqlite')
+DB_PATH = settings.get_setting('DB_PATH', 'campus_food_system.db')
+DATABASE_URL = settings.get_setting('DATABASE_URL')
+POOL_SIZE = settings.get_int('DB_POOL_SIZE', 8)
+STATEMENT_CACHE_SIZE = settings.get_int('DB_STATEMENT_CACHE_SIZE', 256)
+STREAM_CHUNK_SIZE = 10000
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Raised for unique and foreign key violations on either backend
+IntegrityError = (sqlite3.IntegrityError,)
+
+_pool = queue.LifoQueue()
+_pg_pool = None
+_generation = 0
+_local = threading.local()
+
+def is_postgres():
+    return BACKEND == 'postgres'
+
+def sql_day(column):
+    # SQL for the calendar day of a timestamp column, as 'YYYY-MM-DD' text
+    if is_postgres():
+        return f"to_char({column}, 'YYYY-MM-DD')"
+    return f"date({column})"
+
+def configure(path=None, backend=None, database_url=None):
+    """Point the pool at a different database, dropping idle connections."""
+    global BACKEND, DB_PATH, DATABASE_URL, _generation
+    if backend:
+        BACKEND = backend
+    if path:
+        DB_PATH = path
+    if database_url:
+        DATABASE_URL = database_url
+    _generation += 1
+    close_idle()
+
+def close_idle():
+    global _pg_pool
+    while True:
+        try:
+            _, conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        conn.close()
+    if _pg_pool is not None:
+        _pg_pool.closeall()
+        _pg_pool = None
+
+def _connect():
+    # Connections move between Streamlit's script threads via the pool, but
+    # only one thread ever uses a connection at a time.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@functools.lru_cache(maxsize=1024)
+def _to_pyformat(query):
+    # psycopg2 takes %s placeholders, so ? outside string literals becomes %s
+    # and literal % signs are doubled.
+    parts = []
+    in_string = False
+    for char in query:
+        if char == "'":
+            in_string = not in_string
+        if char == '?' and not in_string:
+            parts.append('%s')
+        elif char == '%':
+            parts.append('%%')
+        else:
+            parts.append(char)
+    return ''.join(parts)
+
+class PostgresCursor:
+    # sqlite3-style cursor over a psycopg2 cursor: execute() returns the
+    # cursor and takes qmark placeholders.
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        # Without parameters psycopg2 leaves the query text alone
+        if params:
+            self.cursor.execute(_to_pyformat(query), tuple(params))
+        else:
+            self.cursor.execute(query)
+        return self
+
+    def executemany(self, query, rows):
+        self.cursor.executemany(_to_pyformat(query), [tuple(row) for row in rows])
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+class PostgresConnection:
+    # The part of the sqlite3.Connection interface the app relies on, on top
+    # of a pooled psycopg2 connection. psycopg2 opens a transaction on the
+    # first statement, so reads roll back when the connection is returned.
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self):
+        return PostgresCursor(self.raw.cursor())
+
+    def execute(self, query, params=()):
+        return self.cursor().execute(query, params)
+
+    def executemany(self, query, rows):
+        return self.cursor().executemany(query, rows)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    @property
+    def in_transaction(self):
+        import psycopg2.extensions
+        return self.raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+def _postgres_pool():
+    # Imported lazily so SQLite deployments do not need psycopg2
+    global _pg_pool, IntegrityError
+    if _pg_pool is None:
+        import psycopg2
+        import psycopg2.pool
+        if not DATABASE_URL:
+            raise RuntimeError("DB_BACKEND is 'postgres' but DATABASE_URL is not set")
+        _pg_pool = psycopg2.pool.ThreadedConnectionPool(1, POOL_SIZE, DATABASE_URL)
+        IntegrityError = (sqlite3.IntegrityError, psycopg2.IntegrityError)
+    return _pg_pool
+
+@contextlib.contextmanager
+def connection():
+    # Nested calls on the same thread share the connection already checked out
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+
+    if is_postgres():
+        pool = _postgres_pool()
+        conn = PostgresConnection(pool.getconn())
+        _local.conn = conn
+        try:
+            yield conn
+        finally:
+            _local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            pool.putconn(conn.raw)
+        return
+
+    generation = _generation
+    try:
+        pooled_generation, conn = _pool.get_nowait()
+        if pooled_generation != generation:
+            conn.close()
+            conn = _connect()
+    except queue.Empty:
+        conn = _connect()
+
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        if generation == _generation and _pool.qsize() < POOL_SIZE:
+            _pool.put((generation, conn))
+        else:
+            conn.close()
+
+@contextlib.contextmanager
+def transaction():
+    """Run the block in a single write transaction, committing on success."""
+    with connection() as conn:
+        if getattr(_local, 'in_transaction', False) or (not is_postgres() and conn.in_transaction):
+            yield conn
+            return
+        if is_postgres():
+            # psycopg2 begins implicitly; close any read transaction first so
+            # the block commits as a unit
+            if conn.in_transaction:
+                conn.commit()
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+        _local.in_transaction = True
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            _local.in_transaction = False
+
+@contextlib.contextmanager
+def reading_from(conn):
+    """Point the helpers on this thread at `conn` (e.g. a read-only snapshot) inside the block."""
+    previous = getattr(_local, 'conn', None)
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = previous
+
+@contextlib.contextmanager
+def explain_plans():
+    """Collect query plans for the statements run on this thread.
+
+    While active, the query helpers below record (query, [plan detail, ...])
+    in the yielded list. Reads still run but return at most
+    EXPLAIN_SAMPLE_ROWS rows; writes through execute() are skipped. Used by
+    check_query_plans.py; SQLite only.
+    """
+    plans = []
+    _local.plans = plans
+    try:
+        yield plans
+    finally:
+        _local.plans = None
+
+EXPLAIN_SAMPLE_ROWS = 50
+
+def explaining():
+    return getattr(_local, 'plans', None) is not None
+
+def _explain(conn, query, params):
+    plans = getattr(_local, 'plans', None)
+    if plans is None:
+        return False
+    rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    plans.append((query, [row[3] for row in rows]))
+    return True
+
+def _pandas():
+    # Imported on first use: the login page and the row helpers below never
+    # need DataFrames, so startup doesn't pay for pandas
+    import pandas
+    return pandas
+
+@functools.lru_cache(maxsize=256)
+def _row_type(columns):
+    # rename=True turns columns like COUNT(*) into positional names (_0)
+    return collections.namedtuple("Row", columns, rename=True)
+
+def _instrumented(count_rows):
+    # Time the helper and record it under the query's fingerprint when
+    # instrumentation is on; count_rows maps the result to a row count
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(query, *args, **kwargs):
+            if not instrumentation.ENABLED:
+                return fn(query, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = fn(query, *args, **kwargs)
+            except Exception:
+                instrumentation.record_query(query, time.perf_counter() - started, 0)
+                raise
+            instrumentation.record_query(query, time.perf_counter() - started, count_rows(result))
+            return result
+        return wrapper
+    return decorator
+
+@_instrumented(len)
+def query_df(query, params=()):
+    pd = _pandas()
+    with connection() as conn:
+        if _explain(conn, query, params):
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return pd.DataFrame.from_records(cursor.fetchmany(EXPLAIN_SAMPLE_ROWS), columns=columns)
+        if is_postgres():
+            if params:
+                return pd.read_sql_query(_to_pyformat(query), conn.raw, params=tuple(params))
+            return pd.read_sql_query(query, conn.raw)
+        return pd.read_sql_query(query, conn, params=params)
+
+def iter_df(query, params=(), chunksize=STREAM_CHUNK_SIZE):
+    """Yield the result of a large query as DataFrames of up to `chunksize` rows.
+
+    On PostgreSQL the rows come from a named (server-side) cursor, so only
+    one chunk is held client-side at a time.
+    """
+    pd = _pandas()
+    with connection() as conn:
+        if not is_postgres():
+            yield from pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
+            return
+        cursor = conn.raw.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cursor.itersize = chunksize
+        try:
+            if params:
+                cursor.execute(_to_pyformat(query), tuple(params))
+            else:
+                cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    return
+                yield pd.DataFrame.from_records(rows, columns=[column[0] for column in cursor.description])
+        finally:
+            cursor.close()
+
+@_instrumented(lambda row: 0 if row is None else 1)
+def fetchone(query, params=()):
+    with connection() as conn:
+        _explain(conn, query, params)
+        return conn.execute(query, params).fetchone()
+
+@_instrumented(len)
+def fetchall(query, params=()):
+    with connection() as conn:
+        if _explain(conn, query, params):
+            return conn.execute(query, params).fetchmany(EXPLAIN_SAMPLE_ROWS)
+        return conn.execute(query, params).fetchall()
+
+# Lean reads for lookups and small results: plain named tuples, no
+# DataFrame. Use query_df() for anything shown as a table or chart.
+@_instrumented(len)
+def query_rows(query, params=()):
+    """All rows as named tuples (row.name or row[0])."""
+    with connection() as conn:
+        explained = _explain(conn, query, params)
+        cursor = conn.execute(query, params)
+        rows = cursor.fetchmany(EXPLAIN_SAMPLE_ROWS) if explained else cursor.fetchall()
+        Row = _row_type(tuple(column[0] for column in cursor.description))
+        return [Row._make(row) for row in rows]
+
+@_instrumented(lambda row: 0 if row is None else 1)
+def query_row(query, params=()):
+    """The first row as a named tuple, or None."""
+    with connection() as conn:
+        _explain(conn, query, params)
+        cursor = conn.execute(query, params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return _row_type(tuple(column[0] for column in cursor.description))._make(row)
+
+@_instrumented(lambda value: 1)
+def query_scalar(query, params=(), default=None):
+    """The first column of the first row, or `default` when there is no row."""
+    with connection() as conn:
+        _explain(conn, query, params)
+        row = conn.execute(query, params).fetchone()
+        return default if row is None or row[0] is None else row[0]
+
+@_instrumented(lambda new_id: 0 if new_id is None else 1)
+def insert(query, params=()):
+    """Run a single-row INSERT and return the new row's id."""
+    with transaction() as conn:
+        if _explain(conn, query, params):
+            return None
+        if is_postgres():
+            return conn.execute(query + " RETURNING id", params).fetchone()[0]
+        return conn.execute(query, params).lastrowid
+
+@_instrumented(lambda cursor: 0 if cursor is None else max(cursor.rowcount, 0))
+def execute(query, params=()):
+    with transaction() as conn:
+        if _explain(conn, query, params):
+            # Record the plan but leave the data untouched
+            return None
+        return conn.execute(query, params)
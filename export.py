@@ -0,0 +1,182 @@
+"""Export orders and sales reports to CSV or Parquet.
+
+Rows are read in chunks of CHUNK_SIZE (db.iter_df) and each chunk is
+appended to the output file before the next is read, so memory use stays
+at about one chunk however many orders the date range covers. Orders moved
+to the Parquet archive (archive.py) are only in the orders report with
+--include-archived, and are read a month at a time.
+
+    python export.py orders --start 2024-01-01 --end 2024-03-31 --out q1.csv
+    python export.py sales --format parquet --out sales.parquet
+"""
+import argparse
+import itertools
+from datetime import date, timedelta
+
+import db
+import settings
+
+CHUNK_SIZE = settings.get_int('EXPORT_CHUNK_SIZE', 10000)
+FORMATS = ("csv", "parquet")
+
+# Each report is a query over one date column plus its output columns and
+# their types. The types fix the Parquet schema up front, so a chunk where a
+# column happens to be all empty still matches the rest of the file.
+REPORTS = {
+    'orders': {
+        'label': "Order lines",
+        'query': """SELECT o.id AS order_id, o.order_number, o.created_at, o.status,
+                           u.username AS customer, u.full_name AS customer_name,
+                           v.name AS vendor, o.delivery_location,
+                           fi.name AS food_item, oi.quantity, oi.unit_price, oi.subtotal,
+                           o.total_amount AS order_total
+                    FROM orders o
+                    JOIN order_items oi ON oi.order_id = o.id
+                    LEFT JOIN food_items fi ON fi.id = oi.food_item_id
+                    LEFT JOIN vendors v ON v.id = o.vendor_id
+                    LEFT JOIN users u ON u.id = o.customer_id
+                    {where}
+                    ORDER BY o.created_at, o.id, oi.id""",
+        'date_column': "o.created_at",
+        'columns': [("order_id", "int"), ("order_number", "str"), ("created_at", "str"), ("status", "str"),
+                    ("customer", "str"), ("customer_name", "str"), ("vendor", "str"),
+                    ("delivery_location", "str"), ("food_item", "str"), ("quantity", "int"),
+                    ("unit_price", "float"), ("subtotal", "float"), ("order_total", "float")],
+    },
+    'sales': {
+        'label': "Daily sales by vendor",
+        'query': """SELECT s.day, s.vendor_id, v.name AS vendor, s.order_count, s.revenue
+                    FROM daily_vendor_sales s
+                    LEFT JOIN vendors v ON v.id = s.vendor_id
+                    {where}
+                    ORDER BY s.day, s.vendor_id""",
+        'date_column': "s.day",
+        'columns': [("day", "str"), ("vendor_id", "int"), ("vendor", "str"), ("order_count", "int"),
+                    ("revenue", "float")],
+    },
+}
+
+def report_query(report, start_date=None, end_date=None):
+    """The report's (query, params) for the (inclusive) date range."""
+    definition = REPORTS[report]
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append(f"{definition['date_column']} >= ?")
+        params.append(start_date.strftime('%Y-%m-%d'))
+    if end_date:
+        conditions.append(f"{definition['date_column']} < ?")
+        params.append((end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return definition['query'].format(where=where), params
+
+def _names(table, column, ids):
+    # {id: column} for the ids (a Series) found in `table`
+    ids = sorted({int(i) for i in ids.dropna()})
+    if not ids:
+        return {}
+    placeholders = ", ".join("?" * len(ids))
+    return dict(db.fetchall(f"SELECT id, {column} FROM {table} WHERE id IN ({placeholders})", ids))
+
+def _archived_order_lines(start_date, end_date, chunksize):
+    # The orders report's rows for orders moved to the Parquet archive. They
+    # are read a month at a time, so this part holds one month of lines.
+    import archive
+    for lines in archive.iter_archived_lines(start_date, end_date, archive.ARCHIVE_DIR):
+        for start in range(0, len(lines), chunksize):
+            chunk = lines.iloc[start:start + chunksize]
+            usernames = _names("users", "username", chunk['customer_id'])
+            full_names = _names("users", "full_name", chunk['customer_id'])
+            vendors = _names("vendors", "name", chunk['vendor_id'])
+            food_items = _names("food_items", "name", chunk['food_item_id'])
+            yield chunk.assign(
+                order_id=chunk['id'],
+                customer=chunk['customer_id'].map(usernames),
+                customer_name=chunk['customer_id'].map(full_names),
+                vendor=chunk['vendor_id'].astype('int64').map(vendors),
+                food_item=chunk['food_item_id'].map(food_items),
+                order_total=chunk['total_amount'],
+            )[[column for column, _ in REPORTS['orders']['columns']]].reset_index(drop=True)
+
+def iter_report(report, start_date=None, end_date=None, chunksize=CHUNK_SIZE, include_archived=False):
+    """Yield the report for the (inclusive) date range as DataFrames of up to `chunksize` rows.
+
+    The orders report reads the live tables only, unless include_archived is
+    set; archived lines then come first, as they are the oldest. The sales
+    report always counts archived orders, through archived_daily_sales.
+    """
+    definition = REPORTS[report]
+    chunks = []
+    if include_archived and report == 'orders':
+        chunks.append(_archived_order_lines(start_date, end_date, chunksize))
+    query, params = report_query(report, start_date, end_date)
+    chunks.append(db.iter_df(query, params, chunksize))
+    for chunk in itertools.chain.from_iterable(chunks):
+        # Timestamps come back as text on SQLite and datetimes on PostgreSQL
+        for column, kind in definition['columns']:
+            if kind == "str":
+                chunk[column] = chunk[column].astype("string")
+        yield chunk
+
+def write_csv(chunks, path):
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, header=rows == 0, index=False)
+            rows += len(chunk)
+            yield rows
+
+def write_parquet(chunks, path, columns):
+    # Imported here so the app runs without pyarrow until a Parquet export is asked for
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    rows = 0
+    # Each chunk becomes a row group, so the writer never holds more than one
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+            yield rows
+        if rows == 0:
+            writer.write_table(schema.empty_table())
+
+def export(report, path, fmt="csv", start_date=None, end_date=None, chunksize=CHUNK_SIZE, include_archived=False):
+    """Write the report to `path`, yielding the running row count after each chunk."""
+    chunks = iter_report(report, start_date, end_date, chunksize, include_archived)
+    if fmt == "parquet":
+        return write_parquet(chunks, path, REPORTS[report]['columns'])
+    return write_csv(chunks, path)
+
+def file_name(report, fmt, start_date=None, end_date=None):
+    parts = [report]
+    if start_date:
+        parts.append(start_date.strftime('%Y%m%d'))
+    if end_date:
+        parts.append(end_date.strftime('%Y%m%d'))
+    return "_".join(parts) + f".{fmt}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("report", choices=sorted(REPORTS))
+    parser.add_argument("--db", default=db.DB_PATH, help="path to the SQLite database file")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows read per chunk")
+    parser.add_argument("--out", help="output file (default: named after the report and dates)")
+    parser.add_argument("--include-archived", action="store_true",
+                        help="orders report: also export orders moved to the Parquet archive")
+    args = parser.parse_args(argv)
+
+    db.configure(args.db)
+    path = args.out or file_name(args.report, args.format, args.start, args.end)
+    rows = 0
+    for rows in export(args.report, path, args.format, args.start, args.end, args.chunk_size,
+                       args.include_archived):
+        print(f"{rows:,} rows written", flush=True)
+    print(f"Done: {rows:,} rows written to {path}")
+
+if __name__ == "__main__":
+    main()
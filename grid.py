@@ -0,0 +1,111 @@
+import streamlit as st
+
+import db
+
+# Paged, sortable and filterable admin tables. Paging (LIMIT/OFFSET),
+# sorting and text filters run in SQL, so a tab reads one page of rows
+# however large the table grows. The unfiltered total comes from the
+# trigger-maintained stats_counters; filtered totals are counted up to
+# COUNT_CAP and shown as "1,000+" beyond that.
+#
+# A grid source is a dict:
+#   'from':     FROM clause (table plus any joins)
+#   'columns':  [(alias, expression), ...] to select
+#   'key':      unique expression used to break sort ties
+#   'sortable': aliases that may be sorted on; the first is the default
+#   'search':   expressions matched by the text filter
+#   'counter':  stats_counters row holding the table's row count
+PAGE_SIZE = 25
+COUNT_CAP = 1000
+
+def set_page(key, page_no):
+    st.session_state[key] = page_no
+
+def _where(source, search_text, filters):
+    conditions = []
+    params = []
+    if search_text:
+        # LOWER() on both sides keeps matching case-insensitive on PostgreSQL too
+        conditions.append("(" + " OR ".join(f"LOWER({expression}) LIKE ?" for expression in source['search']) + ")")
+        params.extend([f"%{search_text.lower()}%"] * len(source['search']))
+    for expression, value in (filters or {}).items():
+        conditions.append(f"{expression} = ?")
+        params.append(value)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+def fetch_page(source, sort=None, descending=False, search_text="", filters=None, offset=0, limit=PAGE_SIZE):
+    """Return (page, has_more) for one page of the grid source.
+
+    `filters` maps expressions to required values.
+    """
+    columns = dict(source['columns'])
+    if sort not in source['sortable']:
+        sort = source['sortable'][0]
+    where, params = _where(source, search_text, filters)
+    order = "DESC" if descending else "ASC"
+    select = ", ".join(f"{expression} AS {alias}" for alias, expression in source['columns'])
+    query = f"""SELECT {select}
+                FROM {source['from']}
+                {where}
+                ORDER BY {columns[sort]} {order}, {source['key']} {order}
+                LIMIT ? OFFSET ?"""
+    page = db.query_df(query, params + [limit + 1, offset])
+    return page.iloc[:limit], len(page) > limit
+
+def count_rows(source, search_text="", filters=None):
+    """Return (count, capped) for the rows matching the filters."""
+    if not search_text and not filters and source.get('counter'):
+        row = db.fetchone("SELECT value FROM stats_counters WHERE name = ?", (source['counter'],))
+        if row is not None:
+            return int(row[0]), False
+    where, params = _where(source, search_text, filters)
+    count = db.fetchone(f"SELECT COUNT(*) FROM (SELECT 1 FROM {source['from']} {where} LIMIT ?) matches",
+                        params + [COUNT_CAP + 1])[0]
+    return min(count, COUNT_CAP), count > COUNT_CAP
+
+def show_grid(key, source, filters=(), page_size=PAGE_SIZE):
+    """Draw a paged grid with a text filter, sort controls and select filters.
+
+    `filters` is a list of (label, expression, {value: option label}) shown
+    as select boxes with an "All" choice. Returns the page being shown.
+    """
+    page_key = f"{key}_page"
+    controls = st.columns([3, 2, 1] + [2] * len(filters))
+    with controls[0]:
+        search_text = st.text_input("Filter", key=f"{key}_search", placeholder="Search...",
+                                    on_change=set_page, args=(page_key, 1))
+    with controls[1]:
+        sort = st.selectbox("Sort by", source['sortable'], key=f"{key}_sort",
+                            on_change=set_page, args=(page_key, 1))
+    with controls[2]:
+        descending = st.toggle("Desc", key=f"{key}_desc", on_change=set_page, args=(page_key, 1))
+
+    selected = {}
+    for column, (label, expression, options) in zip(controls[3:], filters):
+        with column:
+            value = st.selectbox(label, [None] + list(options), key=f"{key}_filter_{expression}",
+                                 format_func=lambda value, options=options: "All" if value is None else options[value],
+                                 on_change=set_page, args=(page_key, 1))
+        if value is not None:
+            selected[expression] = value
+
+    page_no = st.session_state.get(page_key, 1)
+    page, has_more = fetch_page(source, sort, descending, search_text, selected,
+                                offset=(page_no - 1) * page_size, limit=page_size)
+    count, capped = count_rows(source, search_text, selected)
+
+    first = (page_no - 1) * page_size
+    total = f"{count:,}+" if capped else f"{count:,}"
+    st.caption(f"Showing {first + 1 if len(page) else 0:,}–{first + len(page):,} of {total}")
+    st.dataframe(page, use_container_width=True, hide_index=True)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("← Previous", key=f"{key}_prev", disabled=page_no <= 1,
+                  on_click=set_page, args=(page_key, page_no - 1))
+    with col2:
+        st.caption(f"Page {page_no}")
+    with col3:
+        st.button("Next →", key=f"{key}_next", disabled=not has_more,
+                  on_click=set_page, args=(page_key, page_no + 1))
+    return page
@@ -0,0 +1,168 @@
+import collections
+import contextlib
+import functools
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+import settings
+
+# Timing for queries and page renders, shown on the admin Performance tab.
+# The db helpers record every query under its fingerprint (the SQL with
+# literals replaced by ? and whitespace collapsed), with a latency histogram
+# and row counts. main() records each full rerun and the page it drew.
+# Queries slower than SLOW_QUERY_MS are also appended to SLOW_QUERY_LOG.
+#
+# Off unless INSTRUMENTATION is set; when off each helper only checks
+# ENABLED and nothing is recorded. Stats are per process and kept in memory.
+ENABLED = settings.get_bool('INSTRUMENTATION', False)
+SLOW_QUERY_MS = settings.get_float('SLOW_QUERY_MS', 250)
+SLOW_QUERY_LOG = settings.get_setting('SLOW_QUERY_LOG', 'slow_queries.log')
+RECENT_SLOW_QUERIES = 100
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_lock = threading.Lock()
+_queries = {}
+_timings = {}
+_slow = collections.deque(maxlen=RECENT_SLOW_QUERIES)
+_started = datetime.now()
+_slow_log = None
+
+class Stats:
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, elapsed_ms, rows):
+        self.calls += 1
+        self.total += elapsed_ms
+        self.max = max(self.max, elapsed_ms)
+        self.rows += rows
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, pct):
+        # Upper bound of the bucket holding the pct-th call, capped at the slowest seen
+        target = self.calls * pct / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'calls': self.calls,
+            'total_ms': round(self.total, 1),
+            'mean_ms': round(self.total / self.calls, 2) if self.calls else 0.0,
+            'p95_ms': round(self.percentile(95), 2),
+            'max_ms': round(self.max, 2),
+            'rows_per_call': round(self.rows / self.calls, 1) if self.calls else 0.0,
+        }
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """The query with literals as ?, IN lists as (...) and whitespace collapsed."""
+    query = _LITERALS.sub("?", query)
+    query = _IN_LISTS.sub("(...)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+def _slow_query_logger():
+    global _slow_log
+    # Set up once, under the lock: the writer, snapshot and script threads
+    # can all hit their first slow query together
+    with _lock:
+        if _slow_log is None:
+            logger = logging.getLogger("slow_queries")
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+            if SLOW_QUERY_LOG and not logger.handlers:
+                handler = logging.FileHandler(SLOW_QUERY_LOG)
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+            _slow_log = logger
+    return _slow_log
+
+def record_query(query, elapsed, rows):
+    """Record one query taking `elapsed` seconds and returning/changing `rows` rows."""
+    elapsed_ms = elapsed * 1000
+    key = fingerprint(query)
+    with _lock:
+        stats = _queries.get(key)
+        if stats is None:
+            stats = _queries[key] = Stats()
+        stats.add(elapsed_ms, rows)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        # Parameters are left out of the log; they can hold user details
+        _slow.append({'at': datetime.now().strftime('%H:%M:%S'), 'ms': round(elapsed_ms, 1), 'rows': rows,
+                      'query': key})
+        _slow_query_logger().warning("%.1f ms rows=%d %s", elapsed_ms, rows, key)
+
+def record_timing(name, elapsed):
+    with _lock:
+        stats = _timings.get(name)
+        if stats is None:
+            stats = _timings[name] = Stats()
+        stats.add(elapsed * 1000, 0)
+
+@contextlib.contextmanager
+def _timing(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - started)
+
+def timed(name):
+    """Context manager recording how long its block takes under `name`."""
+    if not ENABLED:
+        return contextlib.nullcontext()
+    return _timing(name)
+
+def query_stats(top=None):
+    """Per-fingerprint summaries, slowest total time first."""
+    with _lock:
+        rows = [dict(query=key, **stats.summary()) for key, stats in _queries.items()]
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows[:top] if top else rows
+
+def timing_stats():
+    with _lock:
+        rows = [dict(name=name, **stats.summary()) for name, stats in _timings.items()]
+    rows.sort(key=lambda row: row['name'])
+    return rows
+
+def histogram(query):
+    """{bucket label: calls} for one fingerprint."""
+    with _lock:
+        stats = _queries.get(query)
+        buckets = list(stats.buckets) if stats else [0] * len(BUCKETS_MS)
+    labels = [f"≤{bound:g} ms" for bound in BUCKETS_MS[:-1]] + [f">{BUCKETS_MS[-2]:g} ms"]
+    return dict(zip(labels, buckets))
+
+def slow_queries():
+    return list(reversed(_slow))
+
+def collecting_since():
+    return _started
+
+def reset():
+    global _started
+    with _lock:
+        _queries.clear()
+        _timings.clear()
+        _slow.clear()
+        _started = datetime.now()
@@ -0,0 +1,653 @@
+import argparse
+
+import db
+import passwords
+
+# Seed data. Vendors are keyed on (name, location) and food items on
+# (vendor, name), so re-running the seed never inserts duplicates.
+SAMPLE_VENDORS = [
+    ("Campus Cafeteria", "Main campus dining hall", "Block A, Ground Floor", "08012345678", "cafeteria@fss.edu.ng", "7:00 AM - 9:00 PM"),
+    ("Quick Bites", "Fast food and snacks", "Student Center", "08098765432", "quickbites@fss.edu.ng", "8:00 AM - 8:00 PM"),
+    ("Healthy Meals", "Nutritious and organic food", "Faculty Building", "08055566677", "healthy@fss.edu.ng", "9:00 AM - 6:00 PM")
+]
+
+SAMPLE_FOODS = [
+    ("Campus Cafeteria", "Jollof Rice", "Spicy Nigerian rice dish", 800.00, "Main Course", "", 1, 20),
+    ("Campus Cafeteria", "Fried Rice", "Delicious fried rice with vegetables", 750.00, "Main Course", "", 1, 18),
+    ("Campus Cafeteria", "Chicken Stew", "Tender chicken in tomato stew", 1200.00, "Main Course", "", 1, 25),
+    ("Quick Bites", "Meat Pie", "Savory pastry with meat filling", 200.00, "Snacks", "", 1, 5),
+    ("Quick Bites", "Sausage Roll", "Crispy pastry with sausage", 150.00, "Snacks", "", 1, 5),
+    ("Quick Bites", "Soft Drinks", "Assorted soft drinks", 100.00, "Beverages", "", 1, 2),
+    ("Healthy Meals", "Grilled Fish", "Fresh grilled fish with vegetables", 1500.00, "Main Course", "", 1, 30),
+    ("Healthy Meals", "Vegetable Salad", "Fresh mixed vegetable salad", 600.00, "Salads", "", 1, 10),
+    ("Healthy Meals", "Fruit Juice", "Fresh fruit juice", 300.00, "Beverages", "", 1, 5)
+]
+
+# Tables whose row counts are kept in stats_counters as '<table>_rows'
+COUNTED_TABLES = ("users", "vendors", "food_items")
+
+# Table definitions are written for SQLite; PostgreSQL spells a few column
+# types differently. Booleans stay integers so `is_active = 1` works on both.
+POSTGRES_TYPES = (
+    ("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY"),
+    ("BOOLEAN DEFAULT 1", "INTEGER DEFAULT 1"),
+    (" REAL ", " DOUBLE PRECISION "),
+)
+
+# Held while migrating PostgreSQL so app nodes starting together take turns
+MIGRATION_LOCK_ID = 7312001
+
+def _ddl(statement):
+    if db.is_postgres():
+        for sqlite_type, postgres_type in POSTGRES_TYPES:
+            statement = statement.replace(sqlite_type, postgres_type)
+    return statement
+
+# Schema migrations
+def _create_base_schema(c):
+    # Users table
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        full_name TEXT NOT NULL,
+        phone TEXT,
+        user_type TEXT DEFAULT 'customer',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )'''))
+
+    # Vendors table
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS vendors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        location TEXT NOT NULL,
+        contact_phone TEXT,
+        contact_email TEXT,
+        operating_hours TEXT,
+        rating REAL DEFAULT 0.0,
+        is_active BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )'''))
+
+    # Food items table
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS food_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        vendor_id INTEGER,
+        name TEXT NOT NULL,
+        description TEXT,
+        price REAL NOT NULL,
+        category TEXT,
+        image_url TEXT,
+        is_available BOOLEAN DEFAULT 1,
+        preparation_time INTEGER DEFAULT 15,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (vendor_id) REFERENCES vendors (id)
+    )'''))
+
+    # Orders table
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_number TEXT UNIQUE NOT NULL,
+        customer_id INTEGER,
+        vendor_id INTEGER,
+        total_amount REAL NOT NULL,
+        status TEXT DEFAULT 'pending',
+        delivery_location TEXT,
+        special_instructions TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (customer_id) REFERENCES users (id),
+        FOREIGN KEY (vendor_id) REFERENCES vendors (id)
+    )'''))
+
+    # Order items table
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS order_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER,
+        food_item_id INTEGER,
+        quantity INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        subtotal REAL NOT NULL,
+        FOREIGN KEY (order_id) REFERENCES orders (id),
+        FOREIGN KEY (food_item_id) REFERENCES food_items (id)
+    )'''))
+
+def _add_natural_keys(c):
+    # Databases created before versioning re-ran the seed on every rerun,
+    # so collapse those copies before the unique indexes can be built.
+    dedupe(c)
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_vendors_name_location ON vendors (name, location)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_food_items_vendor_name ON food_items (vendor_id, name)")
+
+def _add_query_indexes(c):
+    # Access paths for the per-customer, per-vendor and per-order lookups
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders (customer_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_food_items_vendor_available ON food_items (vendor_id, is_available)")
+
+def _add_order_listing_indexes(c):
+    # Keyset pages walk (created_at, id) within the status or vendor filter;
+    # the implicit rowid makes each index end in id. (status, created_at)
+    # also covers plain status lookups.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders (status, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_vendor_created ON orders (vendor_id, created_at)")
+    c.execute("DROP INDEX IF EXISTS idx_orders_status")
+
+def _add_food_search_index_postgres(c):
+    # PostgreSQL keeps one weighted tsvector per available item in a side
+    # table (so `SELECT fi.*` is unchanged), with a GIN index for @@ lookups.
+    # Weights follow the SQLite BM25 ranking: name, category, vendor, description.
+    c.execute('''CREATE TABLE IF NOT EXISTS food_items_search (
+        food_item_id INTEGER PRIMARY KEY,
+        document TSVECTOR NOT NULL
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_food_items_search ON food_items_search USING GIN (document)")
+    c.execute('''CREATE OR REPLACE FUNCTION food_items_search_document(item food_items) RETURNS tsvector AS $$
+                     SELECT setweight(to_tsvector('simple', COALESCE(item.name, '')), 'A')
+                         || setweight(to_tsvector('simple', COALESCE(item.category, '')), 'B')
+                         || setweight(to_tsvector('simple', COALESCE((SELECT name FROM vendors WHERE id = item.vendor_id), '')), 'C')
+                         || setweight(to_tsvector('simple', COALESCE(item.description, '')), 'D')
+                 $$ LANGUAGE sql STABLE''')
+    c.execute('''INSERT INTO food_items_search (food_item_id, document)
+                 SELECT fi.id, food_items_search_document(fi) FROM food_items fi
+                 WHERE fi.is_available = 1
+                 ON CONFLICT (food_item_id) DO NOTHING''')
+
+    c.execute('''CREATE OR REPLACE FUNCTION food_items_search_refresh() RETURNS trigger AS $$
+                 BEGIN
+                     IF TG_OP <> 'INSERT' THEN
+                         DELETE FROM food_items_search WHERE food_item_id = OLD.id;
+                     END IF;
+                     IF TG_OP <> 'DELETE' AND NEW.is_available = 1 THEN
+                         INSERT INTO food_items_search (food_item_id, document)
+                         VALUES (NEW.id, food_items_search_document(NEW));
+                     END IF;
+                     RETURN NULL;
+                 END
+                 $$ LANGUAGE plpgsql''')
+    c.execute("DROP TRIGGER IF EXISTS food_items_search_refresh ON food_items")
+    c.execute('''CREATE TRIGGER food_items_search_refresh
+                 AFTER INSERT OR DELETE OR UPDATE OF name, description, category, vendor_id, is_available ON food_items
+                 FOR EACH ROW EXECUTE FUNCTION food_items_search_refresh()''')
+
+    c.execute('''CREATE OR REPLACE FUNCTION vendors_search_refresh() RETURNS trigger AS $$
+                 BEGIN
+                     UPDATE food_items_search s SET document = food_items_search_document(fi)
+                     FROM food_items fi
+                     WHERE fi.id = s.food_item_id AND fi.vendor_id = NEW.id;
+                     RETURN NULL;
+                 END
+                 $$ LANGUAGE plpgsql''')
+    c.execute("DROP TRIGGER IF EXISTS vendors_search_refresh ON vendors")
+    c.execute('''CREATE TRIGGER vendors_search_refresh AFTER UPDATE OF name ON vendors
+                 FOR EACH ROW EXECUTE FUNCTION vendors_search_refresh()''')
+
+def _add_food_search_index(c):
+    # Full-text index over available items, keyed by food_items.id. The vendor
+    # name is denormalised into it so one MATCH covers all four columns.
+    if db.is_postgres():
+        _add_food_search_index_postgres(c)
+        return
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS food_items_fts USING fts5(
+        name, description, category, vendor_name,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )''')
+    # Rank by BM25 weighting name, then category, vendor and description
+    c.execute("INSERT INTO food_items_fts (food_items_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 5.0, 3.0)')")
+    c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS food_items_fts_vocab USING fts5vocab(food_items_fts, 'row')")
+
+    c.execute('''INSERT INTO food_items_fts (rowid, name, description, category, vendor_name)
+                 SELECT fi.id, fi.name, fi.description, fi.category, v.name
+                 FROM food_items fi LEFT JOIN vendors v ON v.id = fi.vendor_id
+                 WHERE fi.is_available = 1''')
+
+    c.execute('''CREATE TRIGGER IF NOT EXISTS food_items_fts_insert AFTER INSERT ON food_items
+                 WHEN NEW.is_available = 1
+                 BEGIN
+                     INSERT INTO food_items_fts (rowid, name, description, category, vendor_name)
+                     VALUES (NEW.id, NEW.name, NEW.description, NEW.category,
+                             (SELECT name FROM vendors WHERE id = NEW.vendor_id));
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS food_items_fts_delete AFTER DELETE ON food_items
+                 BEGIN
+                     DELETE FROM food_items_fts WHERE rowid = OLD.id;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS food_items_fts_update
+                 AFTER UPDATE OF name, description, category, vendor_id, is_available ON food_items
+                 BEGIN
+                     DELETE FROM food_items_fts WHERE rowid = OLD.id;
+                     INSERT INTO food_items_fts (rowid, name, description, category, vendor_name)
+                     SELECT NEW.id, NEW.name, NEW.description, NEW.category,
+                            (SELECT name FROM vendors WHERE id = NEW.vendor_id)
+                     WHERE NEW.is_available = 1;
+                 END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS vendors_fts_update AFTER UPDATE OF name ON vendors
+                 BEGIN
+                     UPDATE food_items_fts SET vendor_name = NEW.name
+                     WHERE rowid IN (SELECT id FROM food_items WHERE vendor_id = NEW.id AND is_available = 1);
+                 END''')
+
+def _add_stats_triggers_postgres(c):
+    # Same bookkeeping as the SQLite triggers below, as PL/pgSQL functions.
+    # NEW is NULL on DELETE and OLD on INSERT, so each side only counts for
+    # the operations that have it.
+    def counter_trigger(name, table, columns, counter, condition):
+        delta = (f"CASE WHEN TG_OP <> 'DELETE' AND {condition.format('NEW')} THEN 1 ELSE 0 END"
+                 f" - CASE WHEN TG_OP <> 'INSERT' AND {condition.format('OLD')} THEN 1 ELSE 0 END")
+        c.execute(f'''CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+                      BEGIN
+                          UPDATE stats_counters SET value = value + ({delta}) WHERE name = '{counter}';
+                          RETURN NULL;
+                      END
+                      $$ LANGUAGE plpgsql''')
+        c.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        c.execute(f'''CREATE TRIGGER {name} AFTER INSERT OR DELETE OR UPDATE OF {columns} ON {table}
+                      FOR EACH ROW EXECUTE FUNCTION {name}()''')
+
+    counter_trigger("stats_users_change", "users", "user_type", "customers", "{0}.user_type != 'admin'")
+    counter_trigger("stats_vendors_change", "vendors", "is_active", "active_vendors", "{0}.is_active = 1")
+
+    revenue = "CASE WHEN {0}.status != 'cancelled' THEN {0}.total_amount ELSE 0 END"
+    c.execute(f'''CREATE OR REPLACE FUNCTION stats_orders_change() RETURNS trigger AS $$
+                  BEGIN
+                      IF TG_OP <> 'INSERT' THEN
+                          UPDATE stats_counters SET value = value - {revenue.format("OLD")} WHERE name = 'revenue';
+                          UPDATE daily_vendor_sales
+                          SET order_count = order_count - 1, revenue = revenue - {revenue.format("OLD")}
+                          WHERE day = {db.sql_day("OLD.created_at")} AND vendor_id = COALESCE(OLD.vendor_id, 0);
+                      END IF;
+                      IF TG_OP <> 'DELETE' THEN
+                          UPDATE stats_counters SET value = value + {revenue.format("NEW")} WHERE name = 'revenue';
+                          INSERT INTO daily_vendor_sales (day, vendor_id, order_count, revenue)
+                          VALUES ({db.sql_day("NEW.created_at")}, COALESCE(NEW.vendor_id, 0), 1, {revenue.format("NEW")})
+                          ON CONFLICT (day, vendor_id) DO UPDATE
+                          SET order_count = daily_vendor_sales.order_count + 1,
+                              revenue = daily_vendor_sales.revenue + EXCLUDED.revenue;
+                      END IF;
+                      IF TG_OP = 'INSERT' THEN
+                          UPDATE stats_counters SET value = value + 1 WHERE name = 'orders';
+                      ELSIF TG_OP = 'DELETE' THEN
+                          UPDATE stats_counters SET value = value - 1 WHERE name = 'orders';
+                      END IF;
+                      RETURN NULL;
+                  END
+                  $$ LANGUAGE plpgsql''')
+    c.execute("DROP TRIGGER IF EXISTS stats_orders_change ON orders")
+    c.execute('''CREATE TRIGGER stats_orders_change
+                 AFTER INSERT OR DELETE OR UPDATE OF status, total_amount, vendor_id, created_at ON orders
+                 FOR EACH ROW EXECUTE FUNCTION stats_orders_change()''')
+
+def _add_stats_tables(c):
+    # Dashboard totals and per-vendor daily sales, maintained by triggers so
+    # the dashboard reads a handful of rows instead of aggregating orders.
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0
+    )'''))
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS daily_vendor_sales (
+        day TEXT NOT NULL,
+        vendor_id INTEGER NOT NULL,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, vendor_id)
+    )'''))
+    rebuild_stats(c)
+    if db.is_postgres():
+        _add_stats_triggers_postgres(c)
+        return
+
+    def counter_trigger(name, event, table, counter, delta):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+                      BEGIN
+                          UPDATE stats_counters SET value = value + ({delta}) WHERE name = '{counter}';
+                      END''')
+
+    customer = "CASE WHEN {0}.user_type != 'admin' THEN 1 ELSE 0 END"
+    counter_trigger("stats_users_insert", "INSERT", "users", "customers", customer.format("NEW"))
+    counter_trigger("stats_users_delete", "DELETE", "users", "customers", "-" + customer.format("OLD"))
+    counter_trigger("stats_users_update", "UPDATE OF user_type", "users", "customers",
+                    f"{customer.format('NEW')} - {customer.format('OLD')}")
+
+    active = "CASE WHEN {0}.is_active = 1 THEN 1 ELSE 0 END"
+    counter_trigger("stats_vendors_insert", "INSERT", "vendors", "active_vendors", active.format("NEW"))
+    counter_trigger("stats_vendors_delete", "DELETE", "vendors", "active_vendors", "-" + active.format("OLD"))
+    counter_trigger("stats_vendors_update", "UPDATE OF is_active", "vendors", "active_vendors",
+                    f"{active.format('NEW')} - {active.format('OLD')}")
+
+    # Revenue excludes cancelled orders, matching the old SUM(...) query
+    revenue = "CASE WHEN {0}.status != 'cancelled' THEN {0}.total_amount ELSE 0 END"
+    add_sales = '''
+        INSERT OR IGNORE INTO daily_vendor_sales (day, vendor_id) VALUES (date(NEW.created_at), COALESCE(NEW.vendor_id, 0));
+        UPDATE daily_vendor_sales SET order_count = order_count + 1, revenue = revenue + {revenue}
+        WHERE day = date(NEW.created_at) AND vendor_id = COALESCE(NEW.vendor_id, 0);
+    '''.format(revenue=revenue.format("NEW"))
+    remove_sales = '''
+        UPDATE daily_vendor_sales SET order_count = order_count - 1, revenue = revenue - {revenue}
+        WHERE day = date(OLD.created_at) AND vendor_id = COALESCE(OLD.vendor_id, 0);
+    '''.format(revenue=revenue.format("OLD"))
+
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS stats_orders_insert AFTER INSERT ON orders
+                  BEGIN
+                      UPDATE stats_counters SET value = value + 1 WHERE name = 'orders';
+                      UPDATE stats_counters SET value = value + {revenue.format("NEW")} WHERE name = 'revenue';
+                      {add_sales}
+                  END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS stats_orders_delete AFTER DELETE ON orders
+                  BEGIN
+                      UPDATE stats_counters SET value = value - 1 WHERE name = 'orders';
+                      UPDATE stats_counters SET value = value - {revenue.format("OLD")} WHERE name = 'revenue';
+                      {remove_sales}
+                  END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS stats_orders_update
+                  AFTER UPDATE OF status, total_amount, vendor_id, created_at ON orders
+                  BEGIN
+                      UPDATE stats_counters SET value = value + {revenue.format("NEW")} - {revenue.format("OLD")}
+                      WHERE name = 'revenue';
+                      {remove_sales}
+                      {add_sales}
+                  END''')
+
+def _add_carts(c):
+    # Saved carts, one per customer, restored on login (see cart.py)
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS carts (
+        customer_id INTEGER PRIMARY KEY,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (customer_id) REFERENCES users (id)
+    )'''))
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS cart_items (
+        customer_id INTEGER NOT NULL,
+        food_item_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (customer_id, food_item_id),
+        FOREIGN KEY (customer_id) REFERENCES carts (customer_id),
+        FOREIGN KEY (food_item_id) REFERENCES food_items (id)
+    )'''))
+
+def _add_table_counters(c):
+    # Row counts for the paged admin grids (see grid.py), kept in
+    # stats_counters as '<table>_rows' by insert/delete triggers
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)")
+    rebuild_stats(c)
+    if db.is_postgres():
+        c.execute('''CREATE OR REPLACE FUNCTION stats_table_rows() RETURNS trigger AS $$
+                     BEGIN
+                         UPDATE stats_counters SET value = value + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END
+                         WHERE name = TG_ARGV[0];
+                         RETURN NULL;
+                     END
+                     $$ LANGUAGE plpgsql''')
+    for table in COUNTED_TABLES:
+        if db.is_postgres():
+            c.execute(f"DROP TRIGGER IF EXISTS stats_{table}_rows ON {table}")
+            c.execute(f'''CREATE TRIGGER stats_{table}_rows AFTER INSERT OR DELETE ON {table}
+                          FOR EACH ROW EXECUTE FUNCTION stats_table_rows('{table}_rows')''')
+            continue
+        for event, delta in (("INSERT", "+ 1"), ("DELETE", "- 1")):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS stats_{table}_rows_{event.lower()} AFTER {event} ON {table}
+                          BEGIN
+                              UPDATE stats_counters SET value = value {delta} WHERE name = '{table}_rows';
+                          END''')
+
+def _add_order_archive(c):
+    # Sales rolled up from orders moved to Parquet by archive.py, so
+    # rebuild_stats() can still count them. While archive_in_progress is set
+    # (only ever inside the archive job's transaction) deleting an order
+    # leaves the dashboard totals alone.
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS archived_daily_sales (
+        day TEXT NOT NULL,
+        vendor_id INTEGER NOT NULL,
+        order_count INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, vendor_id)
+    )'''))
+    c.execute("INSERT INTO stats_counters (name, value) VALUES ('archive_in_progress', 0) ON CONFLICT DO NOTHING")
+
+    revenue = "CASE WHEN OLD.status != 'cancelled' THEN OLD.total_amount ELSE 0 END"
+    remove_order = f'''
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'orders';
+        UPDATE stats_counters SET value = value - {revenue} WHERE name = 'revenue';
+        UPDATE daily_vendor_sales SET order_count = order_count - 1, revenue = revenue - {revenue}
+        WHERE day = {db.sql_day("OLD.created_at")} AND vendor_id = COALESCE(OLD.vendor_id, 0);
+    '''
+    archiving = "(SELECT value FROM stats_counters WHERE name = 'archive_in_progress') = 1"
+    if db.is_postgres():
+        # Deletes get their own trigger; stats_orders_change keeps inserts and updates
+        c.execute(f'''CREATE OR REPLACE FUNCTION stats_orders_delete() RETURNS trigger AS $$
+                      BEGIN
+                          IF NOT {archiving} THEN
+                              {remove_order}
+                          END IF;
+                          RETURN NULL;
+                      END
+                      $$ LANGUAGE plpgsql''')
+        c.execute("DROP TRIGGER IF EXISTS stats_orders_change ON orders")
+        c.execute('''CREATE TRIGGER stats_orders_change
+                     AFTER INSERT OR UPDATE OF status, total_amount, vendor_id, created_at ON orders
+                     FOR EACH ROW EXECUTE FUNCTION stats_orders_change()''')
+        c.execute("DROP TRIGGER IF EXISTS stats_orders_delete ON orders")
+        c.execute('''CREATE TRIGGER stats_orders_delete AFTER DELETE ON orders
+                     FOR EACH ROW EXECUTE FUNCTION stats_orders_delete()''')
+        return
+    c.execute("DROP TRIGGER IF EXISTS stats_orders_delete")
+    c.execute(f'''CREATE TRIGGER stats_orders_delete AFTER DELETE ON orders
+                  WHEN NOT {archiving}
+                  BEGIN
+                      {remove_order}
+                  END''')
+
+def _add_order_change_indexes(c):
+    # Change-since polling for the live order board (order_board.py)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_updated ON orders (updated_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_vendor_updated ON orders (vendor_id, updated_at)")
+
+def _add_session_versions(c):
+    # Bumped to revoke all of a user's session tokens at once (sessions.py)
+    c.execute("ALTER TABLE users ADD COLUMN session_version INTEGER NOT NULL DEFAULT 0")
+
+def _add_revoked_sessions(c):
+    # Signatures of logged-out tokens, kept until the token would have expired (sessions.py)
+    c.execute(_ddl('''CREATE TABLE IF NOT EXISTS revoked_sessions (
+        signature TEXT PRIMARY KEY,
+        expires_at INTEGER NOT NULL
+    )'''))
+    c.execute("CREATE INDEX IF NOT EXISTS idx_revoked_sessions_expires ON revoked_sessions (expires_at)")
+
+# Append new migrations to the end of this list; never reorder or edit one
+# that has already shipped. The list position is the schema version.
+MIGRATIONS = [
+    _create_base_schema,
+    _add_natural_keys,
+    _add_query_indexes,
+    _add_order_listing_indexes,
+    _add_food_search_index,
+    _add_stats_tables,
+    _add_carts,
+    _add_table_counters,
+    _add_order_archive,
+    _add_order_change_indexes,
+    _add_session_versions,
+    _add_revoked_sessions,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(conn):
+    if db.is_postgres():
+        if conn.execute("SELECT to_regclass('schema_version')").fetchone()[0] is None:
+            return 0
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def _set_schema_version(c, version):
+    if db.is_postgres():
+        c.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        c.execute("DELETE FROM schema_version")
+        c.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+    else:
+        # PRAGMA does not take parameters; version is always an int here
+        c.execute(f"PRAGMA user_version = {version}")
+
+def migrate(conn):
+    """Apply pending migrations and seed a freshly migrated database.
+
+    Returns the list of versions that were applied; an up-to-date database
+    costs a single version read.
+    """
+    current = get_schema_version(conn)
+    applied = []
+
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        with conn:
+            c = conn.cursor()
+            if db.is_postgres():
+                # psycopg2 has already begun the transaction; wait for any
+                # other node that is migrating, then re-check
+                c.execute("SELECT pg_advisory_xact_lock(?)", (MIGRATION_LOCK_ID,))
+            else:
+                # Take the write lock up front, so a second process migrating
+                # at the same time waits here and then sees the new version
+                c.execute("BEGIN IMMEDIATE")
+            if get_schema_version(conn) >= version:
+                continue
+            MIGRATIONS[version - 1](c)
+            _set_schema_version(c, version)
+        applied.append(version)
+
+    if applied:
+        with conn:
+            seed(conn.cursor())
+
+    return applied
+
+def seed(c):
+    # Insert default admin user
+    admin_password = passwords.hash_password("admin")
+    c.execute('''INSERT INTO users (username, password, email, full_name, user_type)
+                 VALUES (?, ?, ?, ?, ?)
+                 ON CONFLICT DO NOTHING''',
+              ("admin", admin_password, "admin@fss.edu.ng", "System Administrator", "admin"))
+
+    # Insert sample vendors
+    c.executemany('''INSERT INTO vendors (name, description, location, contact_phone, contact_email, operating_hours)
+                     VALUES (?, ?, ?, ?, ?, ?)
+                     ON CONFLICT DO NOTHING''', SAMPLE_VENDORS)
+
+    # Insert sample food items, resolving the vendor by name rather than by id
+    c.executemany('''INSERT INTO food_items (vendor_id, name, description, price, category, image_url, is_available, preparation_time)
+                     SELECT id, ?, ?, ?, ?, ?, ?, ? FROM vendors WHERE name = ?
+                     ORDER BY id LIMIT 1
+                     ON CONFLICT DO NOTHING''',
+                  [food[1:] + (food[0],) for food in SAMPLE_FOODS])
+
+def dedupe(c):
+    """Collapse duplicate vendors and food items onto their oldest row.
+
+    References from food_items, orders and order_items are repointed before
+    the duplicates are deleted. Returns (vendors_removed, food_items_removed).
+    """
+    c.execute("DROP TABLE IF EXISTS vendor_remap")
+    c.execute('''CREATE TEMP TABLE vendor_remap AS
+                 SELECT v.id AS old_id, k.keep_id AS new_id
+                 FROM vendors v
+                 JOIN (SELECT name, location, MIN(id) AS keep_id FROM vendors GROUP BY name, location) k
+                   ON v.name = k.name AND v.location = k.location
+                 WHERE v.id != k.keep_id''')
+    for table in ("food_items", "orders"):
+        c.execute(f'''UPDATE {table}
+                      SET vendor_id = (SELECT new_id FROM vendor_remap WHERE old_id = {table}.vendor_id)
+                      WHERE vendor_id IN (SELECT old_id FROM vendor_remap)''')
+    c.execute("DELETE FROM vendors WHERE id IN (SELECT old_id FROM vendor_remap)")
+    vendors_removed = c.rowcount
+    c.execute("DROP TABLE vendor_remap")
+
+    c.execute("DROP TABLE IF EXISTS food_remap")
+    c.execute('''CREATE TEMP TABLE food_remap AS
+                 SELECT fi.id AS old_id, k.keep_id AS new_id
+                 FROM food_items fi
+                 JOIN (SELECT vendor_id, name, MIN(id) AS keep_id FROM food_items GROUP BY vendor_id, name) k
+                   ON COALESCE(fi.vendor_id, 0) = COALESCE(k.vendor_id, 0) AND fi.name = k.name
+                 WHERE fi.id != k.keep_id''')
+    c.execute('''UPDATE order_items
+                 SET food_item_id = (SELECT new_id FROM food_remap WHERE old_id = order_items.food_item_id)
+                 WHERE food_item_id IN (SELECT old_id FROM food_remap)''')
+    c.execute("DELETE FROM food_items WHERE id IN (SELECT old_id FROM food_remap)")
+    food_items_removed = c.rowcount
+    c.execute("DROP TABLE food_remap")
+
+    return vendors_removed, food_items_removed
+
+def _has_table(c, name):
+    if db.is_postgres():
+        return c.execute("SELECT to_regclass(?)", (name,)).fetchone()[0] is not None
+    return c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def rebuild_stats(c):
+    """Recompute stats_counters and daily_vendor_sales from the live tables.
+
+    Orders already moved out by archive.py are added back from
+    archived_daily_sales.
+    """
+    archived = _has_table(c, "archived_daily_sales")
+    live_sales = f'''SELECT {db.sql_day('created_at')} AS day, COALESCE(vendor_id, 0) AS vendor_id, COUNT(*) AS order_count,
+                           COALESCE(SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END), 0) AS revenue
+                    FROM orders
+                    GROUP BY {db.sql_day('created_at')}, COALESCE(vendor_id, 0)'''
+    if archived:
+        live_sales += " UNION ALL SELECT day, vendor_id, order_count, revenue FROM archived_daily_sales"
+
+    c.execute("DELETE FROM daily_vendor_sales")
+    c.execute(f'''INSERT INTO daily_vendor_sales (day, vendor_id, order_count, revenue)
+                  SELECT day, vendor_id, SUM(order_count), SUM(revenue)
+                  FROM ({live_sales}) sales
+                  GROUP BY day, vendor_id''')
+
+    c.execute("DELETE FROM stats_counters")
+    c.execute('''INSERT INTO stats_counters (name, value)
+                 SELECT 'customers', COUNT(*) FROM users WHERE user_type != 'admin'
+                 UNION ALL SELECT 'active_vendors', COUNT(*) FROM vendors WHERE is_active = 1
+                 UNION ALL SELECT 'orders', COALESCE(SUM(order_count), 0) FROM daily_vendor_sales
+                 UNION ALL SELECT 'revenue', COALESCE(SUM(revenue), 0) FROM daily_vendor_sales''')
+    for table in COUNTED_TABLES:
+        c.execute(f"INSERT INTO stats_counters (name, value) SELECT '{table}_rows', COUNT(*) FROM {table}")
+    if archived:
+        c.execute("INSERT INTO stats_counters (name, value) VALUES ('archive_in_progress', 0)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the campus food database schema")
+    parser.add_argument("--db", default=db.DB_PATH, help="path to the SQLite database file")
+    parser.add_argument("--backend", default=db.BACKEND, choices=("sqlite", "postgres"))
+    parser.add_argument("--database-url", default=db.DATABASE_URL, help="PostgreSQL connection URL")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("upgrade", help="apply pending migrations and seed data")
+    sub.add_parser("dedupe", help="remove duplicate vendors and food items")
+    sub.add_parser("rebuild-stats", help="recompute dashboard counters and daily sales")
+    sub.add_parser("version", help="print the current schema version")
+    args = parser.parse_args(argv)
+
+    db.configure(args.db, backend=args.backend, database_url=args.database_url)
+    with db.connection() as conn:
+        if args.command == "upgrade":
+            applied = migrate(conn)
+            if applied:
+                print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+            else:
+                print(f"Already at schema version {SCHEMA_VERSION}")
+        elif args.command == "dedupe":
+            with db.transaction():
+                vendors_removed, food_items_removed = dedupe(conn.cursor())
+            print(f"Removed {vendors_removed} duplicate vendors and {food_items_removed} duplicate food items")
+        elif args.command == "rebuild-stats":
+            with db.transaction():
+                rebuild_stats(conn.cursor())
+            print("Rebuilt dashboard statistics")
+        else:
+            print(f"Schema version {get_schema_version(conn)} (latest {SCHEMA_VERSION})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import db
+import settings
+
+# Live kitchen board of the orders still in progress. The board loads the
+# active orders once, then each refresh asks only for orders past the last
+# (updated_at, id) it saw (the watermark), served by idx_orders_updated /
+# idx_orders_vendor_updated. An idle board therefore costs one index probe
+# per refresh, however many orders exist.
+#
+# updated_at has one-second resolution and a write may commit a moment
+# after its timestamp was taken, so each poll re-reads OVERLAP_SECONDS
+# before the watermark. Rows the board already holds at that updated_at and
+# status are skipped. While catching up on a backlog larger than
+# CHANGES_LIMIT the overlap is left out and each poll pages on from the
+# exact (updated_at, id) it stopped at, so even a bulk update that stamps
+# thousands of orders with the same second is worked through.
+REFRESH_SECONDS = settings.get_float('ORDER_BOARD_REFRESH', 5) or None
+OVERLAP_SECONDS = 5
+BOARD_LIMIT = settings.get_int('ORDER_BOARD_LIMIT', 200)
+CHANGES_LIMIT = 500
+ACTIVE_STATUSES = ("pending", "confirmed", "preparing", "ready")
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = '1970-01-01 00:00:00'
+
+_COLUMNS = '''o.id, o.order_number, o.vendor_id, v.name AS vendor_name, u.full_name AS customer_name,
+              o.status, o.total_amount, o.delivery_location, o.special_instructions, o.created_at, o.updated_at'''
+
+def _timestamp(value):
+    # Text on SQLite, datetime on PostgreSQL
+    return str(value)[:19]
+
+class OrderBoard:
+    def __init__(self, vendor_id=None, limit=BOARD_LIMIT):
+        self.vendor_id = vendor_id
+        self.limit = limit
+        # order id -> {'order': row, 'items': [(food name, quantity), ...]}
+        self.orders = {}
+        self.watermark = None
+        # Id of the last order read at the watermark's updated_at
+        self.last_id = 0
+        self.caught_up = True
+        self.refreshed_at = None
+
+    def _vendor_filter(self):
+        if self.vendor_id is None:
+            return "", []
+        return "AND o.vendor_id = ?", [self.vendor_id]
+
+    def load(self):
+        """(Re)load the newest `limit` active orders and reset the watermark."""
+        vendor_filter, params = self._vendor_filter()
+        latest = db.query_scalar(f"SELECT MAX(o.updated_at) FROM orders o WHERE 1 = 1 {vendor_filter}", params)
+        self.watermark = _timestamp(latest) if latest else EPOCH
+        self.last_id = 0
+        self.caught_up = True
+        placeholders = ", ".join("?" * len(ACTIVE_STATUSES))
+        rows = db.query_rows(f'''SELECT {_COLUMNS}
+                                 FROM orders o
+                                 LEFT JOIN vendors v ON v.id = o.vendor_id
+                                 LEFT JOIN users u ON u.id = o.customer_id
+                                 WHERE o.status IN ({placeholders}) {vendor_filter}
+                                 ORDER BY o.created_at DESC
+                                 LIMIT ?''', list(ACTIVE_STATUSES) + params + [self.limit])
+        self.orders = {}
+        self._apply(rows)
+        self.refreshed_at = datetime.now()
+
+    def refresh(self):
+        """Apply orders changed since the watermark; returns how many changed."""
+        if self.watermark is None:
+            self.load()
+            return len(self.orders)
+        if self.caught_up:
+            since = datetime.strptime(self.watermark, TIMESTAMP_FORMAT) - timedelta(seconds=OVERLAP_SECONDS)
+            since, after_id = since.strftime(TIMESTAMP_FORMAT), 0
+        else:
+            since, after_id = self.watermark, self.last_id
+        vendor_filter, params = self._vendor_filter()
+        # The leading range keeps the OR on the updated_at index
+        rows = db.query_rows(f'''SELECT {_COLUMNS}
+                                 FROM orders o
+                                 LEFT JOIN vendors v ON v.id = o.vendor_id
+                                 LEFT JOIN users u ON u.id = o.customer_id
+                                 WHERE o.updated_at >= ? AND (o.updated_at > ? OR o.id > ?) {vendor_filter}
+                                 ORDER BY o.updated_at, o.id
+                                 LIMIT ?''', [since, since, after_id] + params + [CHANGES_LIMIT])
+        changed = [row for row in rows if self._is_change(row)]
+        if rows:
+            last = (_timestamp(rows[-1].updated_at), rows[-1].id)
+            if last > (self.watermark, self.last_id):
+                self.watermark, self.last_id = last
+        self.caught_up = len(rows) < CHANGES_LIMIT
+        self._apply(changed)
+        self.refreshed_at = datetime.now()
+        return len(changed)
+
+    def _is_change(self, row):
+        entry = self.orders.get(row.id)
+        if entry is None:
+            return row.status in ACTIVE_STATUSES
+        return (row.status, _timestamp(row.updated_at)) != (entry['order'].status, _timestamp(entry['order'].updated_at))
+
+    def _apply(self, rows):
+        new_ids = []
+        for row in rows:
+            if row.status not in ACTIVE_STATUSES:
+                self.orders.pop(row.id, None)
+                continue
+            entry = self.orders.get(row.id)
+            if entry is None:
+                self.orders[row.id] = {'order': row, 'items': []}
+                new_ids.append(row.id)
+            else:
+                entry['order'] = row
+        self._load_items(new_ids)
+        if len(self.orders) > self.limit:
+            # Keep the newest orders when more are active than the board shows
+            keep = sorted(self.orders.values(), key=lambda entry: _timestamp(entry['order'].created_at),
+                          reverse=True)[:self.limit]
+            self.orders = {entry['order'].id: entry for entry in keep}
+
+    def _load_items(self, order_ids):
+        # Line items only change with a new order, so they are read once per order
+        if not order_ids:
+            return
+        placeholders = ", ".join("?" * len(order_ids))
+        rows = db.query_rows(f'''SELECT oi.order_id, fi.name, oi.quantity
+                                 FROM order_items oi
+                                 LEFT JOIN food_items fi ON fi.id = oi.food_item_id
+                                 WHERE oi.order_id IN ({placeholders})
+                                 ORDER BY oi.order_id, oi.id''', order_ids)
+        for row in rows:
+            self.orders[row.order_id]['items'].append((row.name, row.quantity))
+
+    def by_status(self):
+        """{status: [entry, ...]} for the active statuses, oldest order first."""
+        columns = {status: [] for status in ACTIVE_STATUSES}
+        for entry in sorted(self.orders.values(), key=lambda entry: _timestamp(entry['order'].created_at)):
+            columns[entry['order'].status].append(entry)
+        return columns
@@ -0,0 +1,148 @@
+import argparse
+import csv
+import itertools
+import json
+import time
+import uuid
+from datetime import datetime
+
+import db
+
+# Order creation. create_orders_bulk() is the single write path: checkout
+# passes one order, imports pass thousands. Everything in a call shares one
+# transaction and rows are written with executemany.
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_BATCH_SIZE = 10000
+
+def new_order_number(created_at=None):
+    day = (created_at or datetime.now().strftime('%Y-%m-%d'))[:10].replace('-', '')
+    return f"FSS{day}{str(uuid.uuid4())[:8].upper()}"
+
+def _line_item(item):
+    # Accepts cart items ({'id', 'price', ...}) as well as import rows
+    # ({'food_item_id', 'unit_price', ...})
+    food_item_id = item['food_item_id'] if 'food_item_id' in item else item['id']
+    unit_price = float(item['unit_price'] if 'unit_price' in item else item['price'])
+    quantity = int(item['quantity'])
+    subtotal = float(item['subtotal']) if item.get('subtotal') not in (None, '') else unit_price * quantity
+    return food_item_id, quantity, unit_price, subtotal
+
+def _reserve_order_ids(c, count):
+    # Ids are assigned up front so order items can reference them without
+    # reading back lastrowid (or RETURNING) one row at a time.
+    if db.is_postgres():
+        # nextval() never hands the same id to two app nodes
+        return [row[0] for row in c.execute("SELECT nextval('orders_id_seq') FROM generate_series(1, ?)",
+                                            (count,)).fetchall()]
+    # The write lock is held from BEGIN IMMEDIATE, so the next free id is
+    # ours. sqlite_sequence keeps AUTOINCREMENT from reusing ids of deleted orders.
+    next_id = c.execute('''SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'orders'), 0),
+                                     COALESCE(MAX(id), 0)) + 1
+                            FROM orders''').fetchone()[0]
+    return range(next_id, next_id + count)
+
+def create_orders_bulk(orders, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Insert many orders and their items in one transaction.
+
+    Each order is a dict with customer_id, vendor_id, items and
+    delivery_location, plus optional total_amount (defaults to the sum of
+    item subtotals), special_instructions, status, created_at and
+    order_number. Returns the order numbers in input order.
+    """
+    order_numbers = []
+    with db.transaction() as conn:
+        c = conn.cursor()
+        orders = iter(orders)
+        while True:
+            chunk = list(itertools.islice(orders, chunk_size))
+            if not chunk:
+                break
+
+            order_rows = []
+            item_rows = []
+            for order, order_id in zip(chunk, _reserve_order_ids(c, len(chunk))):
+                items = [_line_item(item) for item in order['items']]
+                total_amount = order.get('total_amount')
+                if total_amount in (None, ''):
+                    total_amount = sum(item[3] for item in items)
+                created_at = order.get('created_at') or None
+                order_number = order.get('order_number') or new_order_number(created_at)
+                order_rows.append((order_id, order_number, order['customer_id'], order['vendor_id'], float(total_amount),
+                                   order.get('status') or 'pending', order.get('delivery_location'),
+                                   order.get('special_instructions') or "", created_at, created_at))
+                item_rows.extend((order_id,) + item for item in items)
+                order_numbers.append(order_number)
+
+            c.executemany('''INSERT INTO orders (id, order_number, customer_id, vendor_id, total_amount, status,
+                                                 delivery_location, special_instructions, created_at, updated_at)
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?,
+                                     COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))''', order_rows)
+            c.executemany('''INSERT INTO order_items (order_id, food_item_id, quantity, unit_price, subtotal)
+                             VALUES (?, ?, ?, ?, ?)''', item_rows)
+    return order_numbers
+
+# File readers for the import CLI. Both stream, so files of any size can be
+# loaded with bounded memory.
+def read_orders_jsonl(path):
+    # One order per line, with an "items" list
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_orders_csv(path):
+    # One line item per row; consecutive rows with the same order_ref (or
+    # order_number) form one order. A row with neither is an order of its own.
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = enumerate(csv.DictReader(f))
+        key = lambda numbered: numbered[1].get('order_ref') or numbered[1].get('order_number') or numbered[0]
+        for _, numbered in itertools.groupby(rows, key=key):
+            lines = [line for _, line in numbered]
+            first = lines[0]
+            yield {
+                'order_number': first.get('order_number'),
+                'customer_id': int(first['customer_id']),
+                'vendor_id': int(first['vendor_id']),
+                'total_amount': first.get('total_amount'),
+                'status': first.get('status'),
+                'delivery_location': first.get('delivery_location'),
+                'special_instructions': first.get('special_instructions'),
+                'created_at': first.get('created_at'),
+                'items': [{'food_item_id': int(line['food_item_id']), 'quantity': line['quantity'],
+                           'unit_price': line['unit_price'], 'subtotal': line.get('subtotal')} for line in lines],
+            }
+
+def import_orders(path, file_format=None, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Commits every batch_size orders to keep transactions and the WAL bounded.
+    # Yields the number of orders written after each batch.
+    file_format = file_format or ('csv' if path.endswith('.csv') else 'jsonl')
+    reader = read_orders_csv if file_format == 'csv' else read_orders_jsonl
+    orders = reader(path)
+    while True:
+        batch = list(itertools.islice(orders, batch_size))
+        if not batch:
+            return
+        create_orders_bulk(batch, chunk_size=chunk_size)
+        yield len(batch)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load orders from CSV or JSONL files")
+    parser.add_argument("files", nargs="+", help="CSV (one row per line item) or JSONL (one order per line)")
+    parser.add_argument("--db", default=db.DB_PATH, help="path to the SQLite database file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: from the extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="orders per transaction")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="orders per executemany call")
+    args = parser.parse_args(argv)
+
+    db.configure(args.db)
+    started = time.perf_counter()
+    total = 0
+    for path in args.files:
+        for count in import_orders(path, args.format, args.batch_size, args.chunk_size):
+            total += count
+            elapsed = time.perf_counter() - started
+            print(f"{total:,} orders imported ({total / elapsed:,.0f}/s)", flush=True)
+    print(f"Done: {total:,} orders in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import base64
+import collections
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+
+# Password hashing and signed session tokens.
+#
+# Passwords are stored as "scrypt$n$r$p$salt$hash". The scrypt cost is
+# tunable with PASSWORD_SCRYPT_N/R/P. Hashes made with other parameters, and
+# the old unsalted SHA-256 hex digests, still verify and are replaced on the
+# user's next login (see needs_rehash).
+#
+# scrypt is CPU- and memory-heavy. It runs on a small thread pool and
+# hashlib releases the GIL while it works, so script threads and other
+# sessions keep running. At most MAX_PENDING hashes may be queued or running.
+# Past that, callers wait up to QUEUE_TIMEOUT and then get LoginBusy instead
+# of piling up.
+SCRYPT_N = settings.get_int('PASSWORD_SCRYPT_N', 2 ** 14)
+SCRYPT_R = settings.get_int('PASSWORD_SCRYPT_R', 8)
+SCRYPT_P = settings.get_int('PASSWORD_SCRYPT_P', 1)
+SALT_BYTES = 16
+KEY_BYTES = 32
+WORKERS = settings.get_int('PASSWORD_WORKERS', min(4, os.cpu_count() or 1))
+MAX_PENDING = settings.get_int('PASSWORD_MAX_PENDING', 32)
+QUEUE_TIMEOUT = settings.get_float('PASSWORD_QUEUE_TIMEOUT', 5.0)
+
+# Session tokens are "user_id.expires.nonce.signature", signed with
+# SESSION_SECRET over the user's stored password hash and session version.
+# A password change (or rehash), or bumping users.session_version, invalidates
+# every token issued before it; sessions.py revokes single tokens on logout.
+#
+# SESSION_SECRET must be shared by every app node. Unless APP_ENV is
+# explicitly "development", signing refuses to run without it (the app
+# checks at start-up); in development a secret is generated per process, so
+# sessions end when the app restarts.
+APP_ENV = settings.get_setting('APP_ENV', 'production')
+SESSION_TTL = settings.get_int('SESSION_TTL', 2 * 60 * 60)
+# Recently checked tokens skip the user lookup for this long. A logout on
+# another node reaches this one's cache only after it expires.
+TOKEN_CACHE_TTL = settings.get_int('SESSION_TOKEN_CACHE_TTL', 60)
+TOKEN_CACHE_SIZE = settings.get_int('SESSION_TOKEN_CACHE_SIZE', 10000)
+
+class LoginBusy(Exception):
+    pass
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="password")
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+_sessions = collections.OrderedDict()
+_sessions_lock = threading.Lock()
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                          maxmem=128 * r * (n + p + 2) + 1024 * 1024)
+
+def _run(fn, *args):
+    # Run fn on the password pool, holding one of the MAX_PENDING slots
+    if not _slots.acquire(timeout=QUEUE_TIMEOUT):
+        raise LoginBusy("Too many people are signing in right now. Please try again in a moment.")
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+def _hash(password):
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+def _verify(password, stored):
+    try:
+        scheme, n, r, p, salt, key = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        expected = _unb64(key)
+        return hmac.compare_digest(_scrypt(password, _unb64(salt), int(n), int(r), int(p)), expected)
+    except ValueError:
+        return False
+
+def _is_legacy(stored):
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+def hash_password(password):
+    return _run(_hash, password)
+
+def verify_password(password, stored):
+    """Check a password against a stored hash of either format."""
+    if _is_legacy(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    return _run(_verify, password, stored)
+
+def needs_rehash(stored):
+    """True for legacy SHA-256 hashes and scrypt hashes made with other parameters."""
+    return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+@functools.lru_cache(maxsize=1)
+def _dummy_hash():
+    # Made on first use rather than at import, to keep start-up cheap
+    return _hash(secrets.token_hex(16))
+
+def verify_missing_user(password):
+    """Spend the same time as a real check, so a failed login doesn't reveal whether the username exists."""
+    _run(lambda: _verify(password, _dummy_hash()))
+    return False
+
+@functools.lru_cache(maxsize=1)
+def session_secret():
+    secret = settings.get_setting('SESSION_SECRET')
+    if not secret:
+        if APP_ENV != 'development':
+            raise RuntimeError("SESSION_SECRET is not set. Every app node needs the same secret to sign "
+                               "sessions; set APP_ENV = \"development\" to run without one locally.")
+        logging.getLogger(__name__).warning(
+            "SESSION_SECRET is not set; using a per-process secret, so sessions end on restart")
+        secret = secrets.token_hex(32)
+    return secret.encode()
+
+def _signature(user_id, expires, nonce, stored, version):
+    message = f"{user_id}.{expires}.{nonce}.{version}.{stored}".encode()
+    return _b64(hmac.new(session_secret(), message, hashlib.sha256).digest())
+
+def issue_token(user_id, stored, version, ttl=SESSION_TTL):
+    expires = int(time.time()) + ttl
+    # The nonce keeps two logins in the same second apart, so each can be revoked alone
+    nonce = secrets.token_hex(8)
+    return f"{user_id}.{expires}.{nonce}.{_signature(user_id, expires, nonce, stored, version)}"
+
+def token_parts(token):
+    """(user id, expires, signature) of an unexpired, well-formed token, else None (signature not checked)."""
+    try:
+        user_id, expires, _, signature = token.split(".")
+        if int(expires) < time.time():
+            return None
+        return int(user_id), int(expires), signature
+    except (AttributeError, ValueError):
+        return None
+
+def token_matches(token, stored, version):
+    user_id, expires, nonce, signature = token.split(".")
+    return hmac.compare_digest(_signature(user_id, expires, nonce, stored, version), signature)
+
+def remember_session(token, user):
+    with _sessions_lock:
+        _sessions[token] = (user, time.monotonic() + TOKEN_CACHE_TTL)
+        _sessions.move_to_end(token)
+        while len(_sessions) > TOKEN_CACHE_SIZE:
+            _sessions.popitem(last=False)
+
+def cached_session(token):
+    """The user for a recently checked token, or None."""
+    with _sessions_lock:
+        entry = _sessions.get(token)
+        if entry is None:
+            return None
+        user, fresh_until = entry
+        if fresh_until < time.monotonic() or token_parts(token) is None:
+            del _sessions[token]
+            return None
+        return user
+
+def forget_session(token):
+    with _sessions_lock:
+        _sessions.pop(token, None)
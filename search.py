@@ -0,0 +1,47 @@
+import difflib
+import re
+
+import db
+
+# Full-text search helpers for the food_items_fts index (see migrations.py).
+# Terms are matched as prefixes so partial words work while typing; when
+# nothing matches, misspelled terms are swapped for the closest indexed word.
+# On PostgreSQL the food_items_search tsvector table plays the same role.
+MIN_CORRECTION_LENGTH = 3
+CORRECTION_CUTOFF = 0.75
+
+def tokenize(search_term):
+    return re.findall(r'\w+', search_term.lower())
+
+def match_expression(terms):
+    if db.is_postgres():
+        # to_tsquery() syntax; tokenize() leaves only word characters
+        return " & ".join(f"{term}:*" for term in terms)
+    # Quote each term so FTS5 operators typed by users are taken literally
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _is_indexed_prefix(term):
+    return db.fetchone("SELECT 1 FROM food_items_fts_vocab WHERE term >= ? AND term < ? LIMIT 1",
+                       (term, term + "\uffff")) is not None
+
+def correct_terms(terms):
+    """Replace terms that match nothing with the closest indexed word.
+
+    Candidates share the first letter and are within two characters of the
+    term's length, which keeps the vocabulary read small. Terms are
+    returned unchanged on PostgreSQL, which has no fts5vocab table.
+    """
+    if db.is_postgres():
+        return list(terms)
+    corrected = []
+    for term in terms:
+        if len(term) < MIN_CORRECTION_LENGTH or _is_indexed_prefix(term):
+            corrected.append(term)
+            continue
+        candidates = [row[0] for row in db.fetchall(
+            '''SELECT term FROM food_items_fts_vocab
+               WHERE term >= ? AND term < ? AND length(term) BETWEEN ? AND ?''',
+            (term[0], chr(ord(term[0]) + 1), len(term) - 2, len(term) + 2))]
+        matches = difflib.get_close_matches(term, candidates, n=1, cutoff=CORRECTION_CUTOFF)
+        corrected.append(matches[0] if matches else term)
+    return corrected
@@ -0,0 +1,78 @@
+import time
+
+import db
+import passwords
+import write_queue
+
+# Logins and session tokens (token format and signing live in passwords.py).
+#
+# A browser keeps its token in a cookie and presents it instead of the
+# password on its next visit. Logging out revokes just that token: its
+# signature goes into revoked_sessions until the token would have expired.
+# revoke_all() bumps users.session_version, which invalidates every token the
+# user holds, e.g. after a password change.
+
+def _session_user(row):
+    return {"id": row.id, "username": row.username, "user_type": row.user_type, "full_name": row.full_name}
+
+def authenticate(username, password):
+    """Return (user, session token) for valid credentials, else (None, None).
+
+    Raises passwords.LoginBusy when too many logins are being checked at once.
+    """
+    user = db.query_row("""SELECT id, username, password, session_version, user_type, full_name
+                           FROM users WHERE username = ?""", (username,))
+    if user is None:
+        passwords.verify_missing_user(password)
+        return None, None
+    if not passwords.verify_password(password, user.password):
+        return None, None
+    stored = user.password
+    if passwords.needs_rehash(stored):
+        # Legacy SHA-256 (or outdated scrypt settings): store a current hash now that we have the password
+        stored = passwords.hash_password(password)
+        write_queue.call(db.execute, "UPDATE users SET password = ? WHERE id = ?", (stored, user.id))
+    return _session_user(user), passwords.issue_token(user.id, stored, user.session_version)
+
+def restore(token):
+    """The user a session token belongs to, or None if it is invalid, expired or revoked."""
+    # The signature covers the stored hash, so this is two indexed lookups and
+    # an HMAC rather than a KDF; recently checked tokens skip even that.
+    user = passwords.cached_session(token)
+    if user is not None:
+        return user
+    parts = passwords.token_parts(token)
+    if parts is None:
+        return None
+    user_id, _, signature = parts
+    row = db.query_row("""SELECT id, username, password, session_version, user_type, full_name
+                          FROM users WHERE id = ?""", (user_id,))
+    if row is None or not passwords.token_matches(token, row.password, row.session_version):
+        return None
+    if db.query_scalar("SELECT 1 FROM revoked_sessions WHERE signature = ?", (signature,)):
+        return None
+    user = _session_user(row)
+    passwords.remember_session(token, user)
+    return user
+
+def _revoke(signature, expires):
+    now = int(time.time())
+    with db.transaction():
+        db.execute("DELETE FROM revoked_sessions WHERE expires_at < ?", (now,))
+        db.execute("INSERT INTO revoked_sessions (signature, expires_at) VALUES (?, ?) ON CONFLICT DO NOTHING",
+                   (signature, expires))
+
+def revoke(token):
+    """Log one token out; the user's other sessions stay signed in."""
+    passwords.forget_session(token)
+    parts = passwords.token_parts(token)
+    if parts is None:
+        return
+    _, expires, signature = parts
+    write_queue.call(_revoke, signature, expires)
+
+def revoke_all(user_id):
+    # Every token signed with the old version stops verifying. Other app
+    # nodes may still serve one from their token cache for TOKEN_CACHE_TTL.
+    write_queue.call(db.execute, "UPDATE users SET session_version = session_version + 1 WHERE id = ?",
+                     (user_id,))
@@ -0,0 +1,26 @@
+import os
+
+# Runtime configuration. Values come from environment variables first, so
+# CLIs and one-off scripts can override them, and then from
+# .streamlit/secrets.toml when running inside Streamlit.
+def get_setting(name, default=None):
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        import streamlit as st
+        return st.secrets.get(name, default)
+    except Exception:
+        # No Streamlit install or no secrets file
+        return default
+
+def get_int(name, default):
+    return int(get_setting(name, default))
+
+def get_float(name, default):
+    return float(get_setting(name, default))
+
+def get_bool(name, default=False):
+    value = get_setting(name, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
@@ -0,0 +1,104 @@
+import contextlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import db
+import settings
+
+# Point-in-time copy of the SQLite database for admin analytics.
+#
+# The copy is made with SQLite's online backup API in a single step, so it
+# reads one consistent snapshot. In WAL mode checkouts keep committing while
+# it runs. Analytics queries then run against the copy through an immutable
+# read-only connection and never touch the live file.
+#
+# A snapshot older than REFRESH_SECONDS is replaced in the background. The
+# stale copy keeps serving until the new one is swapped in with os.replace,
+# so no admin page waits on a refresh except the very first one.
+#
+# On PostgreSQL, MVCC already keeps readers and writers apart, so analytics
+# read the live database there.
+ENABLED = settings.get_bool('ANALYTICS_SNAPSHOT', True)
+REFRESH_SECONDS = settings.get_float('ANALYTICS_SNAPSHOT_REFRESH', 300)
+SNAPSHOT_PATH = settings.get_setting('ANALYTICS_SNAPSHOT_PATH')
+
+_lock = threading.Lock()
+_refreshing = threading.Event()
+
+def available():
+    return ENABLED and not db.is_postgres()
+
+def path():
+    return SNAPSHOT_PATH or f"{db.DB_PATH}.snapshot"
+
+def taken_at():
+    """When the current snapshot was taken, or None if there isn't one."""
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(path()))
+    except OSError:
+        return None
+
+def take():
+    """Copy the live database to the snapshot file; returns the seconds it took."""
+    started = time.perf_counter()
+    with _lock:
+        target = path()
+        temporary = f"{target}.tmp"
+        source = sqlite3.connect(db.DB_PATH)
+        copy = sqlite3.connect(temporary)
+        try:
+            # pages=-1 copies everything under one read transaction
+            source.backup(copy)
+            copy.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            copy.close()
+            source.close()
+        os.replace(temporary, target)
+    return time.perf_counter() - started
+
+def _refresh_in_background():
+    if _refreshing.is_set():
+        return
+    _refreshing.set()
+
+    def run():
+        try:
+            take()
+        finally:
+            _refreshing.clear()
+
+    threading.Thread(target=run, name="analytics-snapshot", daemon=True).start()
+
+def ensure_fresh():
+    taken = taken_at()
+    if taken is None:
+        take()
+    elif (datetime.now() - taken).total_seconds() > REFRESH_SECONDS:
+        _refresh_in_background()
+
+@contextlib.contextmanager
+def reading():
+    """Run the db helpers inside the block against the snapshot.
+
+    Yields the time the data was taken, or None when reading the live
+    database (PostgreSQL, or ANALYTICS_SNAPSHOT off).
+    """
+    if not available():
+        yield None
+        return
+    ensure_fresh()
+    # Read before opening, so a swap in between can only make the shown time older than the data
+    as_of = taken_at()
+    uri = pathlib.Path(path()).resolve().as_uri() + "?immutable=1"
+    # Opened per block: cheap for an immutable file, and it always sees the
+    # newest copy
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    try:
+        with db.reading_from(conn):
+            yield as_of
+    finally:
+        conn.close()
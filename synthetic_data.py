@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta
+
+# Synthetic data for query-plan checks and load testing. Rows are generated
+# lazily and written with executemany in chunks, so millions of rows can be
+# loaded without holding them in memory.
+CATEGORIES = ["Main Course", "Snacks", "Beverages", "Salads", "Desserts"]
+STATUSES = ["pending", "confirmed", "preparing", "ready", "delivered", "cancelled"]
+CHUNK_SIZE = 10000
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _timestamp(rng, now, days):
+    return (now - timedelta(seconds=rng.randrange(days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+def populate(conn, users=1000, vendors=20, food_items=200, orders=10000, items_per_order=2, days=365, seed=0):
+    """Append synthetic users, vendors, food items and orders to `conn`.
+
+    Returns a dict with the id ranges that were generated.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    c = conn.cursor()
+
+    def base_id(table):
+        return c.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    first_user = base_id("users") + 1
+    first_vendor = base_id("vendors") + 1
+    first_food = base_id("food_items") + 1
+    first_order = base_id("orders") + 1
+
+    user_rows = ((f"user{first_user + i}", "x", f"user{first_user + i}@example.edu",
+                  f"Student {first_user + i}", "080", "customer", _timestamp(rng, now, days))
+                 for i in range(users))
+    for chunk in _chunks(user_rows):
+        c.executemany('''INSERT INTO users (username, password, email, full_name, phone, user_type, created_at)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''', chunk)
+
+    vendor_rows = ((f"Vendor {first_vendor + i}", "Synthetic vendor", f"Block {i % 26}",
+                    "080", f"vendor{first_vendor + i}@example.edu", "8:00 AM - 8:00 PM")
+                   for i in range(vendors))
+    for chunk in _chunks(vendor_rows):
+        c.executemany('''INSERT INTO vendors (name, description, location, contact_phone, contact_email, operating_hours)
+                         VALUES (?, ?, ?, ?, ?, ?)''', chunk)
+
+    food_rows = ((first_vendor + i % vendors, f"Dish {first_food + i}", "Synthetic dish",
+                  float(rng.randrange(100, 2000, 50)), rng.choice(CATEGORIES), "", 1, rng.randrange(2, 40))
+                 for i in range(food_items))
+    for chunk in _chunks(food_rows):
+        c.executemany('''INSERT INTO food_items (vendor_id, name, description, price, category, image_url, is_available, preparation_time)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', chunk)
+
+    # Orders and their items are generated together so totals are known at
+    # insert time; nothing has to be updated (and re-trigger) afterwards.
+    def order_chunks():
+        for first in range(0, orders, CHUNK_SIZE):
+            order_rows = []
+            item_rows = []
+            for i in range(first, min(first + CHUNK_SIZE, orders)):
+                order_id = first_order + i
+                total = 0.0
+                for _ in range(items_per_order):
+                    quantity = rng.randrange(1, 4)
+                    price = float(rng.randrange(100, 2000, 50))
+                    total += price * quantity
+                    item_rows.append((order_id, first_food + rng.randrange(food_items), quantity, price, price * quantity))
+                created_at = _timestamp(rng, now, days)
+                order_rows.append((order_id, f"SYN{order_id:010d}", first_user + rng.randrange(users),
+                                   first_vendor + rng.randrange(vendors), total, rng.choice(STATUSES),
+                                   "Hostel", "", created_at, created_at))
+            yield order_rows, item_rows
+
+    for order_rows, item_rows in order_chunks():
+        c.executemany('''INSERT INTO orders (id, order_number, customer_id, vendor_id, total_amount, status,
+                                             delivery_location, special_instructions, created_at, updated_at)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', order_rows)
+        c.executemany('''INSERT INTO order_items (order_id, food_item_id, quantity, unit_price, subtotal)
+                         VALUES (?, ?, ?, ?, ?)''', item_rows)
+    conn.commit()
+
+    return {
+        'users': (first_user, first_user + users - 1),
+        'vendors': (first_vendor, first_vendor + vendors - 1),
+        'food_items': (first_food, first_food + food_items - 1),
+        'orders': (first_order, first_order + orders - 1),
+    }
@@ -0,0 +1,6 @@
+import os
+
+# Cheap password hashing and a per-process session secret for the tests;
+# both are read when passwords.py is imported
+os.environ.setdefault('PASSWORD_SCRYPT_N', '1024')
+os.environ.setdefault('APP_ENV', 'development')
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import analytics
+import archive
+import db
+import migrations
+
+def _stamp(days_ago):
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime(analytics.TIMESTAMP_FORMAT)
+
+def test_long_windows_include_archived_orders(tmp_path, monkeypatch):
+    db.configure(str(tmp_path / "analytics.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    vendor_id, food_item_id = db.fetchone("SELECT vendor_id, id FROM food_items ORDER BY id")
+    with db.transaction() as conn:
+        for number, days_ago in ((1, 300), (2, 200), (3, 10)):
+            order_id = conn.execute('''INSERT INTO orders (order_number, vendor_id, total_amount, status,
+                                                           created_at, updated_at)
+                                       VALUES (?, ?, 20.0, 'delivered', ?, ?)''',
+                                    (f"WIN{number}", vendor_id, _stamp(days_ago), _stamp(days_ago))).lastrowid
+            conn.execute('''INSERT INTO order_items (order_id, food_item_id, quantity, unit_price, subtotal)
+                            VALUES (?, ?, 2, 10.0, 20.0)''', (order_id, food_item_id))
+    assert sum(archive.archive_orders(archive_dir=archive.ARCHIVE_DIR)) == 2
+
+    window = analytics.SalesWindow(365)
+    window.refresh(None)
+    assert analytics.summary(window.lines)['orders'] == 3
+    assert analytics.summary(window.lines)['revenue'] == 60.0
+    assert window.lines['preparation_time'].notna().all()
+    assert analytics.vendor_performance(window.lines)['orders'].tolist() == [3]
+    assert int(analytics.hourly_demand(window.lines).to_numpy().sum()) == 3
+
+    window = analytics.SalesWindow(90)
+    window.refresh(None)
+    assert analytics.summary(window.lines)['orders'] == 1
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import archive
+import db
+import export
+import migrations
+
+OLD = '2020-03-15 09:30:00'
+
+def _database(tmp_path):
+    db.configure(str(tmp_path / "archive.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    customer_id = db.insert('''INSERT INTO users (username, password, email, full_name, user_type)
+                               VALUES ('old', 'x', 'old@example.com', 'Old Customer', 'customer')''')
+    vendor_id, food_item_id = db.fetchone("SELECT vendor_id, id FROM food_items ORDER BY id")
+    with db.transaction() as conn:
+        for number, status in ((1, 'delivered'), (2, 'cancelled'), (3, 'pending')):
+            order_id = conn.execute('''INSERT INTO orders (order_number, customer_id, vendor_id, total_amount, status,
+                                                           delivery_location, created_at, updated_at)
+                                       VALUES (?, ?, ?, 20.0, ?, 'Hostel', ?, ?)''',
+                                    (f"OLD{number}", customer_id, vendor_id, status, OLD, OLD)).lastrowid
+            conn.execute('''INSERT INTO order_items (order_id, food_item_id, quantity, unit_price, subtotal)
+                            VALUES (?, ?, 2, 10.0, 20.0)''', (order_id, food_item_id))
+    return customer_id
+
+def test_archived_orders_read_back(tmp_path):
+    customer_id = _database(tmp_path)
+    archive_dir = str(tmp_path / "archive")
+    assert sum(archive.archive_orders(archive_dir=archive_dir)) == 2
+    # Pending orders stay live
+    assert db.query_scalar("SELECT COUNT(*) FROM orders WHERE customer_id = ?", (customer_id,)) == 1
+
+    orders = archive.read_archived_orders(customer_id=customer_id, archive_dir=archive_dir)
+    assert sorted(orders['order_number']) == ["OLD1", "OLD2"]
+    items = archive.read_archived_items(orders['id'].tolist(), archive_dir=archive_dir)
+    assert sorted(items['order_id']) == sorted(orders['id'])
+    assert set(items['subtotal']) == {20.0}
+
+    history = archive.order_history(customer_id=customer_id, include_archive=True, archive_dir=archive_dir)
+    assert sorted(zip(history['order_number'], history['archived'])) == \
+        [("OLD1", True), ("OLD2", True), ("OLD3", False)]
+
+def test_orders_export_includes_archived_lines_when_asked(tmp_path, monkeypatch):
+    _database(tmp_path)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    list(archive.archive_orders(archive_dir=archive.ARCHIVE_DIR))
+
+    live = [chunk for chunk in export.iter_report("orders")]
+    assert sum(len(chunk) for chunk in live) == 1
+    lines = [chunk for chunk in export.iter_report("orders", include_archived=True)]
+    rows = [row for chunk in lines for row in chunk.to_dict('records')]
+    assert [row['order_number'] for row in rows] == ["OLD1", "OLD2", "OLD3"]
+    assert rows[0]['customer'] == 'old' and rows[0]['quantity'] == 2
+    assert rows[0]['vendor'] == rows[2]['vendor'] and rows[0]['food_item'] == rows[2]['food_item']
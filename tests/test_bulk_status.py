@@ -0,0 +1,39 @@
+import pytest
+
+import app
+import db
+import migrations
+
+STAMP = '2026-01-01 12:00:00'
+
+def _database(tmp_path, orders):
+    db.configure(str(tmp_path / "bulk.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    vendor_id = db.insert("INSERT INTO vendors (name, location) VALUES ('Bulk kitchen', 'Test kitchen')")
+    with db.transaction() as conn:
+        conn.executemany('''INSERT INTO orders (order_number, vendor_id, total_amount, status, created_at, updated_at)
+                            VALUES (?, ?, 10.0, ?, ?, ?)''',
+                         [(f"BULK{i}", vendor_id, "delivered" if i % 10 == 0 else "pending", STAMP, STAMP)
+                          for i in range(orders)])
+    return vendor_id
+
+def test_matching_orders_are_counted_and_moved_in_batches(tmp_path):
+    orders = app.MAX_IN_PARAMS * 2 + 50
+    vendor_id = _database(tmp_path, orders)
+    filters = {'vendor_id': vendor_id}
+    pending = db.query_scalar("SELECT COUNT(*) FROM orders WHERE vendor_id = ? AND status = 'pending'",
+                              (vendor_id,))
+    assert app.count_matching_orders(filters, "confirmed") == pending
+
+    assert app.update_matching_orders_status(filters, "confirmed") == pending
+    assert db.query_scalar("SELECT COUNT(*) FROM orders WHERE vendor_id = ? AND status = 'confirmed'",
+                           (vendor_id,)) == pending
+    assert app.count_matching_orders(filters, "confirmed") == 0
+    assert app.update_matching_orders_status(filters, "confirmed") == 0
+
+def test_matching_orders_need_a_filter(tmp_path):
+    _database(tmp_path, 10)
+    with pytest.raises(ValueError):
+        app.update_matching_orders_status({'status': None, 'vendor_id': None}, "confirmed")
+    assert db.query_scalar("SELECT COUNT(*) FROM orders WHERE status = 'confirmed'") == 0
@@ -0,0 +1,43 @@
+import cart
+import db
+import migrations
+
+def _database(tmp_path):
+    db.configure(str(tmp_path / "cart.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    customer_id = db.insert('''INSERT INTO users (username, password, email, full_name, user_type)
+                               VALUES ('cart', 'x', 'cart@example.com', 'Cart Tester', 'customer')''')
+    items = db.fetchall('''SELECT fi.id, fi.name, fi.vendor_id, v.name AS vendor_name, fi.price
+                           FROM food_items fi JOIN vendors v ON v.id = fi.vendor_id
+                           ORDER BY fi.vendor_id, fi.id''')
+    first = items[0]
+    other = next(item for item in items if item[2] != first[2])
+    return customer_id, [dict(zip(['id', 'name', 'vendor_id', 'vendor_name', 'price'], item))
+                         for item in (first, other)]
+
+def test_cart_is_saved_and_reloaded(tmp_path):
+    customer_id, (item, other) = _database(tmp_path)
+    saved = cart.Cart(customer_id)
+    saved.add(item, 2)
+    saved.add(item, 1)
+    saved.add(other, 1)
+    assert saved.total == item['price'] * 3 + other['price']
+
+    loaded = cart.Cart.load(customer_id)
+    assert {row['id']: row['quantity'] for row in loaded} == {item['id']: 3, other['id']: 1}
+    assert loaded.total == saved.total
+    assert loaded.vendors[item['vendor_id']]['total'] == item['price'] * 3
+
+    loaded.set_quantity(item['id'], 0)
+    loaded.clear(other['vendor_id'])
+    assert len(loaded) == 0 and loaded.total == 0
+    assert len(cart.Cart.load(customer_id)) == 0
+
+def test_withdrawn_items_are_left_out(tmp_path):
+    customer_id, (item, other) = _database(tmp_path)
+    saved = cart.Cart(customer_id)
+    saved.add(item, 1)
+    saved.add(other, 1)
+    db.execute("UPDATE food_items SET is_available = 0 WHERE id = ?", (other['id'],))
+    assert [row['id'] for row in cart.Cart.load(customer_id)] == [item['id']]
@@ -0,0 +1,49 @@
+import threading
+
+import db
+
+def test_connections_are_reused_and_rolled_back(tmp_path):
+    db.configure(str(tmp_path / "pool.db"), backend="sqlite")
+    db.execute("CREATE TABLE notes (body TEXT)")
+    with db.connection() as conn:
+        # Nested calls share the connection already checked out
+        with db.connection() as nested:
+            assert nested is conn
+        conn.execute("INSERT INTO notes VALUES ('uncommitted')")
+    with db.connection() as again:
+        assert again is conn
+        assert again.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 0
+
+def test_threads_get_their_own_connections(tmp_path):
+    db.configure(str(tmp_path / "pool.db"), backend="sqlite")
+    checked_out = threading.Barrier(2)
+    seen = []
+
+    def run():
+        with db.connection() as conn:
+            seen.append(conn)
+            checked_out.wait(timeout=5)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen[0] is not seen[1]
+
+def test_configure_drops_pooled_connections(tmp_path):
+    db.configure(str(tmp_path / "first.db"), backend="sqlite")
+    with db.connection() as first:
+        pass
+    db.configure(str(tmp_path / "second.db"), backend="sqlite")
+    with db.connection() as second:
+        assert second is not first
+        assert second.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_qmark_placeholders_become_pyformat():
+    assert db._to_pyformat("SELECT * FROM users WHERE id = ? AND username = ?") == \
+        "SELECT * FROM users WHERE id = %s AND username = %s"
+    # Question marks inside string literals stay, and literal % signs are escaped
+    assert db._to_pyformat("SELECT 'why?' FROM food_items WHERE name LIKE '%' || ? || '%'") == \
+        "SELECT 'why?' FROM food_items WHERE name LIKE '%%' || %s || '%%'"
+    assert db._to_pyformat("SELECT 'it''s?', ?") == "SELECT 'it''s?', %s"
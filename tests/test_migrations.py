@@ -0,0 +1,29 @@
+import threading
+
+import db
+import migrations
+
+def test_concurrent_migrations_apply_each_version_once(tmp_path):
+    db.configure(str(tmp_path / "migrate.db"), backend="sqlite")
+    applied = []
+    errors = []
+
+    def run():
+        try:
+            with db.connection() as conn:
+                applied.append(migrations.migrate(conn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(version for versions in applied for version in versions) == \
+        list(range(1, migrations.SCHEMA_VERSION + 1))
+    with db.connection() as conn:
+        assert migrations.get_schema_version(conn) == migrations.SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'").fetchone()[0] == 1
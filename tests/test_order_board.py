@@ -0,0 +1,31 @@
+import db
+import migrations
+import order_board
+
+STAMP = '2026-01-01 12:00:00'
+
+def _database(tmp_path, orders):
+    db.configure(str(tmp_path / "board.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    with db.transaction() as conn:
+        conn.executemany('''INSERT INTO orders (order_number, total_amount, status, created_at, updated_at)
+                            VALUES (?, 10.0, 'pending', ?, ?)''',
+                         [(f"BOARD{i}", STAMP, STAMP) for i in range(orders)])
+
+def test_refresh_pages_past_more_changes_than_the_limit_at_one_timestamp(tmp_path):
+    orders = order_board.CHANGES_LIMIT + 200
+    _database(tmp_path, orders)
+    board = order_board.OrderBoard(limit=orders * 2)
+    board.watermark = '2025-12-31 00:00:00'
+    seen = 0
+    for _ in range(3):
+        seen += board.refresh()
+    assert seen == orders
+    assert (board.watermark, board.last_id) == (STAMP, orders)
+
+    # A later change still reaches the board
+    db.execute("UPDATE orders SET status = 'ready', updated_at = '2026-01-01 12:00:01' WHERE id = 3")
+    for _ in range(3):
+        board.refresh()
+    assert board.orders[3]['order'].status == 'ready'
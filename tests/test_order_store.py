@@ -0,0 +1,17 @@
+import order_store
+
+HEADER = "order_ref,customer_id,vendor_id,food_item_id,quantity,unit_price\n"
+
+def _read(tmp_path, body):
+    path = tmp_path / "orders.csv"
+    path.write_text(HEADER + body, encoding='utf-8')
+    return list(order_store.read_orders_csv(str(path)))
+
+def test_rows_sharing_an_order_ref_form_one_order(tmp_path):
+    orders = _read(tmp_path, "A,2,1,1,1,5.0\nA,2,1,2,2,3.0\nB,3,1,1,1,5.0\n")
+    assert [len(order['items']) for order in orders] == [2, 1]
+
+def test_rows_without_a_key_are_separate_orders(tmp_path):
+    orders = _read(tmp_path, ",2,1,1,1,5.0\n,3,1,2,2,3.0\n,4,1,1,1,5.0\n")
+    assert [order['customer_id'] for order in orders] == [2, 3, 4]
+    assert all(len(order['items']) == 1 for order in orders)
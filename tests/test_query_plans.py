@@ -0,0 +1,32 @@
+import pytest
+
+import check_query_plans
+
+SIZES = {'orders': 100000}
+COLUMNS = {'orders': {'id', 'customer_id', 'status', 'created_at'}}
+INDEXES = {'idx_orders_created': {'created_at'}}
+
+def _problems(query, plan):
+    return check_query_plans.find_problems(query, plan, SIZES, 1000, COLUMNS, INDEXES)
+
+def test_an_unfiltered_ordered_walk_under_limit_passes():
+    assert _problems("SELECT * FROM orders o ORDER BY o.created_at DESC LIMIT ?",
+                     ["SCAN o USING INDEX idx_orders_created"]) == []
+
+def test_a_filtered_walk_under_limit_is_a_full_scan():
+    problems = _problems("SELECT * FROM orders WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                         ["SCAN orders USING INDEX idx_orders_created"])
+    assert problems and problems[0].startswith("full scan of orders")
+    assert _problems("SELECT * FROM orders o WHERE o.created_at > ? ORDER BY o.created_at LIMIT ?",
+                     ["SCAN o USING INDEX idx_orders_created"]) == []
+
+def test_sorting_after_the_walk_is_reported():
+    assert len(_problems("SELECT * FROM orders ORDER BY customer_id LIMIT ?",
+                         ["SCAN orders", "USE TEMP B-TREE FOR ORDER BY"])) == 2
+
+def test_app_queries_use_indexes(tmp_path, capsys):
+    # Imports app.py, so it needs the app's own dependencies
+    pytest.importorskip("streamlit")
+    pytest.importorskip("pandas")
+    failed = check_query_plans.main(["--db", str(tmp_path / "plans.db"), "--rows", "40000", "--min-rows", "2000"])
+    assert failed == 0, capsys.readouterr().out
@@ -0,0 +1,56 @@
+import hashlib
+import time
+
+import db
+import migrations
+import passwords
+import sessions
+
+def _database(tmp_path):
+    db.configure(str(tmp_path / "sessions.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+    db.execute("INSERT INTO users (username, password, email, full_name, user_type) VALUES (?, ?, ?, ?, 'customer')",
+               ("ada", passwords.hash_password("secret"), "ada@example.com", "Ada"))
+
+def test_login_upgrades_a_legacy_hash(tmp_path):
+    _database(tmp_path)
+    db.execute("UPDATE users SET password = ? WHERE username = 'ada'", (hashlib.sha256(b"secret").hexdigest(),))
+
+    assert sessions.authenticate("ada", "wrong") == (None, None)
+    user, token = sessions.authenticate("ada", "secret")
+    assert user['username'] == "ada"
+    stored = db.query_scalar("SELECT password FROM users WHERE username = 'ada'")
+    assert not passwords.needs_rehash(stored)
+    # Upgrading the hash does not end the session it was made for
+    passwords.forget_session(token)
+    assert sessions.restore(token) == user
+
+def test_expired_tokens_do_not_restore(tmp_path):
+    _database(tmp_path)
+    user, _ = sessions.authenticate("ada", "secret")
+    stored, version = db.query_row("SELECT password, session_version FROM users WHERE id = ?", (user['id'],))
+    expired = passwords.issue_token(user['id'], stored, version, ttl=-1)
+    assert sessions.restore(expired) is None
+    assert sessions.restore(expired.replace(".", "x", 1)) is None
+
+def test_logout_revokes_only_that_token(tmp_path):
+    _database(tmp_path)
+    user, token = sessions.authenticate("ada", "secret")
+    _, other = sessions.authenticate("ada", "secret")
+    assert sessions.restore(token) == user
+
+    sessions.revoke(token)
+    assert sessions.restore(token) is None
+    assert sessions.restore(other) == user
+
+    sessions.revoke_all(user['id'])
+    passwords.forget_session(other)
+    assert sessions.restore(other) is None
+
+def test_revoking_prunes_expired_entries(tmp_path):
+    _database(tmp_path)
+    db.execute("INSERT INTO revoked_sessions (signature, expires_at) VALUES ('old', ?)", (int(time.time()) - 10,))
+    _, token = sessions.authenticate("ada", "secret")
+    sessions.revoke(token)
+    assert [row[0] for row in db.fetchall("SELECT signature FROM revoked_sessions")] == [token.rsplit(".", 1)[1]]
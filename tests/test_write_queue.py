@@ -0,0 +1,39 @@
+from concurrent.futures import Future
+
+import pytest
+
+import db
+import migrations
+import write_queue
+
+def _database(tmp_path):
+    db.configure(str(tmp_path / "queue.db"), backend="sqlite")
+    with db.connection() as conn:
+        migrations.migrate(conn)
+
+def _insert_vendor(name):
+    db.execute("INSERT INTO vendors (name, location) VALUES (?, 'Test kitchen')", (name,))
+    return name
+
+def _fail():
+    _insert_vendor("Rolled back")
+    raise ValueError("bad write")
+
+def test_a_failing_write_rolls_back_alone(tmp_path):
+    _database(tmp_path)
+    batch = [(_insert_vendor, ("First",), Future()), (_fail, (), Future()),
+             (_insert_vendor, ("Second",), Future())]
+    write_queue.WriteQueue()._commit(batch)
+
+    first, failed, second = (future for _, _, future in batch)
+    assert (first.result(), second.result()) == ("First", "Second")
+    with pytest.raises(ValueError):
+        failed.result()
+    assert [row[0] for row in db.fetchall("SELECT name FROM vendors WHERE location = 'Test kitchen' ORDER BY id")] == ["First", "Second"]
+
+def test_call_runs_on_the_writer_thread_and_raises_errors(tmp_path):
+    _database(tmp_path)
+    assert write_queue.call(_insert_vendor, "Queued") == "Queued"
+    with pytest.raises(ValueError):
+        write_queue.call(_fail)
+    assert [row[0] for row in db.fetchall("SELECT name FROM vendors WHERE location = 'Test kitchen'")] == ["Queued"]
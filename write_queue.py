@@ -0,0 +1,105 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+import db
+import settings
+
+# Single-writer service for SQLite. Checkouts and status updates from every
+# session are handed to one background thread, which drains whatever is
+# waiting and commits it as one transaction (a group commit), so concurrent
+# writers stop fighting over the database lock. Each write runs inside its
+# own SAVEPOINT, so a failing write is rolled back on its own and the rest of
+# the batch still commits.
+ENABLED = settings.get_bool('WRITE_QUEUE', True)
+QUEUE_SIZE = settings.get_int('WRITE_QUEUE_SIZE', 1000)
+MAX_BATCH = settings.get_int('WRITE_QUEUE_MAX_BATCH', 200)
+# How long a caller waits for room in a full queue, then for its result
+SUBMIT_TIMEOUT = settings.get_float('WRITE_QUEUE_SUBMIT_TIMEOUT', 5.0)
+RESULT_TIMEOUT = settings.get_float('WRITE_QUEUE_RESULT_TIMEOUT', 30.0)
+
+class WriteQueueFull(Exception):
+    pass
+
+class WriteQueue:
+    def __init__(self, maxsize=QUEUE_SIZE, max_batch=MAX_BATCH):
+        self.requests = queue.Queue(maxsize)
+        self.max_batch = max_batch
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) for the writer thread and return a Future for its result.
+
+        Blocks for up to SUBMIT_TIMEOUT seconds while the queue is full, then
+        raises WriteQueueFull so callers back off instead of piling up.
+        """
+        self._start()
+        future = Future()
+        try:
+            self.requests.put((fn, args, future), timeout=SUBMIT_TIMEOUT)
+        except queue.Full:
+            raise WriteQueueFull("Too many orders are being placed right now. Please try again in a moment.")
+        return future
+
+    def is_writer_thread(self):
+        return threading.current_thread() is self.thread
+
+    def _start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                thread.start()
+                self.thread = thread
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            # Everything that queued up during the previous commit joins this one
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with db.transaction() as conn:
+                for fn, args, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT queued_write")
+                    try:
+                        results.append((future, fn(*args), None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        results.append((future, None, e))
+                    conn.execute("RELEASE queued_write")
+        except Exception as e:
+            # The commit itself failed, so none of the batch was written
+            for fn, args, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+_writer = WriteQueue()
+
+def call(fn, *args):
+    """Run the write fn(*args) through the writer thread and return its result.
+
+    PostgreSQL handles concurrent writers itself, so there (and when
+    WRITE_QUEUE is off, during plan checks, or on the writer thread itself)
+    the write runs inline.
+    """
+    if not ENABLED or db.is_postgres() or db.explaining() or _writer.is_writer_thread():
+        return fn(*args)
+    return _writer.submit(fn, *args).result(timeout=RESULT_TIMEOUT)